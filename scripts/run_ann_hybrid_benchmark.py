@@ -148,8 +148,9 @@ def _ann_signature_stats_for_vectors(
     unique_ratios: list[float] = []
     max_bucket_ratios: list[float] = []
     weight_spread = 0
+    signature_rows = clusterer._ann_signature_rows(vectors)
     for table_idx in range(max(1, int(ann_num_tables))):
-        signatures = [clusterer._ann_signature(vec, table_idx) for vec in vectors]
+        signatures = [row[table_idx] for row in signature_rows]
         counts = Counter(signatures)
         total = max(1, len(signatures))
         unique_ratios.append(len(counts) / float(total))
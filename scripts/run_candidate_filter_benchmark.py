@@ -131,7 +131,7 @@ def _candidate_signature_stats(
         merge_candidate_signature_radius=max(0, int(signature_radius)),
     )
     vectors = [provider.embed(item.content) for item in fragments]
-    counts = Counter(clusterer._candidate_signature(vec) for vec in vectors)
+    counts = Counter(clusterer._candidate_signatures(vectors))
     total = max(1, len(vectors))
     return {
         "signature_unique_ratio": round(len(counts) / float(total), 6),
@@ -11,7 +11,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from src.memory_cluster.compress import _extract_slot_values
+from src.memory_cluster.compress import SlotPrefilterStats, _extract_slot_values
 from src.memory_cluster.models import MemoryFragment
 
 
@@ -29,15 +29,17 @@ def _normalize_pairs(rows: list[tuple[str, str]]) -> set[tuple[str, str]]:
     return {(str(slot), str(value)) for slot, value in rows}
 
 
-def evaluate_case(case: dict[str, Any]) -> dict[str, Any]:
+def evaluate_case(case: dict[str, Any], prefilter: SlotPrefilterStats) -> dict[str, Any]:
     fragment = _fragment(str(case["id"]), str(case["content"]))
-    extracted = _normalize_pairs(_extract_slot_values(fragment))
+    raw_pairs = _extract_slot_values(fragment, stats=prefilter)
+    extracted = _normalize_pairs(raw_pairs)
+    prefilter_consistent = raw_pairs == _extract_slot_values(fragment, prefilter=False)
     expected = _normalize_pairs([(str(s), str(v)) for s, v in (case.get("expected") or [])])
     forbidden = _normalize_pairs([(str(s), str(v)) for s, v in (case.get("forbidden") or [])])
 
     missing = sorted(expected - extracted)
     violations = sorted(forbidden.intersection(extracted))
-    passed = (not missing) and (not violations)
+    passed = (not missing) and (not violations) and prefilter_consistent
 
     return {
         "id": case.get("id"),
@@ -49,6 +51,7 @@ def evaluate_case(case: dict[str, Any]) -> dict[str, Any]:
         "extracted": sorted(extracted),
         "missing_expected": missing,
         "forbidden_violations": violations,
+        "prefilter_consistent": prefilter_consistent,
     }
 
 
@@ -122,6 +125,7 @@ def summarize(results: list[dict[str, Any]]) -> dict[str, Any]:
     expected_hit = 0
     forbidden_total = sum(len(row.get("forbidden") or []) for row in results)
     forbidden_violations = sum(len(row.get("forbidden_violations") or []) for row in results)
+    prefilter_mismatches = sum(1 for row in results if not row.get("prefilter_consistent", True))
     for row in results:
         missing = len(row.get("missing_expected") or [])
         expected_hit += max(0, len(row.get("expected") or []) - missing)
@@ -140,6 +144,7 @@ def summarize(results: list[dict[str, Any]]) -> dict[str, Any]:
         "expected_hit_rate": round(expected_hit_rate, 6),
         "forbidden_pairs_total": forbidden_total,
         "forbidden_violations": forbidden_violations,
+        "prefilter_mismatches": prefilter_mismatches,
     }
 
 
@@ -155,8 +160,13 @@ def write_report(report_path: Path, payload: dict[str, Any]) -> None:
         f"- case_pass_rate: {summary.get('case_pass_rate')}",
         f"- expected_hit_rate: {summary.get('expected_hit_rate')}",
         f"- forbidden_violations: {summary.get('forbidden_violations')}",
+        f"- prefilter_mismatches: {summary.get('prefilter_mismatches')}",
         "",
+        "## Prefilter Skip Rates",
     ]
+    for family, row in (payload.get("prefilter") or {}).items():
+        lines.append(f"- {family}: skipped={row.get('skipped')} scanned={row.get('scanned')} skip_rate={row.get('skip_rate')}")
+    lines.append("")
     for row in payload.get("results") or []:
         lines.extend(
             [
@@ -179,11 +189,13 @@ def main() -> int:
     args = parser.parse_args()
 
     cases = build_cases()
-    results = [evaluate_case(case) for case in cases]
+    prefilter = SlotPrefilterStats()
+    results = [evaluate_case(case, prefilter) for case in cases]
     payload = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "dataset": "semantic_precision_regression_v1",
         "summary": summarize(results),
+        "prefilter": prefilter.to_dict(),
         "results": results,
     }
 
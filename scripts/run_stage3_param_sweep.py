@@ -52,7 +52,7 @@ def _candidate_signature_stats(
         merge_candidate_signature_radius=max(0, int(signature_radius)),
     )
     vectors = [provider.embed(item.content) for item in fragments]
-    counts = Counter(clusterer._candidate_signature(vec) for vec in vectors)
+    counts = Counter(clusterer._candidate_signatures(vectors))
     total = max(1, len(vectors))
     return {
         "unique_ratio": round(len(counts) / float(total), 6),
@@ -75,7 +75,7 @@ def _ann_signature_stats(
         merge_ann_projection_steps=max(1, int(ann_projection_steps)),
     )
     vectors = [provider.embed(item.content) for item in fragments]
-    signatures = [clusterer._ann_signature(vec, 0) for vec in vectors]
+    signatures = [row[0] for row in clusterer._ann_signature_rows(vectors)]
     counts = Counter(signatures)
     total = max(1, len(vectors))
     weights = [bin(value).count("1") for value in signatures]
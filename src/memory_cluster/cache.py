@@ -0,0 +1,507 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+import struct
+
+from .compress import COMPRESSION_CACHE_VERSION, SLOT_EXTRACTOR_VERSION
+from .embed import HASH_EMBEDDING_VERSION, EmbeddingProvider, SparseVector
+from .store import _FileLock, _ensure_parent
+
+# On-disk layout (all little-endian):
+#   <prefix>.bin  header, then 8-byte aligned records: float64 values[nnz] + uint32 indices[nnz] + padding
+#   <prefix>.idx  header, then fixed records: digest(16) dim(u32) nnz(u32) offset(u64) generation(u64)
+# Headers are magic(8) format(u32) embedding_version(u32) epoch(8). Both carry
+# the same random epoch; an index whose epoch differs from the data file (e.g. a
+# crash between the two renames of a compaction) is discarded instead of
+# trusted, and files from another HASH_EMBEDDING_VERSION are reset.
+_FORMAT_VERSION = 1
+_DATA_MAGIC = b"MCEMBDAT"
+_INDEX_MAGIC = b"MCEMBIDX"
+_HEADER = struct.Struct("<8sII8s")
+_INDEX_RECORD = struct.Struct("<16sIIQQ")
+_ALIGN = 8
+
+
+def _pack_header(magic: bytes, epoch: bytes) -> bytes:
+    return _HEADER.pack(magic, _FORMAT_VERSION, HASH_EMBEDDING_VERSION, epoch)
+
+
+def _record_size(nnz: int) -> int:
+    raw = nnz * 12
+    return raw + (-raw) % _ALIGN
+
+
+def content_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+@dataclass
+class _CacheEntry:
+    dim: int
+    nnz: int
+    offset: int
+    generation: int
+
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed cache of sparse embeddings.
+
+    Entries are keyed by (blake2b(content), dim) and stored as float64 values,
+    so a hit returns exactly the vector the provider would have produced. Hits
+    are served as zero-copy views over a read-only memory map; misses are
+    buffered and appended by ``flush``. Each build bumps a generation counter
+    and touched entries are re-stamped, so when the data file outgrows
+    ``max_bytes`` on open or flush only the most recently used entries are kept.
+    """
+
+    def __init__(self, path_prefix: str | Path, max_bytes: int = 64 * 1024 * 1024, lock_timeout_s: float = 3.0) -> None:
+        prefix = Path(path_prefix)
+        self.data_path = prefix.with_name(prefix.name + ".bin")
+        self.index_path = prefix.with_name(prefix.name + ".idx")
+        if int(max_bytes) <= 0:
+            raise ValueError(f"embedding cache max_bytes must be positive, got {max_bytes}")
+        self.max_bytes = int(max_bytes)
+        self.lock_timeout_s = float(lock_timeout_s)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries: dict[tuple[bytes, int], _CacheEntry] = {}
+        self._index_records = 0
+        self._epoch = b""
+        self._generation = 1
+        self._touched: set[tuple[bytes, int]] = set()
+        self._pending: dict[tuple[bytes, int], SparseVector] = {}
+        self._map: mmap.mmap | None = None
+        self._view: memoryview | None = None
+        self._open()
+
+    @classmethod
+    def for_store(cls, store_path: str | Path, max_bytes: int = 64 * 1024 * 1024) -> "EmbeddingCache":
+        """Cache files live next to the store JSONL as ``<store>.embcache.bin`` / ``.idx``."""
+        store = Path(store_path)
+        return cls(store.with_name(store.name + ".embcache"), max_bytes=max_bytes)
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, tb: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._pending)
+
+    def lookup(self, text: str, dim: int) -> SparseVector | None:
+        key = (content_digest(text), int(dim))
+        vector = self._pending.get(key)
+        if vector is None:
+            vector = self._read(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return vector
+
+    def put(self, text: str, vector: SparseVector) -> None:
+        key = (content_digest(text), int(vector.dim))
+        if key not in self._entries:
+            self._pending[key] = vector
+
+    def embed_many_sparse(self, provider: EmbeddingProvider, texts: list[str], dim: int) -> list[SparseVector]:
+        """Serve hits from the cache and embed each distinct missing text once with ``provider``."""
+        out: list[SparseVector | None] = [self.lookup(text, dim) for text in texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, out) if vector is None))
+        if missing:
+            computed = dict(zip(missing, provider.embed_many_sparse(missing)))
+            for text, vector in computed.items():
+                self.put(text, vector)
+            out = [computed[text] if vector is None else vector for text, vector in zip(texts, out)]
+        return [vector for vector in out if vector is not None]
+
+    def flush(self) -> None:
+        """
+        Append pending vectors and generation touches; compact the index when it
+        is mostly stale and evict when the data file outgrows ``max_bytes``.
+        The data file is remapped afterwards so flushed vectors are served as hits.
+        """
+        if not self._pending and not self._touched:
+            return
+        appended = bool(self._pending)
+        _ensure_parent(self.index_path)
+        with _FileLock(self.index_path, timeout_s=self.lock_timeout_s):
+            if not self._headers_match():
+                self._reset_files()
+            new_records: list[bytes] = []
+            with self.data_path.open("r+b") as data:
+                data.seek(0, os.SEEK_END)
+                offset = data.tell()
+                for key, vector in self._pending.items():
+                    data.write(vector.values.tobytes())
+                    data.write(vector.indices.tobytes())
+                    nnz = len(vector.indices)
+                    data.write(b"\0" * (_record_size(nnz) - nnz * 12))
+                    entry = _CacheEntry(dim=key[1], nnz=nnz, offset=offset, generation=self._generation)
+                    self._entries[key] = entry
+                    new_records.append(_INDEX_RECORD.pack(key[0], entry.dim, entry.nnz, entry.offset, entry.generation))
+                    offset += _record_size(nnz)
+            for key in sorted(self._touched):
+                entry = self._entries.get(key)
+                if entry is None or entry.generation >= self._generation:
+                    continue
+                entry.generation = self._generation
+                new_records.append(_INDEX_RECORD.pack(key[0], entry.dim, entry.nnz, entry.offset, entry.generation))
+            with self.index_path.open("ab") as index:
+                index.write(b"".join(new_records))
+            self._index_records += len(new_records)
+            if self.data_path.stat().st_size > max(self.max_bytes, _HEADER.size):
+                # Pick up entries other processes appended since open before ranking.
+                self._load_index()
+                self._evict()
+                appended = True
+            elif self._index_records > 2 * len(self._entries) + 1024:
+                self._rewrite_index()
+        self._pending.clear()
+        self._touched.clear()
+        if appended:
+            self._map_data()
+
+    def close(self) -> None:
+        self._view = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Vectors handed out by lookup still reference the map; it is
+                # released once they are garbage collected.
+                pass
+            self._map = None
+
+    def snapshot_stats(self) -> dict[str, float | int]:
+        total = self.hits + self.misses
+        data_bytes = self.data_path.stat().st_size if self.data_path.exists() else 0
+        return {
+            "embedding_cache_hits": int(self.hits),
+            "embedding_cache_misses": int(self.misses),
+            "embedding_cache_hit_rate": round(self.hits / total, 6) if total else 0.0,
+            "embedding_cache_entries": len(self),
+            "embedding_cache_bytes": int(data_bytes),
+            "embedding_cache_evicted": int(self.evicted),
+        }
+
+    def _read(self, key: tuple[bytes, int]) -> SparseVector | None:
+        entry = self._entries.get(key)
+        if entry is None or self._view is None:
+            return None
+        end_values = entry.offset + entry.nnz * 8
+        end_indices = end_values + entry.nnz * 4
+        if end_indices > len(self._view):
+            return None
+        self._touched.add(key)
+        return SparseVector(
+            dim=entry.dim,
+            indices=self._view[end_values:end_indices].cast("I"),
+            values=self._view[entry.offset : end_values].cast("d"),
+        )
+
+    def _open(self) -> None:
+        _ensure_parent(self.index_path)
+        with _FileLock(self.index_path, timeout_s=self.lock_timeout_s):
+            if not self._headers_match():
+                self._reset_files()
+            self._load_index()
+            if self.data_path.stat().st_size > max(self.max_bytes, _HEADER.size):
+                self._evict()
+        self._map_data()
+
+    def _map_data(self) -> None:
+        """(Re)map the data file; views handed out earlier keep the previous map alive."""
+        self.close()
+        if self.data_path.stat().st_size > _HEADER.size:
+            with self.data_path.open("rb") as handle:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def _read_header(self, path: Path, magic: bytes) -> bytes | None:
+        try:
+            with path.open("rb") as handle:
+                raw = handle.read(_HEADER.size)
+        except OSError:
+            return None
+        if len(raw) != _HEADER.size:
+            return None
+        found_magic, version, embedding_version, epoch = _HEADER.unpack(raw)
+        if found_magic != magic or version != _FORMAT_VERSION or embedding_version != HASH_EMBEDDING_VERSION:
+            return None
+        return epoch
+
+    def _headers_match(self) -> bool:
+        data_epoch = self._read_header(self.data_path, _DATA_MAGIC)
+        index_epoch = self._read_header(self.index_path, _INDEX_MAGIC)
+        if data_epoch is None or data_epoch != index_epoch:
+            return False
+        if self._epoch and data_epoch != self._epoch:
+            # Another process rebuilt the files since we opened them.
+            self._entries.clear()
+        self._epoch = data_epoch
+        return True
+
+    def _reset_files(self, epoch: bytes | None = None) -> None:
+        self._epoch = epoch or os.urandom(8)
+        self._entries.clear()
+        self._index_records = 0
+        self._write_atomic(self.data_path, [_pack_header(_DATA_MAGIC, self._epoch)])
+        self._write_atomic(self.index_path, [_pack_header(_INDEX_MAGIC, self._epoch)])
+
+    def _write_atomic(self, path: Path, chunks: list[bytes]) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        os.replace(tmp, path)
+
+    def _load_index(self) -> None:
+        data_size = self.data_path.stat().st_size
+        with self.index_path.open("rb") as handle:
+            raw = handle.read()
+        self._entries.clear()
+        self._index_records = 0
+        max_generation = 0
+        usable = len(raw) - (len(raw) - _HEADER.size) % _INDEX_RECORD.size
+        for digest, dim, nnz, offset, generation in _INDEX_RECORD.iter_unpack(raw[_HEADER.size : usable]):
+            self._index_records += 1
+            if offset < _HEADER.size or offset % _ALIGN or offset + _record_size(nnz) > data_size:
+                continue
+            self._entries[(digest, dim)] = _CacheEntry(dim=dim, nnz=nnz, offset=offset, generation=generation)
+            max_generation = max(max_generation, generation)
+        self._generation = max_generation + 1
+
+    def _rewrite_index(self) -> None:
+        self._load_index()
+        records = [
+            _INDEX_RECORD.pack(digest, entry.dim, entry.nnz, entry.offset, entry.generation)
+            for (digest, _), entry in sorted(self._entries.items(), key=lambda item: item[1].offset)
+        ]
+        self._write_atomic(self.index_path, [_pack_header(_INDEX_MAGIC, self._epoch)] + records)
+        self._index_records = len(records)
+
+    def _evict(self) -> None:
+        """Rewrite both files keeping the most recently used entries that fit in ``max_bytes``."""
+        ranked = sorted(self._entries.items(), key=lambda item: (item[1].generation, item[1].offset), reverse=True)
+        budget = self.max_bytes - _HEADER.size
+        kept: list[tuple[tuple[bytes, int], _CacheEntry]] = []
+        for key, entry in ranked:
+            size = _record_size(entry.nnz)
+            if size > budget:
+                continue
+            budget -= size
+            kept.append((key, entry))
+        kept.sort(key=lambda item: item[1].offset)
+        self.evicted += len(self._entries) - len(kept)
+
+        epoch = os.urandom(8)
+        data_chunks = [_pack_header(_DATA_MAGIC, epoch)]
+        index_chunks = [_pack_header(_INDEX_MAGIC, epoch)]
+        offset = _HEADER.size
+        entries: dict[tuple[bytes, int], _CacheEntry] = {}
+        with self.data_path.open("rb") as handle:
+            for key, entry in kept:
+                handle.seek(entry.offset)
+                data_chunks.append(handle.read(_record_size(entry.nnz)))
+                moved = _CacheEntry(dim=entry.dim, nnz=entry.nnz, offset=offset, generation=entry.generation)
+                entries[key] = moved
+                index_chunks.append(_INDEX_RECORD.pack(key[0], moved.dim, moved.nnz, moved.offset, moved.generation))
+                offset += _record_size(entry.nnz)
+        self._write_atomic(self.data_path, data_chunks)
+        self._write_atomic(self.index_path, index_chunks)
+        self._epoch = epoch
+        self._entries = entries
+        self._index_records = len(entries)
+
+
+class SlotExtractionCache:
+    """
+    Persistent memo of slot extraction results keyed by ``compress.slot_cache_key``.
+
+    The file is JSONL, one ``{"v": version, "k": key, "p": [[slot, value], ...]}``
+    record per line, appended by ``flush``. Records from another
+    ``SLOT_EXTRACTOR_VERSION``, unreadable lines and superseded duplicates are
+    skipped on load and dropped once they outnumber the live entries.
+    """
+
+    def __init__(self, path: str | Path, lock_timeout_s: float = 3.0) -> None:
+        self.path = Path(path)
+        self.lock_timeout_s = float(lock_timeout_s)
+        self._entries: dict[str, tuple[tuple[str, str], ...]] = {}
+        self._pending: dict[str, tuple[tuple[str, str], ...]] = {}
+        self._stale_lines = 0
+        self.persisted = 0
+        self._load()
+
+    @classmethod
+    def for_store(cls, store_path: str | Path) -> "SlotExtractionCache":
+        """Cache file lives next to the store JSONL as ``<store>.slotcache.jsonl``."""
+        store = Path(store_path)
+        return cls(store.with_name(store.name + ".slotcache.jsonl"))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> tuple[tuple[str, str], ...] | None:
+        return self._entries.get(key)
+
+    def put(self, key: str, pairs: tuple[tuple[str, str], ...]) -> None:
+        if key not in self._entries:
+            self._entries[key] = pairs
+            self._pending[key] = pairs
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        _ensure_parent(self.path)
+        with _FileLock(self.path, timeout_s=self.lock_timeout_s):
+            if self._stale_lines > len(self._entries):
+                self._rewrite()
+            else:
+                with self.path.open("a", encoding="utf-8") as handle:
+                    for key, pairs in self._pending.items():
+                        handle.write(self._encode(key, pairs))
+            self.persisted += len(self._pending)
+        self._pending.clear()
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {
+            "slot_cache_entries": len(self._entries),
+            "slot_cache_persisted": int(self.persisted),
+        }
+
+    def _encode(self, key: str, pairs: tuple[tuple[str, str], ...]) -> str:
+        record = {"v": SLOT_EXTRACTOR_VERSION, "k": key, "p": [list(pair) for pair in pairs]}
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                    if record.get("v") != SLOT_EXTRACTOR_VERSION:
+                        raise ValueError("stale extractor version")
+                    key = str(record["k"])
+                    pairs = tuple((str(slot), str(value)) for slot, value in record["p"])
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    self._stale_lines += 1
+                    continue
+                if key in self._entries:
+                    self._stale_lines += 1
+                self._entries[key] = pairs
+
+    def _rewrite(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as handle:
+            for key, pairs in self._entries.items():
+                handle.write(self._encode(key, pairs))
+        os.replace(tmp, self.path)
+        self._stale_lines = 0
+
+
+class CompressionCache:
+    """
+    Persistent per-cluster compression results keyed by ``ClusterCompressor.compression_key``.
+
+    The file is JSONL, one ``{"v": version, "k": key, "c": {field: value}}``
+    record per line, appended by ``flush``. Keys change whenever a cluster's
+    membership or member decisions do, so old records go dead quickly; once
+    dead and unreadable lines outnumber the records used by the current build,
+    ``flush`` rewrites the file with only the latter.
+    """
+
+    def __init__(self, path: str | Path, lock_timeout_s: float = 3.0) -> None:
+        self.path = Path(path)
+        self.lock_timeout_s = float(lock_timeout_s)
+        self._entries: dict[str, dict] = {}
+        self._pending: dict[str, dict] = {}
+        self._touched: set[str] = set()
+        self._stale_lines = 0
+        self.persisted = 0
+        self._load()
+
+    @classmethod
+    def for_store(cls, store_path: str | Path) -> "CompressionCache":
+        """Cache file lives next to the store JSONL as ``<store>.compcache.jsonl``."""
+        store = Path(store_path)
+        return cls(store.with_name(store.name + ".compcache.jsonl"))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> dict | None:
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._touched.add(key)
+        return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        self._touched.add(key)
+        if key not in self._entries:
+            self._entries[key] = payload
+            self._pending[key] = payload
+
+    def flush(self) -> None:
+        dead = self._stale_lines + len(self._entries) - len(self._touched)
+        if not self._pending and dead <= len(self._touched):
+            return
+        _ensure_parent(self.path)
+        with _FileLock(self.path, timeout_s=self.lock_timeout_s):
+            if dead > len(self._touched):
+                self._entries = {key: self._entries[key] for key in self._entries if key in self._touched}
+                self._rewrite()
+            else:
+                with self.path.open("a", encoding="utf-8") as handle:
+                    for key, payload in self._pending.items():
+                        handle.write(self._encode(key, payload))
+            self.persisted += len(self._pending)
+        self._pending.clear()
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {
+            "compression_cache_entries": len(self._entries),
+            "compression_cache_persisted": int(self.persisted),
+        }
+
+    def _encode(self, key: str, payload: dict) -> str:
+        record = {"v": COMPRESSION_CACHE_VERSION, "k": key, "c": payload}
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                    if record.get("v") != COMPRESSION_CACHE_VERSION:
+                        raise ValueError("stale compression cache version")
+                    key = str(record["k"])
+                    payload = record["c"]
+                    if not isinstance(payload, dict):
+                        raise TypeError("compression payload must be an object")
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    self._stale_lines += 1
+                    continue
+                if key in self._entries:
+                    self._stale_lines += 1
+                self._entries[key] = payload
+
+    def _rewrite(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as handle:
+            for key, payload in self._entries.items():
+                handle.write(self._encode(key, payload))
+        os.replace(tmp, self.path)
+        self._stale_lines = 0
@@ -3,13 +3,14 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
+from .cache import CompressionCache, EmbeddingCache, SlotExtractionCache
 from .embed import HashEmbeddingProvider
 from .models import MemoryFragment, PreferenceConfig
 from .pipeline import build_cluster_result
 from .retrieve import MemoryRetriever
-from .store import FragmentStore, load_result, save_result
+from .store import FragmentStore, StoreReadStats, iter_jsonl_fragments, load_result, save_result
 
 
 def _load_json(path: str | Path) -> dict[str, Any]:
@@ -17,57 +18,34 @@ def _load_json(path: str | Path) -> dict[str, Any]:
         return json.load(handle)
 
 
-def _load_fragments_from_jsonl(path: str | Path, strict: bool = False) -> tuple[list[MemoryFragment], dict[str, int]]:
-    rows: list[MemoryFragment] = []
-    stats = {
-        "total_lines": 0,
-        "parsed_lines": 0,
-        "skipped_blank": 0,
-        "skipped_invalid": 0,
-        "decode_errors": 0,
-        "schema_errors": 0,
-    }
+def _iter_input_fragments(path: str | Path, stats: StoreReadStats, strict: bool = False) -> Iterator[MemoryFragment]:
     with Path(path).open("r", encoding="utf-8-sig") as handle:
-        for lineno, raw_line in enumerate(handle, start=1):
-            stats["total_lines"] += 1
-            line = raw_line.strip()
-            if not line:
-                stats["skipped_blank"] += 1
-                continue
-            try:
-                payload = json.loads(line)
-            except json.JSONDecodeError as exc:
-                stats["skipped_invalid"] += 1
-                stats["decode_errors"] += 1
-                if strict:
-                    raise ValueError(f"invalid input jsonl at line {lineno}: {exc.msg}") from exc
-                continue
-            try:
-                rows.append(MemoryFragment.from_dict(payload))
-                stats["parsed_lines"] += 1
-            except Exception as exc:  # defensive parse guard
-                stats["skipped_invalid"] += 1
-                stats["schema_errors"] += 1
-                if strict:
-                    raise ValueError(f"invalid fragment payload at line {lineno}: {exc}") from exc
-                continue
-    return rows, stats
+        yield from iter_jsonl_fragments(handle, stats, strict=strict, source="input jsonl")
 
 
 def cmd_ingest(args: argparse.Namespace) -> int:
+    strict = bool(args.strict_input)
+    segment_max_bytes = None if args.segment_max_mb is None else int(float(args.segment_max_mb) * 1024 * 1024)
+    store = FragmentStore(args.store, segment_max_bytes=segment_max_bytes)
+    input_stats = StoreReadStats()
     try:
-        fragments, input_stats = _load_fragments_from_jsonl(args.input, strict=bool(args.strict_input))
+        if strict:
+            # validate the whole input first so a bad line never leaves a partial ingest
+            for _ in _iter_input_fragments(args.input, StoreReadStats(), strict=True):
+                pass
+        append_stats = store.append_stream(
+            _iter_input_fragments(args.input, input_stats, strict=strict),
+            idempotent=bool(args.idempotent),
+        )
     except ValueError as exc:
         print(json.dumps({"status": "error", "message": str(exc), "input": args.input}, ensure_ascii=False))
         return 1
 
-    store = FragmentStore(args.store)
-    append_stats = store.append_fragments_with_stats(fragments=fragments, idempotent=bool(args.idempotent))
     payload = {
         "status": "ok",
         "store": args.store,
         "idempotent": bool(args.idempotent),
-        "input_stats": input_stats,
+        "input_stats": input_stats.to_dict(),
         "append_stats": append_stats.to_dict(),
     }
     print(json.dumps(payload, ensure_ascii=False))
@@ -77,7 +55,9 @@ def cmd_ingest(args: argparse.Namespace) -> int:
 def cmd_build(args: argparse.Namespace) -> int:
     store = FragmentStore(args.store)
     try:
-        fragments, read_stats = store.load_latest_by_id_with_stats(strict=bool(args.strict_store))
+        fragments, read_stats = store.load_latest_by_id_with_stats(
+            strict=bool(args.strict_store), workers=max(1, int(args.load_workers))
+        )
     except ValueError as exc:
         print(json.dumps({"status": "error", "message": str(exc), "store": args.store}, ensure_ascii=False))
         return 1
@@ -103,6 +83,8 @@ def cmd_build(args: argparse.Namespace) -> int:
         preference.enable_conflict_graph = True
     if args.enable_adaptive_budget:
         preference.enable_adaptive_budget = True
+    if args.semantic_dedup_mode is not None:
+        preference.semantic_dedup_mode = str(args.semantic_dedup_mode)
     if args.enable_dual_merge_guard:
         preference.enable_dual_merge_guard = True
     if args.merge_conflict_compat_threshold is not None:
@@ -135,6 +117,10 @@ def cmd_build(args: argparse.Namespace) -> int:
         preference.merge_ann_score_dims = max(1, int(args.merge_ann_score_dims))
     if args.merge_ann_projection_steps is not None:
         preference.merge_ann_projection_steps = max(1, int(args.merge_ann_projection_steps))
+    if args.enable_merge_heap:
+        preference.enable_merge_heap = True
+    if args.compress_workers is not None:
+        preference.compress_workers = max(1, int(args.compress_workers))
     if args.hard_keep_tag:
         preference.hard_keep_tags = list(dict.fromkeys(preference.hard_keep_tags + list(args.hard_keep_tag)))
     if args.protect_path_prefix:
@@ -144,14 +130,27 @@ def cmd_build(args: argparse.Namespace) -> int:
     if args.protect_scope:
         preference.protected_scopes = list(dict.fromkeys(preference.protected_scopes + list(args.protect_scope)))
 
-    result = build_cluster_result(
-        fragments=fragments,
-        preference_config=preference,
-        similarity_threshold=args.similarity_threshold,
-        merge_threshold=args.merge_threshold,
-        category_strict=args.category_strict,
-        embedding_dim=args.embedding_dim,
-    )
+    embedding_cache = None
+    embedding_cache_bytes = int(float(args.embedding_cache_max_mb) * 1024 * 1024)
+    if args.embedding_cache and embedding_cache_bytes > 0:  # a zero budget disables the cache
+        embedding_cache = EmbeddingCache.for_store(args.store, max_bytes=embedding_cache_bytes)
+    slot_cache = SlotExtractionCache.for_store(args.store) if args.slot_cache else None
+    compression_cache = CompressionCache.for_store(args.store) if args.compression_cache else None
+    try:
+        result = build_cluster_result(
+            fragments=fragments,
+            preference_config=preference,
+            similarity_threshold=args.similarity_threshold,
+            merge_threshold=args.merge_threshold,
+            category_strict=args.category_strict,
+            embedding_dim=args.embedding_dim,
+            embedding_cache=embedding_cache,
+            slot_cache=slot_cache,
+            compression_cache=compression_cache,
+        )
+    finally:
+        if embedding_cache is not None:
+            embedding_cache.close()
     save_result(args.output, result)
     print(
         json.dumps(
@@ -178,11 +177,23 @@ def cmd_query(args: argparse.Namespace) -> int:
         offset=args.offset,
         cluster_level=args.cluster_level,
         expand=args.expand,
+        store=FragmentStore(args.store) if args.store else None,
     )
     print(json.dumps({"status": "ok", "results": results}, ensure_ascii=False, indent=2))
     return 0
 
 
+def cmd_compact(args: argparse.Namespace) -> int:
+    store = FragmentStore(args.store)
+    try:
+        stats = store.compact(lock_timeout_s=float(args.lock_timeout))
+    except (TimeoutError, ValueError) as exc:
+        print(json.dumps({"status": "error", "message": str(exc), "store": args.store}, ensure_ascii=False))
+        return 1
+    print(json.dumps({"status": "ok", "store": args.store, "compaction": stats.to_dict()}, ensure_ascii=False))
+    return 0
+
+
 def cmd_eval(args: argparse.Namespace) -> int:
     state = load_result(args.state)
     metrics = state.get("metrics") or {}
@@ -205,6 +216,7 @@ def build_parser() -> argparse.ArgumentParser:
     ingest.add_argument("--store", required=True)
     ingest.add_argument("--idempotent", action=argparse.BooleanOptionalAction, default=True)
     ingest.add_argument("--strict-input", action=argparse.BooleanOptionalAction, default=False)
+    ingest.add_argument("--segment-max-mb", type=float, default=None)
     ingest.set_defaults(func=cmd_ingest)
 
     build = sub.add_parser("build", help="Build clusters from stored fragments")
@@ -212,6 +224,7 @@ def build_parser() -> argparse.ArgumentParser:
     build.add_argument("--output", required=True)
     build.add_argument("--preferences", required=False)
     build.add_argument("--strict-store", action=argparse.BooleanOptionalAction, default=False)
+    build.add_argument("--load-workers", type=int, default=1)
     build.add_argument("--similarity-threshold", type=float, default=0.72)
     build.add_argument("--merge-threshold", type=float, default=0.9)
     build.add_argument("--category-strict", action="store_true")
@@ -220,6 +233,7 @@ def build_parser() -> argparse.ArgumentParser:
     build.add_argument("--l2-min-children", type=int, default=2)
     build.add_argument("--enable-conflict-graph", action="store_true")
     build.add_argument("--enable-adaptive-budget", action="store_true")
+    build.add_argument("--semantic-dedup-mode", choices=("exact", "lsh"), default=None)
     build.add_argument("--enable-dual-merge-guard", action="store_true")
     build.add_argument("--merge-conflict-compat-threshold", type=float, default=None)
     build.add_argument("--enable-merge-upper-bound-prune", action="store_true")
@@ -236,10 +250,16 @@ def build_parser() -> argparse.ArgumentParser:
     build.add_argument("--merge-ann-max-neighbors", type=int, default=None)
     build.add_argument("--merge-ann-score-dims", type=int, default=None)
     build.add_argument("--merge-ann-projection-steps", type=int, default=None)
+    build.add_argument("--enable-merge-heap", action="store_true")
+    build.add_argument("--compress-workers", type=int, default=None)
     build.add_argument("--hard-keep-tag", action="append", default=None)
     build.add_argument("--protect-path-prefix", action="append", default=None)
     build.add_argument("--protect-scope", action="append", default=None)
     build.add_argument("--embedding-dim", type=int, default=256)
+    build.add_argument("--embedding-cache", action=argparse.BooleanOptionalAction, default=False)
+    build.add_argument("--embedding-cache-max-mb", type=float, default=64.0)
+    build.add_argument("--slot-cache", action=argparse.BooleanOptionalAction, default=False)
+    build.add_argument("--compression-cache", action=argparse.BooleanOptionalAction, default=False)
     build.set_defaults(func=cmd_build)
 
     query = sub.add_parser("query", help="Query compressed cluster state")
@@ -249,9 +269,15 @@ def build_parser() -> argparse.ArgumentParser:
     query.add_argument("--offset", type=int, default=0)
     query.add_argument("--cluster-level", choices=("all", "l1", "l2"), default="all")
     query.add_argument("--expand", action="store_true")
+    query.add_argument("--store", required=False)
     query.add_argument("--embedding-dim", type=int, default=256)
     query.set_defaults(func=cmd_query)
 
+    compact = sub.add_parser("compact", help="Rewrite sealed store segments to the latest version per id")
+    compact.add_argument("--store", required=True)
+    compact.add_argument("--lock-timeout", type=float, default=3.0)
+    compact.set_defaults(func=cmd_compact)
+
     evaluate = sub.add_parser("eval", help="Print metrics from cluster state")
     evaluate.add_argument("--state", required=True)
     evaluate.add_argument("--output", required=False)
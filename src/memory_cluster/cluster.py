@@ -1,13 +1,54 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import heapq
 import itertools
 import math
+import operator
 import re
+from typing import Callable
 
-from .embed import cosine_similarity
+from .embed import SparseVector, cosine_similarity, sparse_dense_cosine_similarity
 from .models import MemoryCluster, MemoryFragment, utc_now_iso
 
+try:  # NumPy is optional; assign falls back to the pure-Python scan without it.
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only on numpy-less installs
+    np = None
+
+
+# float32 scores are only used to shortlist clusters; every shortlisted row is
+# re-scored with the exact list cosine, so the tolerance just has to exceed the
+# float32 rounding error of one normalized dot product.
+_CENTROID_INDEX_SCORE_TOLERANCE = 1e-4
+# float64 dot products of unit rows differ from the exact list cosine by a few
+# ulps; queueing pairs under score + tolerance keeps the bound conservative.
+_MERGE_HEAP_SCORE_TOLERANCE = 1e-9
+# Rows signed per NumPy block; bounds the (rows, bits, steps) scratch array.
+_PROJECTION_BATCH_ROWS = 1024
+
+
+def _dense(vector: list[float] | SparseVector) -> list[float]:
+    if isinstance(vector, SparseVector):
+        return vector.to_dense()
+    return vector
+
+
+def _normalized_row(vector: list[float]) -> "np.ndarray":
+    row = np.asarray(vector, dtype=np.float64)
+    norm = math.sqrt(sum(value * value for value in vector))
+    return row / norm if norm > 0.0 else row
+
+
+def _normalized_centroid_matrix(clusters: list[MemoryCluster]) -> "np.ndarray | None":
+    """float64 unit centroid rows, or None without NumPy or when centroid widths differ."""
+    if np is None or not clusters:
+        return None
+    dims = {len(cluster.centroid) for cluster in clusters}
+    if len(dims) != 1 or 0 in dims:
+        return None
+    return np.vstack([_normalized_row(_dense(cluster.centroid)) for cluster in clusters])
+
 
 @dataclass
 class ClusterAssignment:
@@ -16,12 +57,181 @@ class ClusterAssignment:
     created_new: bool
 
 
+class _CentroidIndex:
+    """Contiguous float32 matrix of L2-normalized centroids, one row per cluster."""
+
+    def __init__(self, clusters: list[MemoryCluster], dim: int) -> None:
+        self.source = clusters
+        self.dim = int(dim)
+        self.size = 0
+        self.matrix = np.zeros((max(16, len(clusters)), self.dim), dtype=np.float32)
+        self.cluster_ids: list[str] = []
+        self.category_codes = np.zeros(self.matrix.shape[0], dtype=np.int32)
+        self.mismatched_rows: set[int] = set()
+        self._code_by_category: dict[str, int] = {}
+        for cluster in clusters:
+            self.append(cluster)
+
+    def in_sync(self, clusters: list[MemoryCluster], dim: int) -> bool:
+        return self.source is clusters and self.size == len(clusters) and self.dim == int(dim)
+
+    def usable(self) -> bool:
+        # cosine_similarity truncates to the shorter vector and category checks
+        # compare raw tag values; rows the matrix cannot mirror exactly (other
+        # widths, non-string categories) send assign back to the list scan.
+        return not self.mismatched_rows
+
+    def append(self, cluster: MemoryCluster) -> None:
+        if self.size >= self.matrix.shape[0]:
+            capacity = self.matrix.shape[0] * 2
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[: self.size] = self.matrix[: self.size]
+            codes = np.zeros(capacity, dtype=np.int32)
+            codes[: self.size] = self.category_codes[: self.size]
+            self.matrix = matrix
+            self.category_codes = codes
+        row = self.size
+        self.size += 1
+        self.cluster_ids.append(cluster.cluster_id)
+        category = cluster.tags.get("category")
+        if category and not isinstance(category, str):
+            self.mismatched_rows.add(row)
+        self.category_codes[row] = self.category_code(category)
+        self.update(row, cluster)
+
+    def update(self, row: int, cluster: MemoryCluster) -> None:
+        centroid = cluster.centroid or []
+        if len(centroid) != self.dim:
+            self.matrix[row] = 0.0
+            self.mismatched_rows.add(row)
+            return
+        values = np.asarray(centroid, dtype=np.float64)
+        norm = float(np.sqrt(np.dot(values, values)))
+        self.matrix[row] = (values / norm) if norm > 0.0 else 0.0
+
+    def category_code(self, category: object) -> int:
+        if not category or not isinstance(category, str):
+            return 0
+        code = self._code_by_category.get(category)
+        if code is None:
+            code = len(self._code_by_category) + 1
+            self._code_by_category[category] = code
+        return code
+
+    def scores(self, embedding: list[float] | SparseVector, category: str | None = None) -> "np.ndarray":
+        if isinstance(embedding, SparseVector):
+            query = np.zeros(self.dim, dtype=np.float64)
+            query[np.frombuffer(embedding.indices, dtype=np.uint32)] = np.frombuffer(embedding.values, dtype=np.float64)
+        else:
+            query = np.asarray(embedding, dtype=np.float64)
+        norm = float(np.sqrt(np.dot(query, query)))
+        if norm > 0.0:
+            query = query / norm
+        scores = self.matrix[: self.size] @ query.astype(np.float32)
+        if category:
+            codes = self.category_codes[: self.size]
+            code = self._code_by_category.get(category, -1)
+            scores[(codes != 0) & (codes != code)] = -np.inf
+        return scores
+
+
+def _pack_signature(signature: tuple[int, ...]) -> int:
+    """Bit ``i`` of the signature becomes bit ``i`` of the int, under a leading length marker bit."""
+    packed = 1 << len(signature)
+    for bit_idx, bit in enumerate(signature):
+        if bit:
+            packed |= 1 << bit_idx
+    return packed
+
+
+class _HammingIndex:
+    """
+    Multi-index hashing over packed signatures of a fixed width.
+
+    The code is split into ``radius + 1`` disjoint substrings, one exact-match
+    table each; by pigeonhole any key within ``radius`` flips agrees with the
+    query on at least one substring, so a radius query only popcount-checks
+    the union of matching substring buckets instead of enumerating every flip
+    combination. Radii that cover the whole code fall back to a scan.
+    """
+
+    def __init__(self, bits: int, radius: int) -> None:
+        self.bits = max(0, int(bits))
+        self.radius = max(0, min(int(radius), self.bits))
+        self.keys: set[int] = set()
+        parts = self.radius + 1
+        self.spans: list[tuple[int, int]] = []
+        if parts <= self.bits:
+            start = 0
+            for part_idx in range(parts):
+                width = self.bits // parts + (1 if part_idx < self.bits % parts else 0)
+                self.spans.append((start, (1 << width) - 1))
+                start += width
+        self.tables: list[dict[int, set[int]]] = [{} for _ in self.spans]
+
+    def add(self, key: int) -> None:
+        if key.bit_length() != self.bits + 1 or key in self.keys:
+            return
+        self.keys.add(key)
+        for (start, mask), table in zip(self.spans, self.tables):
+            table.setdefault((key >> start) & mask, set()).add(key)
+
+    def discard(self, key: int) -> None:
+        if key not in self.keys:
+            return
+        self.keys.discard(key)
+        for (start, mask), table in zip(self.spans, self.tables):
+            bucket = table.get((key >> start) & mask)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    table.pop((key >> start) & mask, None)
+
+    def query(self, key: int) -> list[int]:
+        """
+        Indexed keys within ``radius`` of ``key``, in the order flip enumeration
+        would probe them: by distance, then by flipped bit positions.
+        """
+        if key.bit_length() != self.bits + 1:
+            return []
+        if self.spans:
+            candidates: set[int] = set()
+            for (start, mask), table in zip(self.spans, self.tables):
+                candidates.update(table.get((key >> start) & mask, ()))
+        else:
+            candidates = self.keys
+        ranked: list[tuple[int, tuple[int, ...], int]] = []
+        for other in candidates:
+            diff = key ^ other
+            distance = diff.bit_count()
+            if distance <= self.radius:
+                ranked.append((distance, tuple(idx for idx in range(self.bits) if (diff >> idx) & 1), other))
+        ranked.sort()
+        return [other for _, _, other in ranked]
+
+
 @dataclass
 class _CandidateState:
-    signatures_by_id: dict[str, tuple[int, ...]]
-    bucket_to_ids: dict[tuple[int, ...], set[str]]
+    # packed signatures (see _pack_signature) keep the candidate tables int-keyed
+    signatures_by_id: dict[str, int]
+    bucket_to_ids: dict[int, set[str]]
     centroids_by_id: dict[str, list[float]]
     neighbors: dict[str, set[str]]
+    index: _HammingIndex
+    # peer -> ids whose neighbor set contains it
+    reverse_neighbors: dict[str, set[str]] = field(default_factory=dict)
+
+
+@dataclass
+class _MergeHeapRow:
+    """Pairs of one cluster ordered by float64 upper bound, consumed from ``cursor``."""
+
+    row: int
+    version: int
+    peers: list[int]
+    bounds: list[float]
+    peer_versions: list[int]
+    cursor: int = 0
 
 
 @dataclass
@@ -30,6 +240,7 @@ class _AnnState:
     tables: list[dict[int, set[str]]]
     vectors_by_id: dict[str, list[float]]
     neighbors: dict[str, set[str]]
+    reverse_neighbors: dict[str, set[str]] = field(default_factory=dict)
 
 
 class IncrementalClusterer:
@@ -56,6 +267,8 @@ class IncrementalClusterer:
         merge_ann_max_neighbors: int = 48,
         merge_ann_score_dims: int = 32,
         merge_ann_projection_steps: int = 32,
+        enable_centroid_index: bool = True,
+        enable_merge_heap: bool = False,
     ) -> None:
         self.similarity_threshold = similarity_threshold
         self.merge_threshold = merge_threshold
@@ -76,6 +289,14 @@ class IncrementalClusterer:
         self.merge_ann_max_neighbors = max(1, int(merge_ann_max_neighbors))
         self.merge_ann_score_dims = max(1, int(merge_ann_score_dims))
         self.merge_ann_projection_steps = max(1, int(merge_ann_projection_steps))
+        self.enable_centroid_index = bool(enable_centroid_index) and np is not None
+        self.enable_merge_heap = bool(enable_merge_heap)
+        self._centroid_index: _CentroidIndex | None = None
+        self._centroid_norms: dict[str, tuple[list[float], float]] = {}
+        # cluster_id -> (version, member count, slot -> value -> count), built
+        # against ``_slot_profile_lookup`` and advanced by updates and merges.
+        self._slot_profiles: dict[str, tuple[int, int, dict[str, dict[str, int]]]] = {}
+        self._slot_profile_lookup: dict[str, MemoryFragment] | None = None
         self._counter = 0
         self._id_pattern = re.compile(r"^cluster-(\d+)$")
         self.merge_attempts = 0
@@ -87,35 +308,111 @@ class IncrementalClusterer:
         self.merge_pairs_skipped_by_hybrid_candidates = 0
         self.merge_candidate_filter_fallbacks = 0
         self.merge_ann_candidate_fallbacks = 0
-        self._projection_plan_cache: dict[tuple[int, int, int], tuple[int, int, int, bool, int]] = {}
+        self.merge_heap_pushes = 0
+        self.merge_heap_pops = 0
+        self.merge_neighbor_sets_touched = 0
+        self.merge_neighbor_sets_touched_max = 0
+        self._projection_plan_cache: dict[tuple[int, int, int], tuple[tuple[int, ...], tuple[float, ...]]] = {}
+        self._projection_matrix_cache: dict[tuple[tuple[int, ...], int, int], tuple[object, object]] = {}
 
     def assign(
         self,
         fragment: MemoryFragment,
-        embedding: list[float],
+        embedding: list[float] | SparseVector,
         clusters: list[MemoryCluster],
     ) -> ClusterAssignment:
         if self._counter == 0 and clusters:
             self._sync_counter(clusters)
 
+        index = self._sync_centroid_index(clusters, dim=len(embedding))
+        rows: list[int] | range | None = None
+        if index is not None and index.usable():
+            rows = self._indexed_candidate_rows(fragment, embedding, index)
+        if rows is None:
+            rows = range(len(clusters))
+
         best_cluster: MemoryCluster | None = None
+        best_row = -1
         best_score = -1.0
-        for cluster in clusters:
+        for row in rows:
+            cluster = clusters[row]
             if not self._is_compatible(fragment, cluster):
                 continue
-            score = cosine_similarity(embedding, cluster.centroid)
+            score = self._assign_score(embedding, cluster)
             if score > best_score:
                 best_score = score
                 best_cluster = cluster
+                best_row = row
 
         if best_cluster and best_score >= self.similarity_threshold:
             self._update_cluster(best_cluster, fragment, embedding)
+            if index is not None:
+                index.update(best_row, best_cluster)
             return ClusterAssignment(best_cluster.cluster_id, best_score, created_new=False)
 
         new_cluster = self._new_cluster(fragment, embedding)
         clusters.append(new_cluster)
+        if index is not None:
+            index.append(new_cluster)
         return ClusterAssignment(new_cluster.cluster_id, 1.0, created_new=True)
 
+    def _assign_score(self, embedding: list[float] | SparseVector, cluster: MemoryCluster) -> float:
+        if not isinstance(embedding, SparseVector):
+            return cosine_similarity(embedding, cluster.centroid)
+        return sparse_dense_cosine_similarity(embedding, cluster.centroid, dense_norm=self._centroid_norm(cluster))
+
+    def _centroid_norm(self, cluster: MemoryCluster) -> float:
+        centroid = cluster.centroid
+        cached = self._centroid_norms.get(cluster.cluster_id)
+        if cached is None or cached[0] is not centroid:
+            # Centroids are replaced, never mutated in place, so list identity
+            # is enough to tell whether the cached norm is still current.
+            cached = (centroid, math.sqrt(sum(value * value for value in centroid)))
+            self._centroid_norms[cluster.cluster_id] = cached
+        return cached[1]
+
+    def _centroid_cosine(self, base: MemoryCluster, other: MemoryCluster) -> float:
+        """``cosine_similarity`` of two centroids, reusing cached norms when the widths match."""
+        vec_a = base.centroid
+        vec_b = other.centroid
+        if not vec_a or len(vec_a) != len(vec_b) or isinstance(vec_a, SparseVector) or isinstance(vec_b, SparseVector):
+            return cosine_similarity(vec_a, vec_b)
+        # Same products summed in the same order as cosine_similarity.
+        dot = sum(map(operator.mul, vec_a, vec_b))
+        norm_a = self._centroid_norm(base)
+        norm_b = self._centroid_norm(other)
+        if norm_a == 0.0 or norm_b == 0.0:
+            return 0.0
+        return dot / (norm_a * norm_b)
+
+    def _sync_centroid_index(self, clusters: list[MemoryCluster], dim: int) -> _CentroidIndex | None:
+        if not self.enable_centroid_index or dim <= 0:
+            return None
+        index = self._centroid_index
+        if index is None or not index.in_sync(clusters, dim):
+            # The index mirrors one clusters list row-for-row; a different list
+            # (or one mutated outside assign) is re-indexed from scratch.
+            index = _CentroidIndex(clusters, dim=dim)
+            self._centroid_index = index
+        return index
+
+    def _indexed_candidate_rows(
+        self,
+        fragment: MemoryFragment,
+        embedding: list[float] | SparseVector,
+        index: _CentroidIndex,
+    ) -> list[int] | None:
+        if index.size == 0:
+            return []
+        category = fragment.tags.get("category") if self.category_strict else None
+        if category and not isinstance(category, str):
+            return None
+        scores = index.scores(embedding, category=category)
+        top = float(scores.max())
+        if top == -np.inf:
+            return []
+        return [int(row) for row in np.flatnonzero(scores >= top - _CENTROID_INDEX_SCORE_TOLERANCE)]
+
     def merge_clusters(self, clusters: list[MemoryCluster]) -> list[MemoryCluster]:
         return self.merge_clusters_with_lookup(clusters=clusters, fragment_lookup=None)
 
@@ -140,6 +437,15 @@ class IncrementalClusterer:
         elif ann_neighbors is not None:
             gate_mode = "ann"
 
+        if self.enable_merge_heap:
+            return self._merge_with_heap(
+                active=active,
+                fragment_lookup=fragment_lookup,
+                gate_mode=gate_mode,
+                candidate_state=candidate_state,
+                ann_state=ann_state,
+            )
+
         merged = True
         while merged:
             merged = False
@@ -152,34 +458,17 @@ class IncrementalClusterer:
                     other = active[j]
                     if other is None:
                         continue
-                    if gate_mode == "candidate_filter":
-                        allowed = self._pair_allowed_in_map(
-                            base.cluster_id, other.cluster_id, candidate_filter_neighbors
-                        )
-                        if not allowed:
-                            self.merge_pairs_skipped_by_candidate_filter += 1
-                            continue
-                    elif gate_mode == "ann":
-                        allowed = self._pair_allowed_in_map(base.cluster_id, other.cluster_id, ann_neighbors)
-                        if not allowed:
-                            self.merge_pairs_skipped_by_ann_candidates += 1
-                            continue
-                    elif gate_mode == "hybrid":
-                        allowed = self._pair_allowed_in_map(
-                            base.cluster_id, other.cluster_id, candidate_filter_neighbors
-                        ) or self._pair_allowed_in_map(base.cluster_id, other.cluster_id, ann_neighbors)
-                        if not allowed:
-                            self.merge_pairs_skipped_by_hybrid_candidates += 1
-                            continue
-                    if not self._cluster_tags_compatible(base, other):
+                    allowed = self._merge_gates_pass(
+                        base,
+                        other,
+                        gate_mode=gate_mode,
+                        candidate_filter_neighbors=candidate_filter_neighbors,
+                        ann_neighbors=ann_neighbors,
+                        bound_cache=bound_cache,
+                    )
+                    if not allowed:
                         continue
-                    self.merge_attempts += 1
-                    if self.enable_merge_upper_bound_prune and self.merge_prune_dims > 0:
-                        upper_bound = self._cosine_upper_bound_from_cache(base, other, bound_cache)
-                        if upper_bound < self.merge_threshold:
-                            self.merge_pairs_pruned_by_bound += 1
-                            continue
-                    score = cosine_similarity(base.centroid, other.centroid)
+                    score = self._centroid_cosine(base, other)
                     if score < self.merge_threshold:
                         continue
                     if self.enable_dual_merge_guard and fragment_lookup:
@@ -194,7 +483,6 @@ class IncrementalClusterer:
                     self._refresh_bound_cache_entry(base, bound_cache)
                     bound_cache.pop(removed_cluster_id, None)
                     self._refresh_neighbors_after_merge(
-                        active=active,
                         base=base,
                         removed_cluster_id=removed_cluster_id,
                         gate_mode=gate_mode,
@@ -205,14 +493,204 @@ class IncrementalClusterer:
             active = [item for item in active if item is not None]
         return active
 
-    def _new_cluster(self, fragment: MemoryFragment, embedding: list[float]) -> MemoryCluster:
+    def _merge_with_heap(
+        self,
+        *,
+        active: list[MemoryCluster | None],
+        fragment_lookup: dict[str, MemoryFragment] | None,
+        gate_mode: str,
+        candidate_state: _CandidateState | None,
+        ann_state: _AnnState | None,
+    ) -> list[MemoryCluster]:
+        """
+        Best-first merge: candidate pairs are queued once by centroid cosine and
+        after a merge only the pairs of the grown cluster are queued again.
+
+        Heap entries carry the cluster versions they were scored against, so
+        entries queued before a merge changed either centroid are dropped when
+        popped. Pairs are kept as (earlier, later) list positions and the earlier
+        cluster absorbs the later one, as in the pass-based loop.
+
+        With NumPy, each cluster's pairs sit behind one row entry keyed by the
+        best remaining float64 upper bound; a popped row gates and exactly
+        scores its next pair and re-queues itself under the following bound.
+        Exact entries therefore still pop in exact score order, so both paths
+        apply the same merges.
+        """
+        candidate_filter_neighbors = candidate_state.neighbors if candidate_state is not None else None
+        ann_neighbors = ann_state.neighbors if ann_state is not None else None
+        clusters = [item for item in active if item is not None]
+        bound_cache = self._build_bound_cache(clusters)
+        matrix = _normalized_centroid_matrix(clusters) if len(clusters) == len(active) else None
+        # Exact pair: (-score, left, right, -1, left_version, right_version)
+        # Row:        (-bound, row, -1, row_id, row_version, 0)
+        heap: list[tuple[float, int, int, int, int, int]] = []
+        rows: dict[int, _MergeHeapRow] = {}
+        row_ids = itertools.count()
+
+        def _gated_score(i: int, j: int) -> float | None:
+            base = active[i]
+            other = active[j]
+            allowed = self._merge_gates_pass(
+                base,
+                other,
+                gate_mode=gate_mode,
+                candidate_filter_neighbors=candidate_filter_neighbors,
+                ann_neighbors=ann_neighbors,
+                bound_cache=bound_cache,
+            )
+            if not allowed:
+                return None
+            score = self._centroid_cosine(base, other)
+            return score if score >= self.merge_threshold else None
+
+        def _exact_entry(i: int, j: int) -> tuple[float, int, int, int, int, int] | None:
+            score = _gated_score(i, j)
+            if score is None:
+                return None
+            return (-score, i, j, -1, active[i].version, active[j].version)
+
+        def _open_row(i: int, peers: "np.ndarray", upper: "np.ndarray") -> tuple[float, int, int, int, int, int] | None:
+            keep = upper >= self.merge_threshold
+            peers = peers[keep]
+            if peers.size == 0:
+                return None
+            upper = upper[keep]
+            order = np.argsort(-upper, kind="stable")
+            peers = peers[order]
+            row = _MergeHeapRow(
+                row=i,
+                version=active[i].version,
+                peers=peers.tolist(),
+                bounds=upper[order].tolist(),
+                peer_versions=versions[peers].tolist(),
+            )
+            row_id = next(row_ids)
+            rows[row_id] = row
+            return (-row.bounds[0], i, -1, row_id, row.version, 0)
+
+        if matrix is not None:
+            # Current version of every live list position; -1 marks merged-away clusters.
+            versions = np.array([cluster.version for cluster in clusters], dtype=np.int64)
+            for i in range(len(active) - 1):
+                upper = matrix[i + 1 :] @ matrix[i] + _MERGE_HEAP_SCORE_TOLERANCE
+                entry = _open_row(i, np.arange(i + 1, len(active)), upper)
+                if entry is not None:
+                    heap.append(entry)
+        else:
+            for i in range(len(active)):
+                for j in range(i + 1, len(active)):
+                    entry = _exact_entry(i, j)
+                    if entry is not None:
+                        heap.append(entry)
+        heapq.heapify(heap)
+        self.merge_heap_pushes += len(heap)
+
+        def _push(entry: tuple[float, int, int, int, int, int] | None) -> None:
+            if entry is not None:
+                heapq.heappush(heap, entry)
+                self.merge_heap_pushes += 1
+
+        while heap:
+            _, i, j, row_id, first_version, second_version = heapq.heappop(heap)
+            self.merge_heap_pops += 1
+            if row_id >= 0:
+                row = rows[row_id]
+                if active[i] is None or active[i].version != row.version:
+                    rows.pop(row_id, None)
+                    continue
+                k = row.peers[row.cursor]
+                if active[k] is not None and active[k].version == row.peer_versions[row.cursor]:
+                    _push(_exact_entry(min(i, k), max(i, k)))
+                row.cursor += 1
+                if row.cursor < len(row.peers):
+                    _push((-row.bounds[row.cursor], i, -1, row_id, row.version, 0))
+                else:
+                    rows.pop(row_id, None)
+                continue
+
+            base = active[i]
+            other = active[j]
+            if base is None or other is None or base.version != first_version or other.version != second_version:
+                continue
+            if self.enable_dual_merge_guard and fragment_lookup:
+                compat = self._conflict_compatibility(base, other, fragment_lookup)
+                if compat < self.merge_conflict_compat_threshold:
+                    self.merges_blocked_by_guard += 1
+                    continue
+            self._merge_pair(base, other)
+            self.merges_applied += 1
+            removed_cluster_id = other.cluster_id
+            active[j] = None
+            self._refresh_bound_cache_entry(base, bound_cache)
+            bound_cache.pop(removed_cluster_id, None)
+            self._refresh_neighbors_after_merge(
+                base=base,
+                removed_cluster_id=removed_cluster_id,
+                gate_mode=gate_mode,
+                candidate_state=candidate_state,
+                ann_state=ann_state,
+            )
+            if matrix is not None:
+                matrix[i] = _normalized_row(base.centroid)
+                versions[i] = base.version
+                versions[j] = -1
+                peers = np.flatnonzero(versions >= 0)
+                peers = peers[peers != i]
+                upper = matrix[peers] @ matrix[i] + _MERGE_HEAP_SCORE_TOLERANCE
+                _push(_open_row(i, peers, upper))
+            else:
+                for k in range(len(active)):
+                    if k != i and active[k] is not None:
+                        _push(_exact_entry(min(i, k), max(i, k)))
+        return [item for item in active if item is not None]
+
+    def _merge_gates_pass(
+        self,
+        base: MemoryCluster,
+        other: MemoryCluster,
+        *,
+        gate_mode: str,
+        candidate_filter_neighbors: dict[str, set[str]] | None,
+        ann_neighbors: dict[str, set[str]] | None,
+        bound_cache: dict[str, dict[str, object]],
+    ) -> bool:
+        """Apply the neighbor-map, category and upper-bound gates to a merge pair."""
+        if gate_mode == "candidate_filter":
+            allowed = self._pair_allowed_in_map(base.cluster_id, other.cluster_id, candidate_filter_neighbors)
+            if not allowed:
+                self.merge_pairs_skipped_by_candidate_filter += 1
+                return False
+        elif gate_mode == "ann":
+            allowed = self._pair_allowed_in_map(base.cluster_id, other.cluster_id, ann_neighbors)
+            if not allowed:
+                self.merge_pairs_skipped_by_ann_candidates += 1
+                return False
+        elif gate_mode == "hybrid":
+            allowed = self._pair_allowed_in_map(
+                base.cluster_id, other.cluster_id, candidate_filter_neighbors
+            ) or self._pair_allowed_in_map(base.cluster_id, other.cluster_id, ann_neighbors)
+            if not allowed:
+                self.merge_pairs_skipped_by_hybrid_candidates += 1
+                return False
+        if not self._cluster_tags_compatible(base, other):
+            return False
+        self.merge_attempts += 1
+        if self.enable_merge_upper_bound_prune and self.merge_prune_dims > 0:
+            upper_bound = self._cosine_upper_bound_from_cache(base, other, bound_cache)
+            if upper_bound < self.merge_threshold:
+                self.merge_pairs_pruned_by_bound += 1
+                return False
+        return True
+
+    def _new_cluster(self, fragment: MemoryFragment, embedding: list[float] | SparseVector) -> MemoryCluster:
         self._counter += 1
         cluster_id = f"cluster-{self._counter:04d}"
         category = fragment.tags.get("category")
         tags = {"category": category} if category else {}
         cluster = MemoryCluster(
             cluster_id=cluster_id,
-            centroid=list(embedding),
+            centroid=embedding.to_dense() if isinstance(embedding, SparseVector) else list(embedding),
             fragment_ids=[fragment.id],
             source_distribution={fragment.agent_id: 1},
             tags=tags,
@@ -234,34 +712,57 @@ class IncrementalClusterer:
         self,
         cluster: MemoryCluster,
         fragment: MemoryFragment,
-        embedding: list[float],
+        embedding: list[float] | SparseVector,
     ) -> None:
         count = max(len(cluster.fragment_ids), 1)
-        updated = []
-        for old_value, new_value in zip(cluster.centroid, embedding):
-            updated.append(((old_value * count) + new_value) / (count + 1))
+        if isinstance(embedding, SparseVector):
+            # Same arithmetic as the dense update; the zero entries still add
+            # 0.0 so every coordinate rounds exactly as it does for a list.
+            centroid = cluster.centroid
+            length = min(len(centroid), embedding.dim)
+            updated = [((old_value * count) + 0.0) / (count + 1) for old_value in centroid[:length]]
+            for idx, new_value in zip(embedding.indices, embedding.values):
+                if idx >= length:
+                    break
+                updated[idx] = ((centroid[idx] * count) + new_value) / (count + 1)
+        else:
+            updated = []
+            for old_value, new_value in zip(cluster.centroid, embedding):
+                updated.append(((old_value * count) + new_value) / (count + 1))
         cluster.centroid = updated
         cluster.fragment_ids.append(fragment.id)
         cluster.backrefs.append(fragment.id)
         cluster.source_distribution[fragment.agent_id] = cluster.source_distribution.get(fragment.agent_id, 0) + 1
         cluster.last_updated = utc_now_iso()
         cluster.version += 1
+        self._advance_slot_profile(cluster, previous=(cluster.version - 1, len(cluster.fragment_ids) - 1), added=[fragment.id])
 
     def _merge_pair(self, base: MemoryCluster, other: MemoryCluster) -> None:
+        base_key = (base.version, len(base.fragment_ids))
+        other_profile = self._current_slot_profile(other)
+        self._slot_profiles.pop(other.cluster_id, None)
         size_base = max(len(base.fragment_ids), 1)
         size_other = max(len(other.fragment_ids), 1)
         total = size_base + size_other
-        if len(base.centroid) == len(other.centroid):
+        base_centroid = _dense(base.centroid)
+        other_centroid = _dense(other.centroid)
+        if len(base_centroid) == len(other_centroid):
             base.centroid = [
-                (base.centroid[i] * size_base + other.centroid[i] * size_other) / total
-                for i in range(len(base.centroid))
+                (base_centroid[i] * size_base + other_centroid[i] * size_other) / total
+                for i in range(len(base_centroid))
             ]
+        else:
+            base.centroid = base_centroid
         base.fragment_ids.extend(other.fragment_ids)
         base.backrefs.extend(other.backrefs)
         for key, value in other.source_distribution.items():
             base.source_distribution[key] = base.source_distribution.get(key, 0) + value
         base.last_updated = utc_now_iso()
         base.version += 1
+        if other_profile is None:
+            self._slot_profiles.pop(base.cluster_id, None)
+        else:
+            self._advance_slot_profile(base, previous=base_key, added_profile=other_profile)
 
     def snapshot_stats(self) -> dict[str, int]:
         return {
@@ -274,6 +775,10 @@ class IncrementalClusterer:
             "merge_pairs_skipped_by_hybrid_candidates": int(self.merge_pairs_skipped_by_hybrid_candidates),
             "merge_candidate_filter_fallbacks": int(self.merge_candidate_filter_fallbacks),
             "merge_ann_candidate_fallbacks": int(self.merge_ann_candidate_fallbacks),
+            "merge_heap_pushes": int(self.merge_heap_pushes),
+            "merge_heap_pops": int(self.merge_heap_pops),
+            "merge_neighbor_sets_touched": int(self.merge_neighbor_sets_touched),
+            "merge_neighbor_sets_touched_max": int(self.merge_neighbor_sets_touched_max),
         }
 
     def _build_candidate_neighbors(self, clusters: list[MemoryCluster]) -> dict[str, set[str]] | None:
@@ -284,41 +789,57 @@ class IncrementalClusterer:
         if not self.enable_merge_candidate_filter:
             return None
         if len(clusters) < 2:
-            return _CandidateState(signatures_by_id={}, bucket_to_ids={}, centroids_by_id={}, neighbors={})
+            return self._new_candidate_state([])
 
-        signatures: dict[str, tuple[int, ...]] = {}
-        bucket_to_ids: dict[tuple[int, ...], set[str]] = {}
-        centroids_by_id: dict[str, list[float]] = {}
-        for cluster in clusters:
-            cid = cluster.cluster_id
-            centroid = cluster.centroid or []
-            centroids_by_id[cid] = centroid
-            signature = self._candidate_signature(centroid)
-            signatures[cid] = signature
-            bucket_to_ids.setdefault(signature, set()).add(cid)
-
-        unique_ratio, max_bucket_ratio = self._signature_bucket_quality(bucket_to_ids, total=len(clusters))
+        state = self._new_candidate_state(clusters)
+        unique_ratio, max_bucket_ratio = self._signature_bucket_quality(state.bucket_to_ids, total=len(clusters))
         if unique_ratio < 0.18 or max_bucket_ratio > 0.90:
             self.merge_candidate_filter_fallbacks += 1
             return None
 
+        for cid in sorted(state.centroids_by_id.keys()):
+            self._replace_neighbor_set(state, cid, self._build_candidate_neighbors_from_state(cid, state))
+        return state
+
+    def _new_candidate_state(self, clusters: list[MemoryCluster]) -> _CandidateState:
         state = _CandidateState(
-            signatures_by_id=signatures,
-            bucket_to_ids=bucket_to_ids,
-            centroids_by_id=centroids_by_id,
+            signatures_by_id={},
+            bucket_to_ids={},
+            centroids_by_id={},
             neighbors={},
+            index=_HammingIndex(self.merge_candidate_bucket_dims, self.merge_candidate_signature_radius),
         )
-        for cid in sorted(centroids_by_id.keys()):
-            state.neighbors[cid] = self._build_candidate_neighbors_from_state(cid, state)
+        centroids = [cluster.centroid or [] for cluster in clusters]
+        for cluster, centroid, signature in zip(clusters, centroids, self._candidate_signatures(centroids)):
+            state.centroids_by_id[cluster.cluster_id] = centroid
+            self._candidate_bucket_add(state, cluster.cluster_id, _pack_signature(signature))
         return state
 
+    def _candidate_bucket_add(self, state: _CandidateState, cluster_id: str, signature: int) -> None:
+        state.signatures_by_id[cluster_id] = signature
+        bucket = state.bucket_to_ids.get(signature)
+        if bucket is None:
+            bucket = state.bucket_to_ids[signature] = set()
+            state.index.add(signature)
+        bucket.add(cluster_id)
+
+    def _candidate_bucket_discard(self, state: _CandidateState, cluster_id: str, signature: int) -> None:
+        bucket = state.bucket_to_ids.get(signature)
+        if bucket is None:
+            return
+        bucket.discard(cluster_id)
+        if not bucket:
+            state.bucket_to_ids.pop(signature, None)
+            state.index.discard(signature)
+
     def _build_candidate_neighbors_from_state(self, base_cluster_id: str, state: _CandidateState) -> set[str]:
-        signature = state.signatures_by_id.get(base_cluster_id) or ()
+        signature = state.signatures_by_id.get(base_cluster_id)
+        if signature is None:
+            return set()
         candidate_ids = self._collect_bucket_candidates(
             base_cluster_id=base_cluster_id,
             signature=signature,
-            bucket_to_ids=state.bucket_to_ids,
-            max_hamming_distance=self.merge_candidate_signature_radius,
+            state=state,
         )
         if not candidate_ids:
             return set()
@@ -335,25 +856,16 @@ class IncrementalClusterer:
     def _candidate_state_drop_cluster(self, state: _CandidateState, cluster_id: str) -> None:
         old_signature = state.signatures_by_id.pop(cluster_id, None)
         if old_signature is not None:
-            bucket = state.bucket_to_ids.get(old_signature)
-            if bucket is not None:
-                bucket.discard(cluster_id)
-                if not bucket:
-                    state.bucket_to_ids.pop(old_signature, None)
+            self._candidate_bucket_discard(state, cluster_id, old_signature)
         state.centroids_by_id.pop(cluster_id, None)
         state.neighbors.pop(cluster_id, None)
 
     def _candidate_state_upsert_cluster(self, state: _CandidateState, cluster_id: str, centroid: list[float]) -> None:
-        new_signature = self._candidate_signature(centroid)
+        new_signature = _pack_signature(self._candidate_signature(centroid))
         old_signature = state.signatures_by_id.get(cluster_id)
         if old_signature is not None and old_signature != new_signature:
-            old_bucket = state.bucket_to_ids.get(old_signature)
-            if old_bucket is not None:
-                old_bucket.discard(cluster_id)
-                if not old_bucket:
-                    state.bucket_to_ids.pop(old_signature, None)
-        state.signatures_by_id[cluster_id] = new_signature
-        state.bucket_to_ids.setdefault(new_signature, set()).add(cluster_id)
+            self._candidate_bucket_discard(state, cluster_id, old_signature)
+        self._candidate_bucket_add(state, cluster_id, new_signature)
         state.centroids_by_id[cluster_id] = list(centroid)
 
     def _build_ann_candidate_neighbors(
@@ -389,7 +901,7 @@ class IncrementalClusterer:
             neighbors={},
         )
         for cid in sorted(vectors_by_id.keys()):
-            state.neighbors[cid] = self._build_ann_neighbors_from_state(cid, state)
+            self._replace_neighbor_set(state, cid, self._build_ann_neighbors_from_state(cid, state))
         return state
 
     def _build_ann_neighbors_from_state(self, base_cluster_id: str, state: _AnnState) -> set[str]:
@@ -453,11 +965,8 @@ class IncrementalClusterer:
             state.tables[table_idx].setdefault(int(signature), set()).add(cluster_id)
 
     def _build_ann_signature_cache(self, clusters: list[MemoryCluster]) -> dict[str, list[int]]:
-        cache: dict[str, list[int]] = {}
-        for cluster in clusters:
-            vector = cluster.centroid or []
-            cache[cluster.cluster_id] = [self._ann_signature(vector, table_idx) for table_idx in range(self.merge_ann_num_tables)]
-        return cache
+        rows = self._ann_signature_rows([cluster.centroid or [] for cluster in clusters])
+        return {cluster.cluster_id: row for cluster, row in zip(clusters, rows)}
 
     def _build_ann_tables(self, signatures_by_id: dict[str, list[int]]) -> list[dict[int, set[str]]]:
         tables: list[dict[int, set[str]]] = [{} for _ in range(self.merge_ann_num_tables)]
@@ -485,7 +994,7 @@ class IncrementalClusterer:
 
     def _signature_bucket_quality(
         self,
-        bucket_to_ids: dict[tuple[int, ...], set[str]],
+        bucket_to_ids: dict[int, set[str]],
         *,
         total: int,
     ) -> tuple[float, float]:
@@ -495,15 +1004,18 @@ class IncrementalClusterer:
         max_bucket_ratio = largest_bucket / float(all_total)
         return float(unique_ratio), float(max_bucket_ratio)
 
+    def _ann_seeds(self, dim: int, table_idx: int) -> list[int]:
+        return [
+            self._mix64(((table_idx + 1) * 911_382_323) ^ ((bit_idx + 1) * 3_571_231) ^ (dim * 1_315_423_911))
+            for bit_idx in range(self.merge_ann_bits_per_table)
+        ]
+
     def _ann_signature(self, vector: list[float], table_idx: int) -> int:
         if not vector:
             return 0
         mean_value = self._vector_mean(vector)
         signature = 0
-        for bit_idx in range(self.merge_ann_bits_per_table):
-            seed = self._mix64(
-                ((table_idx + 1) * 911_382_323) ^ ((bit_idx + 1) * 3_571_231) ^ (len(vector) * 1_315_423_911)
-            )
+        for bit_idx, seed in enumerate(self._ann_seeds(len(vector), table_idx)):
             score = self._projection_score(
                 vector,
                 seed=seed,
@@ -539,13 +1051,44 @@ class IncrementalClusterer:
             return -1.0
         return dot / (math.sqrt(norm_a) * math.sqrt(norm_b))
 
+    def _ann_signature_rows(self, vectors: list[list[float]]) -> list[list[int]]:
+        """``[_ann_signature(vector, t) for t in tables]`` for every vector, batched when NumPy is available."""
+        num_tables = self.merge_ann_num_tables
+        bits_per_table = self.merge_ann_bits_per_table
+        bit_rows = self._projection_sign_bits(
+            vectors,
+            seeds_for_dim=lambda dim: [seed for table_idx in range(num_tables) for seed in self._ann_seeds(dim, table_idx)],
+            steps=self.merge_ann_projection_steps,
+        )
+        if bit_rows is None:
+            return [[self._ann_signature(vector, table_idx) for table_idx in range(num_tables)] for vector in vectors]
+        output: list[list[int]] = []
+        for bits in bit_rows:
+            if bits is None:
+                output.append([0] * num_tables)
+                continue
+            row: list[int] = []
+            for table_idx in range(num_tables):
+                signature = 0
+                for bit_idx, bit in enumerate(bits[table_idx * bits_per_table : (table_idx + 1) * bits_per_table]):
+                    if bit:
+                        signature |= (1 << bit_idx)
+                row.append(signature)
+            output.append(row)
+        return output
+
+    def _candidate_seeds(self, dim: int) -> list[int]:
+        return [
+            self._mix64((613 * 2_654_435_761) ^ ((bit_idx + 1) * 1_543_271) ^ (dim * 131))
+            for bit_idx in range(self.merge_candidate_bucket_dims)
+        ]
+
     def _candidate_signature(self, vector: list[float]) -> tuple[int, ...]:
         if not vector:
             return ()
         mean_value = self._vector_mean(vector)
         output: list[int] = []
-        for bit_idx in range(self.merge_candidate_bucket_dims):
-            seed = self._mix64((613 * 2_654_435_761) ^ ((bit_idx + 1) * 1_543_271) ^ (len(vector) * 131))
+        for seed in self._candidate_seeds(len(vector)):
             score = self._projection_score(
                 vector,
                 seed=seed,
@@ -555,6 +1098,17 @@ class IncrementalClusterer:
             output.append(1 if score >= 0.0 else 0)
         return tuple(output)
 
+    def _candidate_signatures(self, vectors: list[list[float]]) -> list[tuple[int, ...]]:
+        """``_candidate_signature`` for every vector, batched when NumPy is available."""
+        bit_rows = self._projection_sign_bits(
+            vectors,
+            seeds_for_dim=self._candidate_seeds,
+            steps=self.merge_candidate_projection_steps,
+        )
+        if bit_rows is None:
+            return [self._candidate_signature(vector) for vector in vectors]
+        return [() if bits is None else tuple(1 if bit else 0 for bit in bits) for bits in bit_rows]
+
     def _adjacent_signatures(self, signature: tuple[int, ...]) -> list[tuple[int, ...]]:
         if not signature:
             return []
@@ -577,27 +1131,6 @@ class IncrementalClusterer:
                 output.append(tuple(row))
         return output
 
-    def _hamming_neighbor_signatures(
-        self,
-        signature: tuple[int, ...],
-        max_hamming_distance: int,
-    ) -> list[tuple[int, ...]]:
-        if not signature:
-            return []
-        max_dist = max(0, min(int(max_hamming_distance), len(signature)))
-        keys: list[tuple[int, ...]] = [signature]
-        if max_dist <= 0:
-            return keys
-
-        idxs = list(range(len(signature)))
-        for dist in range(1, max_dist + 1):
-            for combo in itertools.combinations(idxs, dist):
-                row = list(signature)
-                for idx in combo:
-                    row[idx] = 1 - row[idx]
-                keys.append(tuple(row))
-        return keys
-
     def _build_bound_cache(self, clusters: list[MemoryCluster]) -> dict[str, dict[str, object]]:
         if not self.enable_merge_upper_bound_prune or self.merge_prune_dims <= 0:
             return {}
@@ -661,7 +1194,7 @@ class IncrementalClusterer:
     def _vector_mean(self, vector: list[float]) -> float:
         if not vector:
             return 0.0
-        return sum(float(value) for value in vector) / float(len(vector))
+        return sum(map(float, vector)) / float(len(vector))
 
     def _mix64(self, value: int) -> int:
         mask = (1 << 64) - 1
@@ -683,7 +1216,8 @@ class IncrementalClusterer:
                 stride = 1
         return stride
 
-    def _projection_plan(self, *, seed: int, dim: int, steps: int) -> tuple[int, int, int, bool, int]:
+    def _projection_plan(self, *, seed: int, dim: int, steps: int) -> tuple[tuple[int, ...], tuple[float, ...]]:
+        """Coordinates visited and the +/-1 sign applied to each, materialized once per (seed, dim, steps)."""
         limit = max(1, min(int(steps), dim))
         key = (int(seed) & ((1 << 64) - 1), int(dim), int(limit))
         cached = self._projection_plan_cache.get(key)
@@ -692,9 +1226,22 @@ class IncrementalClusterer:
 
         start = int(self._mix64(seed ^ 0x9E3779B97F4A7C15) % dim)
         stride = self._coprime_stride(seed, dim)
-        power_of_two_dim = (dim & (dim - 1)) == 0
-        dim_mask = dim - 1
-        plan = (limit, start, stride, power_of_two_dim, dim_mask)
+        indices: list[int] = []
+        signs: list[float] = []
+        # Deterministic pseudo-random signs using xorshift64* state updates.
+        state = self._mix64(seed ^ 0xD6E8FEB86659FD93)
+        mask_64 = (1 << 64) - 1
+        idx = start
+        for _ in range(limit):
+            state ^= (state >> 12)
+            state &= mask_64
+            state ^= ((state << 25) & mask_64)
+            state ^= (state >> 27)
+            state &= mask_64
+            indices.append(idx)
+            signs.append(1.0 if (state & 1) == 0 else -1.0)
+            idx = (idx + stride) % dim
+        plan = (tuple(indices), tuple(signs))
         self._projection_plan_cache[key] = plan
         return plan
 
@@ -708,28 +1255,61 @@ class IncrementalClusterer:
     ) -> float:
         if not vector:
             return 0.0
-        dim = len(vector)
-        limit, start, stride, power_of_two_dim, dim_mask = self._projection_plan(seed=seed, dim=dim, steps=steps)
+        indices, signs = self._projection_plan(seed=seed, dim=len(vector), steps=steps)
         total = 0.0
-        # Faster deterministic pseudo-random signs using xorshift64* state updates.
-        state = self._mix64(seed ^ 0xD6E8FEB86659FD93)
-        mask_64 = (1 << 64) - 1
-        idx = start
-        for _ in range(limit):
-            centered = float(vector[idx]) - mean_value
-            state ^= (state >> 12)
-            state &= mask_64
-            state ^= ((state << 25) & mask_64)
-            state ^= (state >> 27)
-            state &= mask_64
-            sign = 1.0 if (state & 1) == 0 else -1.0
-            total += centered * sign
-            if power_of_two_dim:
-                idx = (idx + stride) & dim_mask
-            else:
-                idx = (idx + stride) % dim
+        for idx, sign in zip(indices, signs):
+            total += (float(vector[idx]) - mean_value) * sign
         return total
 
+    def _projection_matrix(self, seeds: list[int], dim: int, steps: int) -> tuple["np.ndarray", "np.ndarray"]:
+        """(bits, limit) index and sign arrays stacking the projection plans of ``seeds``."""
+        key = (tuple(seeds), int(dim), int(steps))
+        cached = self._projection_matrix_cache.get(key)
+        if cached is not None:
+            return cached  # type: ignore[return-value]
+        plans = [self._projection_plan(seed=seed, dim=dim, steps=steps) for seed in seeds]
+        matrix = (
+            np.array([indices for indices, _ in plans], dtype=np.intp),
+            np.array([signs for _, signs in plans], dtype=np.float64),
+        )
+        self._projection_matrix_cache[key] = matrix
+        return matrix
+
+    def _projection_sign_bits(
+        self,
+        vectors: list[list[float]],
+        *,
+        seeds_for_dim: Callable[[int], list[int]],
+        steps: int,
+    ) -> list[list[bool] | None] | None:
+        """
+        ``_projection_score(...) >= 0`` for every (vector, seed), or None without NumPy.
+
+        Vectors of equal width are signed together: the plan coordinates are
+        gathered into a (rows, bits, limit) block and reduced with a
+        left-to-right cumulative sum, which performs the same float64 additions
+        in the same order as the scalar loop, so every bit matches it exactly.
+        Empty vectors map to None.
+        """
+        if np is None:
+            return None
+        output: list[list[bool] | None] = [None] * len(vectors)
+        rows_by_dim: dict[int, list[int]] = {}
+        for row, vector in enumerate(vectors):
+            if vector:
+                rows_by_dim.setdefault(len(vector), []).append(row)
+        for dim, rows in rows_by_dim.items():
+            indices, signs = self._projection_matrix(seeds_for_dim(dim), dim, steps)
+            for chunk_start in range(0, len(rows), _PROJECTION_BATCH_ROWS):
+                chunk = rows[chunk_start : chunk_start + _PROJECTION_BATCH_ROWS]
+                data = np.array([vectors[row] for row in chunk], dtype=np.float64)
+                means = np.array([self._vector_mean(vectors[row]) for row in chunk], dtype=np.float64)
+                centered = data[:, indices] - means[:, None, None]
+                totals = np.cumsum(centered * signs, axis=2)[:, :, -1]
+                for row, bits in zip(chunk, (totals >= 0.0).tolist()):
+                    output[row] = bits
+        return output
+
     def _pair_allowed_in_map(
         self,
         left_id: str,
@@ -759,7 +1339,6 @@ class IncrementalClusterer:
     def _refresh_neighbors_after_merge(
         self,
         *,
-        active: list[MemoryCluster | None],
         base: MemoryCluster,
         removed_cluster_id: str,
         gate_mode: str,
@@ -768,33 +1347,53 @@ class IncrementalClusterer:
     ) -> None:
         if gate_mode == "none":
             return
-        active_ids = {item.cluster_id for item in active if item is not None}
-
-        def _clean_neighbor_map(mapping: dict[str, set[str]] | None) -> None:
-            if mapping is None:
-                return
-            mapping.pop(removed_cluster_id, None)
-            for cid in list(mapping.keys()):
-                if cid not in active_ids:
-                    mapping.pop(cid, None)
-                    continue
-                mapping[cid].discard(removed_cluster_id)
-                mapping[cid] = {peer for peer in mapping[cid] if peer in active_ids and peer != cid}
-
+        touched = 0
         if gate_mode in {"candidate_filter", "hybrid"} and candidate_state is not None:
+            touched += self._unlink_neighbor_references(candidate_state, removed_cluster_id)
             self._candidate_state_drop_cluster(candidate_state, removed_cluster_id)
             self._candidate_state_upsert_cluster(candidate_state, base.cluster_id, base.centroid or [])
-            _clean_neighbor_map(candidate_state.neighbors)
-            candidate_state.neighbors[base.cluster_id] = self._build_candidate_neighbors_from_state(
-                base.cluster_id,
+            self._replace_neighbor_set(
                 candidate_state,
+                base.cluster_id,
+                self._build_candidate_neighbors_from_state(base.cluster_id, candidate_state),
             )
+            touched += 1
 
         if gate_mode in {"ann", "hybrid"} and ann_state is not None:
+            touched += self._unlink_neighbor_references(ann_state, removed_cluster_id)
             self._ann_state_drop_cluster(ann_state, removed_cluster_id)
             self._ann_state_upsert_cluster(ann_state, base.cluster_id, base.centroid or [])
-            _clean_neighbor_map(ann_state.neighbors)
-            ann_state.neighbors[base.cluster_id] = self._build_ann_neighbors_from_state(base.cluster_id, ann_state)
+            self._replace_neighbor_set(
+                ann_state,
+                base.cluster_id,
+                self._build_ann_neighbors_from_state(base.cluster_id, ann_state),
+            )
+            touched += 1
+        self.merge_neighbor_sets_touched += touched
+        self.merge_neighbor_sets_touched_max = max(self.merge_neighbor_sets_touched_max, touched)
+
+    def _replace_neighbor_set(self, state: _CandidateState | _AnnState, cluster_id: str, peers: set[str]) -> None:
+        for peer in state.neighbors.get(cluster_id, ()):
+            referrers = state.reverse_neighbors.get(peer)
+            if referrers is not None:
+                referrers.discard(cluster_id)
+        state.neighbors[cluster_id] = peers
+        for peer in peers:
+            state.reverse_neighbors.setdefault(peer, set()).add(cluster_id)
+
+    def _unlink_neighbor_references(self, state: _CandidateState | _AnnState, cluster_id: str) -> int:
+        """Drop ``cluster_id`` from every neighbor set naming it, plus its own set; returns sets edited."""
+        touched = 0
+        for referrer in state.reverse_neighbors.pop(cluster_id, ()):
+            peers = state.neighbors.get(referrer)
+            if peers is not None and cluster_id in peers:
+                peers.discard(cluster_id)
+                touched += 1
+        for peer in state.neighbors.pop(cluster_id, ()):
+            referrers = state.reverse_neighbors.get(peer)
+            if referrers is not None:
+                referrers.discard(cluster_id)
+        return touched
 
     def _compute_candidate_neighbors_for_cluster(
         self,
@@ -802,23 +1401,7 @@ class IncrementalClusterer:
         base: MemoryCluster,
         clusters: list[MemoryCluster],
     ) -> set[str]:
-        signatures_by_id: dict[str, tuple[int, ...]] = {}
-        bucket_to_ids: dict[tuple[int, ...], set[str]] = {}
-        centroids_by_id: dict[str, list[float]] = {}
-        for cluster in clusters:
-            cid = cluster.cluster_id
-            centroid = cluster.centroid or []
-            centroids_by_id[cid] = centroid
-            signature = self._candidate_signature(centroid)
-            signatures_by_id[cid] = signature
-            bucket_to_ids.setdefault(signature, set()).add(cid)
-
-        state = _CandidateState(
-            signatures_by_id=signatures_by_id,
-            bucket_to_ids=bucket_to_ids,
-            centroids_by_id=centroids_by_id,
-            neighbors={},
-        )
+        state = self._new_candidate_state(clusters)
         if base.cluster_id not in state.signatures_by_id:
             return set()
         return self._build_candidate_neighbors_from_state(base.cluster_id, state)
@@ -827,17 +1410,13 @@ class IncrementalClusterer:
         self,
         *,
         base_cluster_id: str,
-        signature: tuple[int, ...],
-        bucket_to_ids: dict[tuple[int, ...], set[str]],
-        max_hamming_distance: int,
+        signature: int,
+        state: _CandidateState,
     ) -> list[str]:
-        if not signature:
-            return []
-        keys = self._hamming_neighbor_signatures(signature, max_hamming_distance)
         output: list[str] = []
         seen: set[str] = set()
-        for key in keys:
-            for peer_id in bucket_to_ids.get(key, []):
+        for key in state.index.query(signature):
+            for peer_id in state.bucket_to_ids.get(key, []):
                 if peer_id == base_cluster_id or peer_id in seen:
                     continue
                 seen.add(peer_id)
@@ -854,14 +1433,10 @@ class IncrementalClusterer:
         ann_signature_cache: dict[str, list[int]] | None = None,
     ) -> set[str]:
         signatures_by_id = {cid: list(values) for cid, values in (ann_signature_cache or {}).items()}
-        vectors_by_id: dict[str, list[float]] = {}
-        for cluster in clusters:
-            cid = cluster.cluster_id
-            vectors_by_id[cid] = cluster.centroid or []
-            if cid not in signatures_by_id:
-                signatures_by_id[cid] = [
-                    self._ann_signature(cluster.centroid or [], table_idx) for table_idx in range(self.merge_ann_num_tables)
-                ]
+        vectors_by_id: dict[str, list[float]] = {cluster.cluster_id: cluster.centroid or [] for cluster in clusters}
+        unsigned = [cid for cid in vectors_by_id if cid not in signatures_by_id]
+        for cid, row in zip(unsigned, self._ann_signature_rows([vectors_by_id[cid] for cid in unsigned])):
+            signatures_by_id[cid] = row
         state = _AnnState(
             signatures_by_id=signatures_by_id,
             tables=self._build_ann_tables(signatures_by_id),
@@ -908,16 +1483,60 @@ class IncrementalClusterer:
         self,
         cluster: MemoryCluster,
         fragment_lookup: dict[str, MemoryFragment],
-    ) -> dict[str, set[str]]:
-        profile: dict[str, set[str]] = {}
-        for fid in cluster.fragment_ids:
-            fragment = fragment_lookup.get(fid)
+    ) -> dict[str, dict[str, int]]:
+        """Slot -> value -> member count, cached per cluster for ``fragment_lookup``."""
+        if fragment_lookup is not self._slot_profile_lookup:
+            self._slot_profiles.clear()
+            self._slot_profile_lookup = fragment_lookup
+        profile = self._current_slot_profile(cluster)
+        if profile is None:
+            profile = {}
+            self._add_slot_counts(profile, cluster.fragment_ids)
+            self._slot_profiles[cluster.cluster_id] = (cluster.version, len(cluster.fragment_ids), profile)
+        return profile
+
+    def _current_slot_profile(self, cluster: MemoryCluster) -> dict[str, dict[str, int]] | None:
+        cached = self._slot_profiles.get(cluster.cluster_id)
+        if cached is None or cached[0] != cluster.version or cached[1] != len(cluster.fragment_ids):
+            return None
+        return cached[2]
+
+    def _advance_slot_profile(
+        self,
+        cluster: MemoryCluster,
+        *,
+        previous: tuple[int, int],
+        added: list[str] | None = None,
+        added_profile: dict[str, dict[str, int]] | None = None,
+    ) -> None:
+        # Only a profile that matched the cluster right before this change can
+        # be advanced; anything else is dropped and rebuilt on next use.
+        cached = self._slot_profiles.get(cluster.cluster_id)
+        if cached is None:
+            return
+        if (cached[0], cached[1]) != previous:
+            self._slot_profiles.pop(cluster.cluster_id, None)
+            return
+        profile = cached[2]
+        if added:
+            self._add_slot_counts(profile, added)
+        if added_profile:
+            for slot, values in added_profile.items():
+                counts = profile.setdefault(slot, {})
+                for value, count in values.items():
+                    counts[value] = counts.get(value, 0) + count
+        self._slot_profiles[cluster.cluster_id] = (cluster.version, len(cluster.fragment_ids), profile)
+
+    def _add_slot_counts(self, profile: dict[str, dict[str, int]], fragment_ids: list[str]) -> None:
+        lookup = self._slot_profile_lookup or {}
+        for fid in fragment_ids:
+            fragment = lookup.get(fid)
             if fragment is None:
                 continue
-            slots = self._extract_slots(fragment)
-            for slot, values in slots.items():
-                profile.setdefault(slot, set()).update(values)
-        return profile
+            for slot, values in self._extract_slots(fragment).items():
+                counts = profile.setdefault(slot, {})
+                for value in values:
+                    counts[value] = counts.get(value, 0) + 1
 
     def _conflict_compatibility(
         self,
@@ -927,18 +1546,23 @@ class IncrementalClusterer:
     ) -> float:
         profile_a = self._slot_profile(cluster_a, fragment_lookup)
         profile_b = self._slot_profile(cluster_b, fragment_lookup)
-        overlap = sorted(set(profile_a.keys()).intersection(profile_b.keys()))
+        if len(profile_b) < len(profile_a):
+            overlap = sorted(slot for slot in profile_b if slot in profile_a)
+        else:
+            overlap = sorted(slot for slot in profile_a if slot in profile_b)
         if not overlap:
             return 1.0
 
         scores: list[float] = []
         for slot in overlap:
-            set_a = profile_a.get(slot) or set()
-            set_b = profile_b.get(slot) or set()
-            if not set_a or not set_b:
+            values_a = profile_a[slot]
+            values_b = profile_b[slot]
+            if not values_a or not values_b:
                 continue
-            inter = len(set_a.intersection(set_b))
-            union = len(set_a.union(set_b))
+            if len(values_b) < len(values_a):
+                values_a, values_b = values_b, values_a
+            inter = sum(1 for value in values_a if value in values_b)
+            union = len(values_a) + len(values_b) - inter
             if union == 0:
                 continue
             score = inter / float(union)
@@ -1,12 +1,18 @@
 ﻿from __future__ import annotations
 
+import copy
+import hashlib
+import json
+import random
 import re
 from collections import defaultdict
-from typing import Any, Iterable
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
 
 from .embed import tokenize
 from .models import ConflictRecord, MemoryCluster, MemoryFragment, utc_now_iso
 from .preference import PreferenceDecision, PreferencePolicyEngine
+from .time_utils import timestamp_sort_key
 
 
 KEY_VALUE_PATTERN = re.compile(r"([A-Za-z_\u4e00-\u9fff][\w\u4e00-\u9fff]{0,32})\s*[:=：]\s*([^\s,;，；]{1,64})")
@@ -36,6 +42,16 @@ DOUBLE_NEGATION_PREFIX_PATTERN = re.compile(
     r"(?:\b(?:not|never|don't|dont|do\s+not)\s*$|(?:\u4e0d\u8981|\u522b|\u52ff|\u4e0d\u53ef|\u4e0d\u8be5|\u4e0d\u662f)\s*$)",
     re.IGNORECASE,
 )
+# Literal triggers per pattern family: every pattern of a family needs one of
+# its triggers to match, so text without any trigger can skip the family.
+# Triggers reuse the family's IGNORECASE flag so case folding is identical.
+_SLOT_FAMILY_TRIGGERS = {
+    "conditional": re.compile(r"如果|若|假如|当|if|when", re.IGNORECASE),
+    "counterfactual": re.compile(r"本应|本来|本该|理应|要是当时|如果当时|should|would", re.IGNORECASE),
+    "negation": re.compile(r"不|非|not|!=|≠", re.IGNORECASE),
+    "key_value": re.compile(r"[:=：]"),
+    "flag": re.compile(r"启用|开启|使用|支持|禁用|关闭|able|use", re.IGNORECASE),
+}
 _EN_SLOT_COREFERENCE_ALIASES = {"it", "this", "that", "its", "this_setting", "that_setting"}
 _ZH_SLOT_COREFERENCE_ALIASES = {
     "\u5b83",  # 它
@@ -49,6 +65,58 @@ _ZH_SLOT_COREFERENCE_ALIASES = {
 _SLOT_BLOCKLIST = {"if", "when", "then", "and", "or", "not", "true", "false"}
 _FLAG_NAME_BLOCKLIST = {"if", "when", "then", "and", "or", "not", "do", "dont", "don't", "use"}
 _TRAILING_VALUE_PUNCT = ".,;:!?，；。！？)]}）】>\"'"
+SEMANTIC_DEDUP_MODES = ("exact", "lsh")
+# Bump whenever _extract_slot_values can return different pairs for the same
+# fragment; persisted slot caches written under another version are ignored.
+SLOT_EXTRACTOR_VERSION = 1
+# Bump whenever compress can produce different output for the same inputs;
+# persisted compression caches written under another version are ignored.
+COMPRESSION_CACHE_VERSION = 2
+_COMPRESSED_FIELDS = ("backrefs", "consensus", "conflict_graph", "split_groups", "summary", "tags", "version")
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_SEED = 0x5EED_D3D0
+# Below this many fragments the pairwise scan is cheaper than signing.
+_LSH_MIN_FRAGMENTS = 64
+
+
+@dataclass
+class SlotPrefilterStats:
+    scanned: dict[str, int] = field(default_factory=lambda: dict.fromkeys(_SLOT_FAMILY_TRIGGERS, 0))
+    skipped: dict[str, int] = field(default_factory=lambda: dict.fromkeys(_SLOT_FAMILY_TRIGGERS, 0))
+
+    def reset(self) -> None:
+        for family in _SLOT_FAMILY_TRIGGERS:
+            self.scanned[family] = 0
+            self.skipped[family] = 0
+
+    def record(self, active: dict[str, bool]) -> None:
+        for family, hit in active.items():
+            if hit:
+                self.scanned[family] += 1
+            else:
+                self.skipped[family] += 1
+
+    def add(self, other: "SlotPrefilterStats") -> None:
+        for family in _SLOT_FAMILY_TRIGGERS:
+            self.scanned[family] += other.scanned[family]
+            self.skipped[family] += other.skipped[family]
+
+    def to_dict(self) -> dict[str, dict[str, float | int]]:
+        output: dict[str, dict[str, float | int]] = {}
+        for family in _SLOT_FAMILY_TRIGGERS:
+            scanned = int(self.scanned[family])
+            skipped = int(self.skipped[family])
+            total = scanned + skipped
+            output[family] = {
+                "scanned": scanned,
+                "skipped": skipped,
+                "skip_rate": round(skipped / float(total), 6) if total else 0.0,
+            }
+        return output
+
+
+def _active_slot_families(content: str) -> dict[str, bool]:
+    return {family: trigger.search(content) is not None for family, trigger in _SLOT_FAMILY_TRIGGERS.items()}
 
 
 def _normalize_text(text: str) -> str:
@@ -67,6 +135,19 @@ def _token_jaccard(tokens_a: Iterable[str], tokens_b: Iterable[str]) -> float:
     return inter / union
 
 
+def _minhash_params(count: int) -> list[tuple[int, int]]:
+    rng = random.Random(_MINHASH_SEED)
+    return [(rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME)) for _ in range(count)]
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _minhash_signature(token_hashes: list[int], params: list[tuple[int, int]]) -> list[int]:
+    return [min((a * value + b) % _MINHASH_PRIME for value in token_hashes) for a, b in params]
+
+
 def _clean_value(raw: str) -> str:
     text = (raw or "").strip()
     return text.rstrip(_TRAILING_VALUE_PUNCT)
@@ -128,11 +209,19 @@ def _is_valid_slot_name(slot: str) -> bool:
     return token.lower() not in _SLOT_BLOCKLIST
 
 
-def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
+def _extract_slot_values(
+    fragment: MemoryFragment, *, prefilter: bool = True, stats: SlotPrefilterStats | None = None
+) -> list[tuple[str, str]]:
     pairs: list[tuple[str, str]] = []
     content = fragment.content or ""
     masked_spans: list[tuple[int, int]] = []
     last_global_slot = ""
+    if prefilter:
+        active = _active_slot_families(content)
+        if stats is not None:
+            stats.record(active)
+    else:
+        active = dict.fromkeys(_SLOT_FAMILY_TRIGGERS, True)
 
     def _in_masked_spans(start: int, end: int) -> bool:
         for left, right in masked_spans:
@@ -147,6 +236,8 @@ def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
         slot_prefix: str = "",
         local_mask_spans: list[tuple[int, int]] | None = None,
     ) -> None:
+        if not active["flag"]:
+            return
         neg_spans: list[tuple[int, int]] = []
         for pattern in (NEGATIVE_FLAG_PATTERN, NEGATIVE_FLAG_EN_PATTERN):
             for match in pattern.finditer(text):
@@ -183,10 +274,12 @@ def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
         if local_mask_spans is not None:
             local_mask_spans.extend(neg_spans)
 
-    for pattern, slot_prefix in (
-        (CONDITIONAL_SCOPE_PATTERN, "cond:"),
-        (COUNTERFACTUAL_SCOPE_PATTERN, "cf:"),
+    for pattern, slot_prefix, family in (
+        (CONDITIONAL_SCOPE_PATTERN, "cond:", "conditional"),
+        (COUNTERFACTUAL_SCOPE_PATTERN, "cf:", "counterfactual"),
     ):
+        if not active[family]:
+            continue
         for match in pattern.finditer(content):
             raw_scoped_text = match.group(1) or ""
             scoped_candidate = _slice_conditional_scope(raw_scoped_text) if slot_prefix == "cond:" else raw_scoped_text
@@ -199,7 +292,8 @@ def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
             scoped_span_end = scoped_span_start + len(scoped_text)
             scoped_mask_spans: list[tuple[int, int]] = []
             last_scoped_slot = ""
-            for neg_start, neg_end, raw_slot, raw_value in _collect_negated_matches(scoped_text):
+            scoped_negations = _collect_negated_matches(scoped_text) if active["negation"] else []
+            for neg_start, neg_end, raw_slot, raw_value in scoped_negations:
                 slot = _resolve_slot_name(raw_slot, last_scoped_slot)
                 if not _is_valid_slot_name(slot):
                     continue
@@ -207,7 +301,7 @@ def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
                 scoped_mask_spans.append((scoped_span_start + neg_start, scoped_span_start + neg_end))
                 pairs.append((f"{slot_prefix}{slot}", f"!{value}"))
                 last_scoped_slot = slot
-            for scoped in KEY_VALUE_PATTERN.finditer(scoped_text):
+            for scoped in KEY_VALUE_PATTERN.finditer(scoped_text) if active["key_value"] else ():
                 scoped_start = scoped_span_start + scoped.start()
                 scoped_end = scoped_span_start + scoped.end()
                 if _in_masked_spans(scoped_start, scoped_end):
@@ -227,7 +321,7 @@ def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
             masked_spans.extend(scoped_mask_spans)
             masked_spans.append((scoped_span_start, scoped_span_end))
 
-    for neg_start, neg_end, raw_slot, raw_value in _collect_negated_matches(content):
+    for neg_start, neg_end, raw_slot, raw_value in _collect_negated_matches(content) if active["negation"] else ():
         if _in_masked_spans(neg_start, neg_end):
             continue
         slot = _resolve_slot_name(raw_slot, last_global_slot)
@@ -238,7 +332,7 @@ def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
         pairs.append((slot, f"!{value}"))
         last_global_slot = slot
 
-    for match in KEY_VALUE_PATTERN.finditer(content):
+    for match in KEY_VALUE_PATTERN.finditer(content) if active["key_value"] else ():
         if _in_masked_spans(match.start(), match.end()):
             continue
         slot = _resolve_slot_name(match.group(1), last_global_slot)
@@ -264,12 +358,64 @@ def _extract_slot_values(fragment: MemoryFragment) -> list[tuple[str, str]]:
     return pairs
 
 
+def slot_cache_key(fragment: MemoryFragment) -> str:
+    """Content digest + digest of the meta slots/flags that ``_extract_slot_values`` reads."""
+    content_digest = hashlib.blake2b((fragment.content or "").encode("utf-8"), digest_size=16).hexdigest()
+    extra = fragment.meta.get("slots")
+    flags = fragment.meta.get("flags")
+    meta_parts = [
+        [[str(slot), str(value)] for slot, value in extra.items()] if isinstance(extra, dict) else None,
+        [[str(key).strip().lower(), bool(value)] for key, value in flags.items()] if isinstance(flags, dict) else None,
+    ]
+    meta_digest = hashlib.blake2b(
+        json.dumps(meta_parts, ensure_ascii=False).encode("utf-8"),
+        digest_size=8,
+    ).hexdigest()
+    return f"{content_digest}{meta_digest}"
+
+
 class ClusterCompressor:
     """Compress cluster members with consensus + conflict preservation."""
 
-    def __init__(self, semantic_dedup_threshold: float = 0.88, strict_conflict_split: bool = False) -> None:
+    def __init__(
+        self,
+        semantic_dedup_threshold: float = 0.88,
+        strict_conflict_split: bool = False,
+        semantic_dedup_mode: str = "exact",
+        lsh_bands: int = 16,
+        lsh_rows: int = 4,
+        slot_cache: Any | None = None,
+        compression_cache: Any | None = None,
+    ) -> None:
+        if semantic_dedup_mode not in SEMANTIC_DEDUP_MODES:
+            raise ValueError(f"unknown semantic_dedup_mode: {semantic_dedup_mode}")
         self.semantic_dedup_threshold = semantic_dedup_threshold
         self.strict_conflict_split = strict_conflict_split
+        self.semantic_dedup_mode = semantic_dedup_mode
+        self.lsh_bands = max(1, int(lsh_bands))
+        self.lsh_rows = max(1, int(lsh_rows))
+        self._minhash_params = _minhash_params(self.lsh_bands * self.lsh_rows)
+        self.dedup_candidates_checked = 0
+        self.dedup_pairs_skipped = 0
+        # Optional persistent store with get(key)/put(key, pairs), e.g. cache.SlotExtractionCache;
+        # without one, extractions are memoized for the lifetime of this compressor.
+        self.slot_cache = slot_cache
+        self._slot_memo: dict[str, tuple[tuple[str, str], ...]] = {}
+        # (key, pairs, prefilter counts of the extraction) per lookup while set;
+        # lets a parallel build replay worker lookups in order.
+        self._slot_trace: list[tuple[str, tuple[tuple[str, str], ...], SlotPrefilterStats]] | None = None
+        self.slot_cache_hits = 0
+        self.slot_cache_misses = 0
+        self.slot_prefilter_stats = SlotPrefilterStats()
+        # Optional persistent store with get(key)/put(key, payload), e.g. cache.CompressionCache.
+        self.compression_cache = compression_cache
+        self._policy_digest: tuple[str, str] | None = None
+        self.clusters_recompressed = 0
+        self.clusters_reused = 0
+        # cluster_id -> {fragment_id: slot pairs} of unique members, kept for clusters
+        # with more than one split group until their children are compressed.
+        self._split_analysis: dict[str, dict[str, tuple[tuple[str, str], ...]]] = {}
+        self.split_children_reused = 0
 
     def compress(
         self,
@@ -277,27 +423,67 @@ class ClusterCompressor:
         fragments: list[MemoryFragment],
         policy_engine: PreferencePolicyEngine,
         decisions: dict[str, PreferenceDecision],
+        split_from: str | None = None,
     ) -> MemoryCluster:
-        unique_fragments = self._deduplicate(fragments)
-        unique_fragments.sort(key=lambda item: item.timestamp)
+        """
+        Fill the cluster's consensus, conflicts, summary and retention tags.
+
+        ``split_from`` names the parent when compressing a split child. If the
+        parent's analysis is still held and covers every member, the child
+        reuses the parent's slot pairs and skips dedup: the parent's unique
+        members are pairwise non-duplicates, so dedup would keep them all.
+        Analysis is only held for parents deduplicated exactly, since LSH
+        dedup may keep a near-duplicate pair whose bands all missed.
+        """
+        key = self.compression_key(cluster, fragments, policy_engine, decisions)
+        if key is not None and self.apply_cached_compression(cluster, key):
+            return cluster
+        known_pairs = self._split_analysis.get(split_from) if split_from is not None else None
+        if known_pairs is not None and not all(item.id in known_pairs for item in fragments):
+            known_pairs = None
+        if known_pairs is not None:
+            self.split_children_reused += 1
+        self._compress_members(cluster, fragments, policy_engine, decisions, known_pairs, keep_analysis=split_from is None)
+        if key is not None:
+            self.remember_compression(cluster, key)
+        return cluster
+
+    def pop_split_analysis(self, cluster_id: str) -> dict[str, tuple[tuple[str, str], ...]] | None:
+        return self._split_analysis.pop(cluster_id, None)
+
+    def adopt_split_analysis(self, cluster_id: str, analysis: dict[str, tuple[tuple[str, str], ...]] | None) -> None:
+        if analysis is not None:
+            self._split_analysis[cluster_id] = analysis
+
+    def _compress_members(
+        self,
+        cluster: MemoryCluster,
+        fragments: list[MemoryFragment],
+        policy_engine: PreferencePolicyEngine,
+        decisions: dict[str, PreferenceDecision],
+        known_pairs: dict[str, tuple[tuple[str, str], ...]] | None = None,
+        keep_analysis: bool = True,
+    ) -> None:
+        self.clusters_recompressed += 1
+        unique_fragments = list(fragments) if known_pairs is not None else self._deduplicate(fragments)
+        unique_fragments.sort(key=lambda item: timestamp_sort_key(item.timestamp))
         cluster.backrefs = [item.id for item in unique_fragments]
 
         slot_values: dict[str, dict[str, list[str]]] = defaultdict(lambda: defaultdict(list))
-        slot_events: dict[str, list[dict[str, str]]] = defaultdict(list)
+        # (fragment, value) per slot occurrence, already in chronological order.
+        slot_events: dict[str, list[tuple[MemoryFragment, str]]] = defaultdict(list)
+        build_graph = policy_engine.enable_conflict_graph()
+        pairs_by_id: dict[str, tuple[tuple[str, str], ...]] = {}
         for fragment in unique_fragments:
-            for slot, value in _extract_slot_values(fragment):
+            pairs = known_pairs[fragment.id] if known_pairs is not None else self._slot_pairs(fragment)
+            pairs_by_id[fragment.id] = pairs
+            for slot, value in pairs:
                 slot_values[slot][value].append(fragment.id)
-                slot_events[slot].append(
-                    {
-                        "timestamp": fragment.timestamp,
-                        "fragment_id": fragment.id,
-                        "value": value,
-                        "agent_id": fragment.agent_id,
-                    }
-                )
+                if build_graph:
+                    slot_events[slot].append((fragment, value))
 
         conflict_graph: dict[str, Any] = {}
-        if policy_engine.enable_conflict_graph():
+        if build_graph:
             conflict_graph = self._build_conflict_graph(slot_values=slot_values, slot_events=slot_events)
 
         conflicts: list[ConflictRecord] = []
@@ -325,6 +511,8 @@ class ClusterCompressor:
         split_groups: list[dict[str, str | list[str]]] = []
         if self.strict_conflict_split and conflicts:
             split_groups = self._build_split_groups(slot_values=slot_values, conflicts=conflicts)
+        if keep_analysis and len(split_groups) > 1 and not self._uses_lsh_dedup(len(fragments)):
+            self._split_analysis[cluster.cluster_id] = pairs_by_id
 
         fragment_decisions = [decisions[item.id] for item in unique_fragments if item.id in decisions]
         strength = policy_engine.pick_cluster_strength(fragment_decisions)
@@ -360,9 +548,163 @@ class ClusterCompressor:
             cluster.tags["split_recommended"] = True
         cluster.last_updated = utc_now_iso()
         cluster.version += 1
-        return cluster
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {
+            "semantic_dedup_candidates_checked": int(self.dedup_candidates_checked),
+            "semantic_dedup_pairs_skipped": int(self.dedup_pairs_skipped),
+            "slot_cache_hits": int(self.slot_cache_hits),
+            "slot_cache_misses": int(self.slot_cache_misses),
+            "slot_prefilter_scanned": sum(self.slot_prefilter_stats.scanned.values()),
+            "slot_prefilter_skipped": sum(self.slot_prefilter_stats.skipped.values()),
+            "compress_clusters_recompressed": int(self.clusters_recompressed),
+            "compress_clusters_reused": int(self.clusters_reused),
+            "split_children_reused": int(self.split_children_reused),
+        }
+
+    def compression_key(
+        self,
+        cluster: MemoryCluster,
+        fragments: list[MemoryFragment],
+        policy_engine: PreferencePolicyEngine,
+        decisions: dict[str, PreferenceDecision],
+    ) -> str | None:
+        """
+        Digest of everything ``compress`` reads, or None without a compression cache.
+
+        Members are identified by (id, version) in cluster order, since dedup
+        keeps the first of near-duplicates. Each member's decision is part of
+        the key, so a fragment crossing the staleness boundary or a changed
+        source weight invalidates the clusters that contain it.
+        """
+        if self.compression_cache is None:
+            return None
+        if self._policy_digest is None or self._policy_digest[0] != policy_engine.config_digest:
+            settings = policy_engine.config.to_dict()
+            settings.pop("compress_workers", None)
+            options = [
+                self.semantic_dedup_threshold,
+                self.strict_conflict_split,
+                self.semantic_dedup_mode,
+                self.lsh_bands,
+                self.lsh_rows,
+            ]
+            self._policy_digest = (policy_engine.config_digest, json.dumps([settings, options], ensure_ascii=False, sort_keys=True))
+        members = []
+        for fragment in fragments:
+            decision = decisions.get(fragment.id)
+            members.append(
+                [
+                    fragment.id,
+                    int(fragment.version),
+                    None
+                    if decision is None
+                    else [decision.strength, decision.detail_budget, decision.source_weight, decision.stale, decision.reasons],
+                ]
+            )
+        payload = [
+            COMPRESSION_CACHE_VERSION,
+            SLOT_EXTRACTOR_VERSION,
+            self._policy_digest[1],
+            cluster.cluster_id,
+            cluster.version,
+            cluster.tags,
+            cluster.source_distribution,
+            members,
+        ]
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def apply_cached_compression(self, cluster: MemoryCluster, key: str) -> bool:
+        """Restore the compressed fields stored under ``key``; timestamps are refreshed."""
+        cached = self.compression_cache.get(key) if self.compression_cache is not None else None
+        if cached is None:
+            return False
+        now = utc_now_iso()
+        for name in _COMPRESSED_FIELDS:
+            setattr(cluster, name, copy.deepcopy(cached[name]))
+        cluster.conflicts = [ConflictRecord.from_dict({**item, "last_seen": now}) for item in cached["conflicts"]]
+        cluster.last_updated = now
+        self.clusters_reused += 1
+        return True
+
+    def remember_compression(self, cluster: MemoryCluster, key: str) -> None:
+        if self.compression_cache is None:
+            return
+        payload = {name: copy.deepcopy(getattr(cluster, name)) for name in _COMPRESSED_FIELDS}
+        payload["conflicts"] = [item.to_dict() for item in cluster.conflicts]
+        self.compression_cache.put(key, payload)
+
+    def known_slot_pairs(self, keys: Iterable[str]) -> dict[str, tuple[tuple[str, str], ...]]:
+        """Already extracted pairs for ``keys``, without touching the hit/miss counters."""
+        output: dict[str, tuple[tuple[str, str], ...]] = {}
+        for key in keys:
+            pairs = self._slot_memo.get(key) if self.slot_cache is None else self.slot_cache.get(key)
+            if pairs is not None:
+                output[key] = pairs
+        return output
+
+    def seed_slot_pairs(self, pairs_by_key: dict[str, tuple[tuple[str, str], ...]]) -> None:
+        self._slot_memo.update(pairs_by_key)
+
+    def start_slot_trace(self) -> None:
+        self._slot_trace = []
+
+    def pop_slot_trace(self) -> list[tuple[str, tuple[tuple[str, str], ...], SlotPrefilterStats]]:
+        trace = self._slot_trace or []
+        self._slot_trace = None
+        return trace
+
+    def replay_worker_stats(
+        self,
+        slot_trace: list[tuple[str, tuple[tuple[str, str], ...], SlotPrefilterStats]],
+        dedup_stats: dict[str, int],
+    ) -> None:
+        """Account a cluster compressed by another process as if it had been compressed here."""
+        for key, pairs, prefilter in slot_trace:
+            self._resolve_slot_pairs(key, lambda pairs=pairs, prefilter=prefilter: self._replay_extraction(pairs, prefilter))
+        self.dedup_candidates_checked += int(dedup_stats.get("semantic_dedup_candidates_checked") or 0)
+        self.dedup_pairs_skipped += int(dedup_stats.get("semantic_dedup_pairs_skipped") or 0)
+        self.clusters_recompressed += 1
+
+    def _replay_extraction(
+        self, pairs: tuple[tuple[str, str], ...], prefilter: SlotPrefilterStats
+    ) -> tuple[tuple[str, str], ...]:
+        self.slot_prefilter_stats.add(prefilter)
+        return pairs
+
+    def _slot_pairs(self, fragment: MemoryFragment) -> tuple[tuple[str, str], ...]:
+        key = slot_cache_key(fragment)
+        # While tracing, counts go with the lookup and are added only if the replay misses too.
+        prefilter = self.slot_prefilter_stats if self._slot_trace is None else SlotPrefilterStats()
+        pairs = self._resolve_slot_pairs(key, lambda: tuple(_extract_slot_values(fragment, stats=prefilter)))
+        if self._slot_trace is not None:
+            self._slot_trace.append((key, pairs, prefilter))
+        return pairs
+
+    def _resolve_slot_pairs(
+        self,
+        key: str,
+        extract: Callable[[], tuple[tuple[str, str], ...]],
+    ) -> tuple[tuple[str, str], ...]:
+        pairs = self._slot_memo.get(key) if self.slot_cache is None else self.slot_cache.get(key)
+        if pairs is not None:
+            self.slot_cache_hits += 1
+            return pairs
+        self.slot_cache_misses += 1
+        pairs = extract()
+        if self.slot_cache is None:
+            self._slot_memo[key] = pairs
+        else:
+            self.slot_cache.put(key, pairs)
+        return pairs
+
+    def _uses_lsh_dedup(self, count: int) -> bool:
+        return self.semantic_dedup_mode == "lsh" and count >= _LSH_MIN_FRAGMENTS and self.semantic_dedup_threshold > 0.0
 
     def _deduplicate(self, fragments: list[MemoryFragment]) -> list[MemoryFragment]:
+        if self._uses_lsh_dedup(len(fragments)):
+            return self._deduplicate_lsh(fragments)
         seen_text: set[str] = set()
         seen_tokens: list[set[str]] = []
         output: list[MemoryFragment] = []
@@ -377,6 +719,7 @@ class ClusterCompressor:
 
             semantic_duplicate = False
             for existing in seen_tokens:
+                self.dedup_candidates_checked += 1
                 score = _token_jaccard(token_set, existing)
                 if score >= self.semantic_dedup_threshold:
                     semantic_duplicate = True
@@ -389,6 +732,60 @@ class ClusterCompressor:
             output.append(fragment)
         return output
 
+    def _deduplicate_lsh(self, fragments: list[MemoryFragment]) -> list[MemoryFragment]:
+        """
+        Same keep/drop rule as ``_deduplicate``, but exact Jaccard only runs
+        against kept fragments sharing a MinHash band with the current one.
+
+        Pairs at or above the threshold collide in some band with probability
+        ``1 - (1 - J**rows)**bands`` (about 1 - 4e-7 at J=0.88 with the 16x4
+        default), so a near-duplicate is only kept when every band misses.
+        """
+        seen_text: set[str] = set()
+        seen_tokens: list[set[str]] = []
+        band_buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+        hash_by_token: dict[str, int] = {}
+        rows = self.lsh_rows
+        output: list[MemoryFragment] = []
+        for fragment in fragments:
+            key = _normalize_text(fragment.content)
+            if not key:
+                key = fragment.id
+            if key in seen_text:
+                continue
+            token_set = set(tokenize(fragment.content or ""))
+
+            band_keys: list[tuple[int, tuple[int, ...]]] = []
+            if token_set:
+                token_hashes = []
+                for token in token_set:
+                    value = hash_by_token.get(token)
+                    if value is None:
+                        value = hash_by_token[token] = _token_hash(token)
+                    token_hashes.append(value)
+                signature = _minhash_signature(token_hashes, self._minhash_params)
+                band_keys = [
+                    (band, tuple(signature[band * rows : (band + 1) * rows])) for band in range(self.lsh_bands)
+                ]
+            candidates = sorted({idx for band_key in band_keys for idx in band_buckets.get(band_key, ())})
+            self.dedup_pairs_skipped += len(seen_tokens) - len(candidates)
+
+            semantic_duplicate = False
+            for idx in candidates:
+                self.dedup_candidates_checked += 1
+                if _token_jaccard(token_set, seen_tokens[idx]) >= self.semantic_dedup_threshold:
+                    semantic_duplicate = True
+                    break
+            if semantic_duplicate:
+                continue
+
+            seen_text.add(key)
+            for band_key in band_keys:
+                band_buckets.setdefault(band_key, []).append(len(seen_tokens))
+            seen_tokens.append(token_set)
+            output.append(fragment)
+        return output
+
     def _build_split_groups(
         self,
         slot_values: dict[str, dict[str, list[str]]],
@@ -444,16 +841,26 @@ class ClusterCompressor:
         if not include_trace_refs:
             return payload
 
-        # Fill remaining budget with traceable snippets.
+        # Fill remaining budget with traceable snippets, joined once at the end.
+        # Each ref costs its length plus a "|" separator after the first one.
+        remaining = detail_budget - len(payload) - len(";refs=")
         refs: list[str] = []
         for fragment in unique_fragments:
-            snippet = (fragment.content or "").replace("\n", " ").strip()
+            separator = 1 if refs else 0
+            # Shortest possible ref is "<id>:" with an empty snippet.
+            if len(fragment.id) + 1 + separator > remaining:
+                break
+            # strip() before replace() is equivalent, and only the kept prefix is rewritten.
+            snippet = (fragment.content or "").strip()
             if len(snippet) > 28:
-                snippet = snippet[:25] + "..."
-            candidate = payload + ";refs=" + "|".join(refs + [f"{fragment.id}:{snippet}"])
-            if len(candidate) > detail_budget:
+                snippet = snippet[:25].replace("\n", " ") + "..."
+            else:
+                snippet = snippet.replace("\n", " ")
+            ref = f"{fragment.id}:{snippet}"
+            if len(ref) + separator > remaining:
                 break
-            refs.append(f"{fragment.id}:{snippet}")
+            remaining -= len(ref) + separator
+            refs.append(ref)
 
         if refs:
             return payload + ";refs=" + "|".join(refs)
@@ -462,60 +869,67 @@ class ClusterCompressor:
     def _build_conflict_graph(
         self,
         slot_values: dict[str, dict[str, list[str]]],
-        slot_events: dict[str, list[dict[str, str]]],
+        slot_events: dict[str, list[tuple[MemoryFragment, str]]],
     ) -> dict[str, Any]:
+        """
+        Per conflicting slot: value nodes, "switch" edges between consecutive
+        differing values, and a priority score.
+
+        ``slot_events`` must already be in timestamp order (compress feeds it
+        from the sorted unique fragments). Node sources are tracked in a set
+        beside the ordered list; nodes keep first-seen source order.
+        """
         graph: dict[str, Any] = {}
         for slot, value_map in slot_values.items():
             if len(value_map) <= 1:
                 continue
-            events = sorted(slot_events.get(slot) or [], key=lambda row: row.get("timestamp") or "")
             nodes: list[dict[str, Any]] = []
-            node_lookup: dict[str, dict[str, Any]] = {}
+            node_lookup: dict[str, tuple[dict[str, Any], set[str]]] = {}
+            all_evidences: set[str] = set()
+            dominant_value = ""
+            dominant_count = -1
             for value, evidences in value_map.items():
+                unique_evidences = set(evidences)
+                all_evidences.update(unique_evidences)
                 node = {
                     "value": value,
-                    "evidence_count": len(set(evidences)),
-                    "evidences": sorted(set(evidences)),
+                    "evidence_count": len(unique_evidences),
+                    "evidences": sorted(unique_evidences),
                     "sources": [],
                     "last_seen": "",
                 }
-                node_lookup[value] = node
+                node_lookup[value] = (node, set())
                 nodes.append(node)
+                if len(unique_evidences) > dominant_count:
+                    dominant_count = len(unique_evidences)
+                    dominant_value = value
 
             edges: list[dict[str, str]] = []
             previous_value = ""
-            for event in events:
-                value = str(event.get("value") or "")
-                if value not in node_lookup:
-                    continue
-                node = node_lookup[value]
-                agent_id = str(event.get("agent_id") or "")
-                if agent_id and agent_id not in node["sources"]:
+            for fragment, value in slot_events.get(slot) or ():
+                node, seen_sources = node_lookup[value]
+                agent_id = str(fragment.agent_id or "")
+                if agent_id and agent_id not in seen_sources:
+                    seen_sources.add(agent_id)
                     node["sources"].append(agent_id)
-                node["last_seen"] = str(event.get("timestamp") or node["last_seen"])
+                timestamp = fragment.timestamp
+                if timestamp:
+                    node["last_seen"] = str(timestamp)
 
                 if previous_value and previous_value != value:
                     edges.append(
                         {
                             "from": previous_value,
                             "to": value,
-                            "fragment_id": str(event.get("fragment_id") or ""),
-                            "timestamp": str(event.get("timestamp") or ""),
+                            "fragment_id": str(fragment.id or ""),
+                            "timestamp": str(timestamp or ""),
                             "kind": "switch",
                         }
                     )
                 previous_value = value
 
-            dominant_value = ""
-            dominant_count = -1
-            for node in nodes:
-                count = int(node.get("evidence_count") or 0)
-                if count > dominant_count:
-                    dominant_count = count
-                    dominant_value = str(node.get("value") or "")
-
             transition_count = len(edges)
-            evidence_count = len({e for evidences in value_map.values() for e in evidences})
+            evidence_count = len(all_evidences)
             priority = round((len(value_map) * 2.0) + (transition_count * 1.2) + (evidence_count * 0.3), 3)
             graph[slot] = {
                 "nodes": nodes,
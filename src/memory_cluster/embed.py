@@ -1,19 +1,83 @@
 from __future__ import annotations
 
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
 import math
 import re
+import threading
 from abc import ABC, abstractmethod
 from hashlib import blake2b
+from typing import Iterable
+
+try:  # NumPy is optional; only embed_matrix needs it.
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only on numpy-less installs
+    np = None
 
 
 TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_\u4e00-\u9fff]+")
+# Bump whenever HashEmbeddingProvider can return a different vector for the same
+# text; persisted embedding caches written under another version are discarded.
+HASH_EMBEDDING_VERSION = 1
 
 
 def tokenize(text: str) -> list[str]:
     return [m.group(0).lower() for m in TOKEN_PATTERN.finditer(text or "")]
 
 
-def cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
+@dataclass(eq=False)
+class SparseVector:
+    """
+    Sparse embedding: sorted bucket indices with their non-zero values.
+
+    ``len()`` reports the logical dimension so it can stand in for a dense
+    list wherever only the width is inspected.
+    """
+
+    dim: int
+    indices: array
+    values: array
+
+    @classmethod
+    def from_pairs(cls, dim: int, pairs: Iterable[tuple[int, float]]) -> "SparseVector":
+        rows = sorted((int(idx), float(value)) for idx, value in pairs if value != 0.0)
+        return cls(
+            dim=int(dim),
+            indices=array("I", (idx for idx, _ in rows)),
+            values=array("d", (value for _, value in rows)),
+        )
+
+    @classmethod
+    def from_dense(cls, vector: list[float]) -> "SparseVector":
+        return cls.from_pairs(len(vector), ((idx, value) for idx, value in enumerate(vector)))
+
+    def to_dense(self) -> list[float]:
+        vector = [0.0] * self.dim
+        for idx, value in zip(self.indices, self.values):
+            vector[idx] = value
+        return vector
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def __len__(self) -> int:
+        return self.dim
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SparseVector):
+            return NotImplemented
+        return self.dim == other.dim and self.indices == other.indices and self.values == other.values
+
+
+def cosine_similarity(vec_a: list[float] | SparseVector, vec_b: list[float] | SparseVector) -> float:
+    if isinstance(vec_a, SparseVector):
+        if isinstance(vec_b, SparseVector):
+            return sparse_cosine_similarity(vec_a, vec_b)
+        return sparse_dense_cosine_similarity(vec_a, vec_b)
+    if isinstance(vec_b, SparseVector):
+        return sparse_dense_cosine_similarity(vec_b, vec_a)
     if not vec_a or not vec_b:
         return 0.0
     length = min(len(vec_a), len(vec_b))
@@ -25,6 +89,135 @@ def cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
     return dot / (norm_a * norm_b)
 
 
+# The sparse kernels visit non-zero entries in ascending index order. Skipped
+# zero terms cannot change a running float sum, so they return exactly what
+# the dense kernel returns for the densified inputs.
+def sparse_cosine_similarity(vec_a: SparseVector, vec_b: SparseVector) -> float:
+    length = min(vec_a.dim, vec_b.dim)
+    if length <= 0:
+        return 0.0
+    idx_a, val_a = vec_a.indices, vec_a.values
+    idx_b, val_b = vec_b.indices, vec_b.values
+    dot = 0.0
+    i = 0
+    j = 0
+    while i < len(idx_a) and j < len(idx_b):
+        left = idx_a[i]
+        right = idx_b[j]
+        if left >= length or right >= length:
+            break
+        if left == right:
+            dot += val_a[i] * val_b[j]
+            i += 1
+            j += 1
+        elif left < right:
+            i += 1
+        else:
+            j += 1
+    norm_a = _sparse_norm(vec_a, length)
+    norm_b = _sparse_norm(vec_b, length)
+    if norm_a == 0.0 or norm_b == 0.0:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def sparse_dense_cosine_similarity(
+    sparse: SparseVector,
+    dense: list[float],
+    dense_norm: float | None = None,
+) -> float:
+    """Cosine of a sparse and a dense vector; ``dense_norm`` may carry a cached full-length norm."""
+    if not sparse.dim or not dense:
+        return 0.0
+    length = min(sparse.dim, len(dense))
+    dot = 0.0
+    for idx, value in zip(sparse.indices, sparse.values):
+        if idx >= length:
+            break
+        dot += value * dense[idx]
+    norm_a = _sparse_norm(sparse, length)
+    if dense_norm is None or length != len(dense):
+        dense_norm = math.sqrt(sum(dense[i] * dense[i] for i in range(length)))
+    if norm_a == 0.0 or dense_norm == 0.0:
+        return 0.0
+    return dot / (norm_a * dense_norm)
+
+
+def _sparse_norm(vector: SparseVector, length: int) -> float:
+    total = 0.0
+    for idx, value in zip(vector.indices, vector.values):
+        if idx >= length:
+            break
+        total += value * value
+    return math.sqrt(total)
+
+
+def _token_hash(token: str) -> int:
+    digest = blake2b(token.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, byteorder="big", signed=False)
+
+
+class TokenHashCache:
+    """
+    Bounded, thread-safe LRU memo of token -> 64-bit blake2b value.
+
+    The cached value is independent of the embedding dim, so one cache can be
+    shared by every HashEmbeddingProvider in the process (build and query).
+    """
+
+    def __init__(self, max_entries: int = 65536) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._values: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, token: str) -> int:
+        with self._lock:
+            value = self._values.get(token)
+            if value is not None:
+                self._values.move_to_end(token)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = _token_hash(token)
+        if self.max_entries <= 0:
+            return value
+        with self._lock:
+            self._values[token] = value
+            self._values.move_to_end(token)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def snapshot_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "token_cache_size": len(self._values),
+                "token_cache_max_entries": int(self.max_entries),
+                "token_cache_hits": int(self.hits),
+                "token_cache_misses": int(self.misses),
+                "token_cache_evictions": int(self.evictions),
+            }
+
+
+_SHARED_TOKEN_CACHE = TokenHashCache()
+
+
+def shared_token_cache() -> TokenHashCache:
+    """Process-wide token cache used by providers created without an explicit one."""
+    return _SHARED_TOKEN_CACHE
+
+
 class EmbeddingProvider(ABC):
     @abstractmethod
     def embed(self, text: str) -> list[float]:
@@ -33,6 +226,12 @@ class EmbeddingProvider(ABC):
     def embed_many(self, texts: list[str]) -> list[list[float]]:
         return [self.embed(text) for text in texts]
 
+    def embed_sparse(self, text: str) -> SparseVector:
+        return SparseVector.from_dense(self.embed(text))
+
+    def embed_many_sparse(self, texts: list[str]) -> list[SparseVector]:
+        return [self.embed_sparse(text) for text in texts]
+
 
 class HashEmbeddingProvider(EmbeddingProvider):
     """
@@ -41,24 +240,65 @@ class HashEmbeddingProvider(EmbeddingProvider):
     It maps tokens to a fixed-size vector via stable hashing.
     """
 
-    def __init__(self, dim: int = 256) -> None:
+    def __init__(self, dim: int = 256, token_cache: TokenHashCache | None = None) -> None:
         if dim <= 0:
             raise ValueError("dim must be > 0")
         self.dim = dim
+        self.token_cache = token_cache if token_cache is not None else shared_token_cache()
 
     def _index(self, token: str) -> int:
-        digest = blake2b(token.encode("utf-8"), digest_size=8).digest()
-        value = int.from_bytes(digest, byteorder="big", signed=False)
-        return value % self.dim
+        return self.token_cache.lookup(token) % self.dim
 
     def embed(self, text: str) -> list[float]:
-        tokens = tokenize(text)
-        vector = [0.0] * self.dim
-        if not tokens:
-            return vector
-        for token in tokens:
-            vector[self._index(token)] += 1.0
-        norm = math.sqrt(sum(v * v for v in vector))
-        if norm == 0.0:
-            return vector
-        return [v / norm for v in vector]
+        return self.embed_sparse(text).to_dense()
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return [vector.to_dense() for vector in self.embed_many_sparse(texts)]
+
+    def embed_sparse(self, text: str) -> SparseVector:
+        return self._sparse_from_indices([self._index(token) for token in tokenize(text)])
+
+    def embed_many_sparse(self, texts: list[str]) -> list[SparseVector]:
+        return [self._sparse_from_indices(row) for row in self._batch_indices(texts)]
+
+    def embed_matrix(self, texts: list[str]) -> "np.ndarray":
+        """Embed a batch into a dense ``(len(texts), dim)`` float32 array."""
+        if np is None:
+            raise RuntimeError("embed_matrix requires numpy")
+        rows = self._batch_indices(texts)
+        matrix = np.zeros((len(rows), self.dim), dtype=np.float32)
+        row_ids = np.repeat(np.arange(len(rows)), [len(row) for row in rows])
+        col_ids = np.fromiter((idx for row in rows for idx in row), dtype=np.int64, count=len(row_ids))
+        np.add.at(matrix, (row_ids, col_ids), 1.0)
+        norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+        np.divide(matrix, norms[:, None], out=matrix, where=norms[:, None] > 0.0)
+        return matrix
+
+    def _batch_indices(self, texts: list[str]) -> list[list[int]]:
+        # Tokenize the whole batch up front and hash each distinct token once.
+        index_by_token: dict[str, int] = {}
+        rows: list[list[int]] = []
+        for text in texts:
+            row: list[int] = []
+            for token in tokenize(text):
+                idx = index_by_token.get(token)
+                if idx is None:
+                    idx = self._index(token)
+                    index_by_token[token] = idx
+                row.append(idx)
+            rows.append(row)
+        return rows
+
+    def _sparse_from_indices(self, indices: list[int]) -> SparseVector:
+        counts: dict[int, float] = {}
+        for idx in indices:
+            counts[idx] = counts.get(idx, 0.0) + 1.0
+        occupied = sorted(counts)
+        # Zero buckets add nothing to the squared sum, so summing the occupied
+        # buckets in index order reproduces the full dense norm bit-for-bit.
+        norm = math.sqrt(sum(counts[idx] * counts[idx] for idx in occupied))
+        return SparseVector(
+            dim=self.dim,
+            indices=array("I", occupied),
+            values=array("d", (counts[idx] / norm for idx in occupied)),
+        )
@@ -137,6 +137,7 @@ class PreferenceConfig:
     source_promote_threshold: float = 1.5
     source_demote_threshold: float = 0.8
     semantic_dedup_threshold: float = 0.88
+    semantic_dedup_mode: str = "exact"
     enable_l2_clusters: bool = False
     l2_min_children: int = 2
     enable_conflict_graph: bool = False
@@ -162,6 +163,8 @@ class PreferenceConfig:
     merge_ann_max_neighbors: int = 48
     merge_ann_score_dims: int = 32
     merge_ann_projection_steps: int = 32
+    enable_merge_heap: bool = False
+    compress_workers: int = 1
     hard_keep_tags: list[str] = field(default_factory=list)
     protected_path_prefixes: list[str] = field(default_factory=list)
     protected_scopes: list[str] = field(default_factory=lambda: ["global_task", "current_task"])
@@ -178,6 +181,7 @@ class PreferenceConfig:
             source_promote_threshold=float(data.get("source_promote_threshold", 1.5)),
             source_demote_threshold=float(data.get("source_demote_threshold", 0.8)),
             semantic_dedup_threshold=float(data.get("semantic_dedup_threshold", 0.88)),
+            semantic_dedup_mode="lsh" if str(data.get("semantic_dedup_mode") or "").strip().lower() == "lsh" else "exact",
             enable_l2_clusters=bool(data.get("enable_l2_clusters", False)),
             l2_min_children=max(2, int(data.get("l2_min_children", 2))),
             enable_conflict_graph=bool(data.get("enable_conflict_graph", False)),
@@ -203,6 +207,8 @@ class PreferenceConfig:
             merge_ann_max_neighbors=max(1, int(data.get("merge_ann_max_neighbors", 48))),
             merge_ann_score_dims=max(1, int(data.get("merge_ann_score_dims", 32))),
             merge_ann_projection_steps=max(1, int(data.get("merge_ann_projection_steps", 32))),
+            enable_merge_heap=bool(data.get("enable_merge_heap", False)),
+            compress_workers=max(1, int(data.get("compress_workers", 1))),
             hard_keep_tags=[str(x) for x in (data.get("hard_keep_tags") or [])],
             protected_path_prefixes=[str(x) for x in (data.get("protected_path_prefixes") or [])],
             protected_scopes=[str(x) for x in (data.get("protected_scopes") or ["global_task", "current_task"])],
@@ -1,14 +1,42 @@
 ﻿from __future__ import annotations
 
 from collections import Counter, defaultdict
-from typing import Iterable
+from concurrent.futures import ProcessPoolExecutor
+import time
+from typing import Any, Iterable
 
+try:  # NumPy is optional; only the split-child centroid fast path uses it.
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only on numpy-less installs
+    np = None
+
+from .cache import CompressionCache, EmbeddingCache, SlotExtractionCache
 from .cluster import IncrementalClusterer
-from .compress import ClusterCompressor
-from .embed import HashEmbeddingProvider
+from .compress import ClusterCompressor, slot_cache_key
+from .embed import HashEmbeddingProvider, SparseVector, TokenHashCache
 from .eval import compute_metrics
 from .models import ClusterBuildResult, MemoryCluster, MemoryFragment, PreferenceConfig, utc_now_iso
-from .preference import PreferencePolicyEngine
+from .preference import PreferenceDecision, PreferencePolicyEngine
+from .time_utils import timestamp_sort_key
+
+# Fields ClusterCompressor.compress writes; copied back from worker results.
+_COMPRESSED_FIELDS = (
+    "backrefs",
+    "consensus",
+    "conflicts",
+    "conflict_graph",
+    "split_groups",
+    "summary",
+    "tags",
+    "last_updated",
+    "version",
+)
+_DEDUP_STAT_KEYS = ("semantic_dedup_candidates_checked", "semantic_dedup_pairs_skipped")
+# Batches per worker; smaller batches balance uneven cluster sizes.
+_COMPRESS_BATCHES_PER_WORKER = 4
+# Cache stats that describe the cache's current size rather than count events.
+_CACHE_SIZE_KEYS = ("embedding_cache_entries", "embedding_cache_bytes", "slot_cache_entries", "compression_cache_entries")
+_compress_worker_state: tuple[ClusterCompressor, PreferencePolicyEngine] | None = None
 
 
 def _build_source_distribution(fragments: list[MemoryFragment]) -> dict[str, int]:
@@ -35,6 +63,38 @@ def _centroid_average(vectors: list[list[float]]) -> list[float]:
     return [sum(vec[i] for vec in aligned) / len(aligned) for i in range(dim)]
 
 
+def _member_centroid(vectors: list[list[float] | SparseVector]) -> list[float]:
+    dim = len(next((vec for vec in vectors if vec), []))
+    centroid = [0.0] * dim
+    valid_vectors = [vec for vec in vectors if len(vec) == dim and dim > 0]
+    if not valid_vectors:
+        return centroid
+    if np is not None:
+        # bincount accumulates weights in input order, so sums match the loop below bit for bit.
+        indices = np.concatenate(
+            [
+                np.frombuffer(vec.indices, dtype=np.uint32) if isinstance(vec, SparseVector) else np.arange(dim)
+                for vec in valid_vectors
+            ]
+        )
+        values = np.concatenate(
+            [
+                np.frombuffer(vec.values, dtype=np.float64) if isinstance(vec, SparseVector) else np.asarray(vec, dtype=np.float64)
+                for vec in valid_vectors
+            ]
+        )
+        totals = np.bincount(indices.astype(np.intp), weights=values, minlength=dim)
+        return (totals / len(valid_vectors)).tolist()
+    for vec in valid_vectors:
+        if isinstance(vec, SparseVector):
+            for idx, value in zip(vec.indices, vec.values):
+                centroid[idx] += value
+        else:
+            for idx, value in enumerate(vec):
+                centroid[idx] += value
+    return [value / len(valid_vectors) for value in centroid]
+
+
 def _pick_parent_strength(clusters: list[MemoryCluster]) -> str:
     order = {"discardable": 0, "weak": 1, "strong": 2}
     best = "weak"
@@ -104,19 +164,137 @@ def _build_l2_clusters(clusters: list[MemoryCluster], min_children: int = 2) ->
     return output
 
 
+def _init_compress_worker(preference: PreferenceConfig, compressor_options: dict[str, Any]) -> None:
+    global _compress_worker_state
+    _compress_worker_state = (ClusterCompressor(**compressor_options), PreferencePolicyEngine(preference))
+
+
+def _cache_stats_delta(after: dict[str, Any], before: dict[str, Any]) -> dict[str, Any]:
+    """Per-build cache stats: event counters since ``before``, sizes as they are now."""
+    output = {
+        key: value if key in _CACHE_SIZE_KEYS or key.endswith("_hit_rate") else value - before[key]
+        for key, value in after.items()
+    }
+    if "embedding_cache_hit_rate" in output:
+        total = output["embedding_cache_hits"] + output["embedding_cache_misses"]
+        output["embedding_cache_hit_rate"] = round(output["embedding_cache_hits"] / total, 6) if total else 0.0
+    return output
+
+
+def _compress_batch(
+    batch: list[tuple[MemoryCluster, list[MemoryFragment], dict[str, PreferenceDecision], dict[str, Any]]],
+) -> list[tuple[MemoryCluster, list[tuple[str, Any]], dict[str, int], dict[str, Any] | None]]:
+    assert _compress_worker_state is not None
+    compressor, policy_engine = _compress_worker_state
+    output: list[tuple[MemoryCluster, list[tuple[str, Any]], dict[str, int], dict[str, Any] | None]] = []
+    for cluster, members, decisions, known_pairs in batch:
+        compressor.seed_slot_pairs(known_pairs)
+        before = compressor.snapshot_stats()
+        compressor.start_slot_trace()
+        compressor.compress(cluster=cluster, fragments=members, policy_engine=policy_engine, decisions=decisions)
+        after = compressor.snapshot_stats()
+        dedup_stats = {key: int(after[key]) - int(before[key]) for key in _DEDUP_STAT_KEYS}
+        analysis = compressor.pop_split_analysis(cluster.cluster_id)
+        output.append((cluster, compressor.pop_slot_trace(), dedup_stats, analysis))
+    return output
+
+
+def _compress_clusters(
+    clusters: list[MemoryCluster],
+    by_id: dict[str, MemoryFragment],
+    compressor: ClusterCompressor,
+    compressor_options: dict[str, Any],
+    policy_engine: PreferencePolicyEngine,
+    decisions: dict[str, PreferenceDecision],
+    workers: int,
+) -> None:
+    """
+    Compress every cluster in place, serially or on a pool of ``workers`` processes.
+
+    Clusters found in the compressor's compression cache are restored here.
+    Workers receive a centroid-less copy of each remaining cluster with its member
+    fragments, their decisions and any slot pairs already known here; they
+    return the compressed fields plus their slot lookups and dedup counters,
+    which are replayed in cluster order so results and stats match the serial
+    loop.
+    """
+    if workers <= 1 or len(clusters) < 2:
+        for cluster in clusters:
+            members = [by_id[fid] for fid in cluster.fragment_ids if fid in by_id]
+            compressor.compress(
+                cluster=cluster,
+                fragments=members,
+                policy_engine=policy_engine,
+                decisions=decisions,
+            )
+        return
+
+    pending: list[tuple[MemoryCluster, str | None]] = []
+    items: list[tuple[MemoryCluster, list[MemoryFragment], dict[str, PreferenceDecision], dict[str, Any]]] = []
+    for cluster in clusters:
+        members = [by_id[fid] for fid in cluster.fragment_ids if fid in by_id]
+        key = compressor.compression_key(cluster, members, policy_engine, decisions)
+        if key is not None and compressor.apply_cached_compression(cluster, key):
+            continue
+        pending.append((cluster, key))
+        shell = MemoryCluster(
+            cluster_id=cluster.cluster_id,
+            centroid=[],
+            source_distribution=dict(cluster.source_distribution),
+            tags=dict(cluster.tags),
+            version=cluster.version,
+        )
+        member_decisions = {item.id: decisions[item.id] for item in members if item.id in decisions}
+        known_pairs = compressor.known_slot_pairs(slot_cache_key(item) for item in members)
+        items.append((shell, members, member_decisions, known_pairs))
+    if not items:
+        return
+
+    workers = min(int(workers), len(items))
+    batch_size = max(1, -(-len(items) // (workers * _COMPRESS_BATCHES_PER_WORKER)))
+    batches = [items[start : start + batch_size] for start in range(0, len(items), batch_size)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_compress_worker,
+        initargs=(policy_engine.config, compressor_options),
+    ) as pool:
+        results = [row for batch in pool.map(_compress_batch, batches) for row in batch]
+
+    for (cluster, key), (compressed, slot_trace, dedup_stats, analysis) in zip(pending, results):
+        compressor.replay_worker_stats(slot_trace, dedup_stats)
+        compressor.adopt_split_analysis(cluster.cluster_id, analysis)
+        for name in _COMPRESSED_FIELDS:
+            setattr(cluster, name, getattr(compressed, name))
+        if key is not None:
+            compressor.remember_compression(cluster, key)
+
+
 def _split_conflicted_clusters(
     clusters: list[MemoryCluster],
     fragment_map: dict[str, MemoryFragment],
-    embedding_map: dict[str, list[float]],
+    embedding_map: dict[str, list[float] | SparseVector],
     compressor: ClusterCompressor,
     policy_engine: PreferencePolicyEngine,
     decisions: dict[str, object],
+    stats: dict[str, Any] | None = None,
 ) -> list[MemoryCluster]:
+    """
+    Replace clusters with more than one split group by one child per group.
+
+    Children are compressed with ``split_from`` set, so they reuse the
+    parent's slot pairs and dedup verdicts while the compressor holds them
+    (only for parents that ran exact dedup).
+    """
+    started = time.perf_counter()
     output: list[MemoryCluster] = []
+    split_parents = 0
+    split_children = 0
+    split_members = 0
     for cluster in clusters:
         if not cluster.split_groups or len(cluster.split_groups) <= 1:
             output.append(cluster)
             continue
+        split_parents += 1
 
         for index, group in enumerate(cluster.split_groups, start=1):
             group_ids = [str(fid) for fid in (group.get("fragment_ids") or [])]
@@ -125,12 +303,7 @@ def _split_conflicted_clusters(
                 continue
 
             vectors = [embedding_map.get(member.id, []) for member in members]
-            dim = len(next((vec for vec in vectors if vec), []))
-            centroid = [0.0] * dim
-            valid_vectors = [vec for vec in vectors if len(vec) == dim and dim > 0]
-            if valid_vectors:
-                for i in range(dim):
-                    centroid[i] = sum(vec[i] for vec in valid_vectors) / len(valid_vectors)
+            centroid = _member_centroid(vectors)
 
             child = MemoryCluster(
                 cluster_id=f"{cluster.cluster_id}-s{index}",
@@ -152,8 +325,17 @@ def _split_conflicted_clusters(
                 fragments=members,
                 policy_engine=policy_engine,
                 decisions=decisions,
+                split_from=cluster.cluster_id,
             )
             output.append(child)
+            split_children += 1
+            split_members += len(members)
+        compressor.pop_split_analysis(cluster.cluster_id)
+    if stats is not None:
+        stats["split_clusters"] = split_parents
+        stats["split_children"] = split_children
+        stats["split_member_fragments"] = split_members
+        stats["split_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
     return output
 
 
@@ -164,10 +346,25 @@ def build_cluster_result(
     merge_threshold: float = 0.9,
     category_strict: bool = False,
     embedding_dim: int = 256,
+    token_cache: TokenHashCache | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+    slot_cache: SlotExtractionCache | None = None,
+    compression_cache: CompressionCache | None = None,
+    policy_engine: PreferencePolicyEngine | None = None,
 ) -> ClusterBuildResult:
-    rows = sorted(list(fragments), key=lambda item: item.timestamp)
-    pref = preference_config or PreferenceConfig()
-    provider = HashEmbeddingProvider(dim=embedding_dim)
+    """
+    Embed, cluster and compress ``fragments``.
+
+    Pass the same ``policy_engine`` to repeated builds to reuse its cached
+    preference decisions; its config is used when ``preference_config`` is
+    omitted and must be that same object otherwise. Mutating that config
+    between builds is allowed and discards the engine's cached decisions.
+    """
+    rows = sorted(list(fragments), key=lambda item: timestamp_sort_key(item.timestamp))
+    if policy_engine is not None and preference_config is not None and policy_engine.config is not preference_config:
+        raise ValueError("policy_engine was built for a different PreferenceConfig")
+    pref = preference_config or (policy_engine.config if policy_engine is not None else PreferenceConfig())
+    provider = HashEmbeddingProvider(dim=embedding_dim, token_cache=token_cache)
     clusterer = IncrementalClusterer(
         similarity_threshold=similarity_threshold,
         merge_threshold=merge_threshold,
@@ -188,34 +385,57 @@ def build_cluster_result(
         merge_ann_max_neighbors=pref.merge_ann_max_neighbors,
         merge_ann_score_dims=pref.merge_ann_score_dims,
         merge_ann_projection_steps=pref.merge_ann_projection_steps,
+        enable_merge_heap=pref.enable_merge_heap,
     )
 
+    # Caches may outlive a build; its metrics count only this build's events.
+    caches = [cache for cache in (embedding_cache, slot_cache, compression_cache) if cache is not None]
+    cache_stats_before = [cache.snapshot_stats() for cache in caches]
+
     clusters: list[MemoryCluster] = []
-    embedding_by_id: dict[str, list[float]] = {}
+    embedding_by_id: dict[str, SparseVector] = {}
     by_id = {fragment.id: fragment for fragment in rows}
-    for fragment in rows:
-        vector = provider.embed(fragment.content)
+    texts = [fragment.content for fragment in rows]
+    if embedding_cache is not None:
+        vectors = embedding_cache.embed_many_sparse(provider, texts, dim=provider.dim)
+        embedding_cache.flush()
+    else:
+        vectors = provider.embed_many_sparse(texts)
+    for fragment, vector in zip(rows, vectors):
         embedding_by_id[fragment.id] = vector
         clusterer.assign(fragment=fragment, embedding=vector, clusters=clusters)
 
     clusters = clusterer.merge_clusters_with_lookup(clusters=clusters, fragment_lookup=by_id)
 
-    policy_engine = PreferencePolicyEngine(pref)
+    if policy_engine is None:
+        policy_engine = PreferencePolicyEngine(pref)
+    else:
+        policy_engine.refresh_config()
+    policy_stats_before = policy_engine.snapshot_stats()
+    policy_started = time.perf_counter()
     decisions = {fragment.id: policy_engine.decide_for_fragment(fragment) for fragment in rows}
+    policy_stats: dict[str, Any] = {
+        key: value - policy_stats_before[key] for key, value in policy_engine.snapshot_stats().items()
+    }
+    policy_stats["policy_decision_ms"] = round((time.perf_counter() - policy_started) * 1000.0, 3)
 
-    compressor = ClusterCompressor(
-        semantic_dedup_threshold=pref.semantic_dedup_threshold,
-        strict_conflict_split=pref.strict_conflict_split or policy_engine.strict_conflict_split(),
+    compressor_options: dict[str, Any] = {
+        "semantic_dedup_threshold": pref.semantic_dedup_threshold,
+        "strict_conflict_split": pref.strict_conflict_split or policy_engine.strict_conflict_split(),
+        "semantic_dedup_mode": pref.semantic_dedup_mode,
+    }
+    compressor = ClusterCompressor(**compressor_options, slot_cache=slot_cache, compression_cache=compression_cache)
+    _compress_clusters(
+        clusters=clusters,
+        by_id=by_id,
+        compressor=compressor,
+        compressor_options=compressor_options,
+        policy_engine=policy_engine,
+        decisions=decisions,
+        workers=pref.compress_workers,
     )
-    for cluster in clusters:
-        members = [by_id[fid] for fid in cluster.fragment_ids if fid in by_id]
-        compressor.compress(
-            cluster=cluster,
-            fragments=members,
-            policy_engine=policy_engine,
-            decisions=decisions,
-        )
 
+    split_stats: dict[str, Any] = {}
     if pref.strict_conflict_split:
         clusters = _split_conflicted_clusters(
             clusters=clusters,
@@ -224,11 +444,22 @@ def build_cluster_result(
             compressor=compressor,
             policy_engine=policy_engine,
             decisions=decisions,
+            stats=split_stats,
         )
 
+    if slot_cache is not None:
+        slot_cache.flush()
+    if compression_cache is not None:
+        compression_cache.flush()
+
     if pref.enable_l2_clusters:
         clusters.extend(_build_l2_clusters(clusters=clusters, min_children=pref.l2_min_children))
 
     metrics = compute_metrics(rows, clusters)
     metrics.update(clusterer.snapshot_stats())
+    metrics.update(compressor.snapshot_stats())
+    metrics.update(policy_stats)
+    metrics.update(split_stats)
+    for cache, before in zip(caches, cache_stats_before):
+        metrics.update(_cache_stats_delta(cache.snapshot_stats(), before))
     return ClusterBuildResult(fragments=rows, clusters=clusters, metrics=metrics)
@@ -1,18 +1,58 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
+import hashlib
+import json
 import math
 
 from .models import MemoryFragment, PreferenceConfig
-from .time_utils import parse_iso_utc
+from .time_utils import parse_iso_epoch
+
+
+class _PathPrefixTrie:
+    """Character trie over normalized path prefixes; a path matches if any prefix starts it."""
+
+    _END = ""
+
+    def __init__(self, prefixes: list[str]) -> None:
+        self._root: dict[str, dict] = {}
+        for prefix in prefixes:
+            if not prefix:
+                continue
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[self._END] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._root)
+
+    def matches(self, path: str) -> bool:
+        node = self._root
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
 
 
-def _parse_iso(ts: str) -> datetime:
-    dt = parse_iso_utc(ts)
-    if dt is None:
-        return datetime.now(timezone.utc)
-    return dt
+@dataclass(frozen=True)
+class _CompiledPolicy:
+    hard_keep_tags: frozenset[str]
+    protected_scopes: frozenset[str]
+    protected_paths: _PathPrefixTrie
+
+    @classmethod
+    def from_config(cls, config: PreferenceConfig) -> "_CompiledPolicy":
+        return cls(
+            hard_keep_tags=frozenset(config.hard_keep_tags),
+            protected_scopes=frozenset(config.protected_scopes),
+            protected_paths=_PathPrefixTrie([str(prefix).replace("\\", "/") for prefix in config.protected_path_prefixes]),
+        )
 
 
 @dataclass
@@ -24,6 +64,11 @@ class PreferenceDecision:
     reasons: list[str] = field(default_factory=list)
 
 
+def _config_digest(config: PreferenceConfig) -> str:
+    raw = json.dumps(config.to_dict(), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
 class PreferencePolicyEngine:
     """
     Convert user preference config to retention policy decisions.
@@ -32,14 +77,70 @@ class PreferencePolicyEngine:
     - strong
     - weak
     - discardable
+
+    Tag, scope and path protections are compiled from the config when the
+    engine is created; ``refresh_config`` recompiles them and drops cached
+    decisions if the config was mutated since. Decisions are cached per (fragment id, version) and
+    recomputed only when the fragment has crossed ``stale_after_hours``
+    since it was decided, so one engine can serve repeated builds. The cache
+    is an LRU bounded by ``max_cached_decisions``.
     """
 
     _ORDER = ("discardable", "weak", "strong")
 
-    def __init__(self, config: PreferenceConfig) -> None:
+    def __init__(self, config: PreferenceConfig, max_cached_decisions: int = 200_000) -> None:
         self.config = config
+        self.max_cached_decisions = max(0, int(max_cached_decisions))
+        self.config_digest = _config_digest(config)
+        self._compiled = _CompiledPolicy.from_config(config)
+        # (id, version) -> (decision, epoch seconds or None when unparseable)
+        self._decisions: OrderedDict[tuple[str, int], tuple[PreferenceDecision, float | None]] = OrderedDict()
+        self.decisions_computed = 0
+        self.decisions_reused = 0
+        self.decisions_invalidated = 0
+        self.decisions_evicted = 0
+
+    def refresh_config(self) -> bool:
+        """Recompile and clear cached decisions if ``config`` changed in place; True when it did."""
+        digest = _config_digest(self.config)
+        if digest == self.config_digest:
+            return False
+        self.config_digest = digest
+        self._compiled = _CompiledPolicy.from_config(self.config)
+        self._decisions.clear()
+        return True
 
     def decide_for_fragment(self, fragment: MemoryFragment) -> PreferenceDecision:
+        key = (fragment.id, int(fragment.version))
+        cached = self._decisions.get(key)
+        if cached is not None:
+            decision, epoch = cached
+            if self._stale_since(epoch) == decision.stale:
+                self._decisions.move_to_end(key)
+                self.decisions_reused += 1
+                return decision
+            self.decisions_invalidated += 1
+        epoch = parse_iso_epoch(fragment.timestamp)
+        decision = self._decide(fragment, self._stale_since(epoch))
+        self.decisions_computed += 1
+        if self.max_cached_decisions <= 0:
+            return decision
+        self._decisions[key] = (decision, epoch)
+        self._decisions.move_to_end(key)
+        while len(self._decisions) > self.max_cached_decisions:
+            self._decisions.popitem(last=False)
+            self.decisions_evicted += 1
+        return decision
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {
+            "policy_decisions_computed": int(self.decisions_computed),
+            "policy_decisions_reused": int(self.decisions_reused),
+            "policy_decisions_invalidated": int(self.decisions_invalidated),
+            "policy_decisions_evicted": int(self.decisions_evicted),
+        }
+
+    def _decide(self, fragment: MemoryFragment, stale: bool) -> PreferenceDecision:
         category = str(fragment.tags.get("category") or "general")
         strength = self.config.category_strength.get(category, "weak")
         reasons = [f"category={category}:{strength}"]
@@ -53,7 +154,6 @@ class PreferencePolicyEngine:
                 reasons.append("protected fragment keeps strong retention")
 
         source_weight = float(self.config.source_weight.get(fragment.agent_id, 1.0))
-        stale = self._is_stale(fragment.timestamp)
 
         if protected:
             if source_weight < self.config.source_demote_threshold and strength == "strong":
@@ -136,29 +236,32 @@ class PreferencePolicyEngine:
         return float(self.config.merge_conflict_compat_threshold)
 
     def _is_stale(self, ts: str) -> bool:
-        age = datetime.now(timezone.utc) - _parse_iso(ts)
-        hours = age.total_seconds() / 3600.0
+        return self._stale_since(parse_iso_epoch(ts))
+
+    def _stale_since(self, epoch: float | None) -> bool:
+        if epoch is None:
+            # Unparseable timestamps are treated as written just now.
+            hours = 0.0
+        else:
+            hours = (datetime.now(timezone.utc).timestamp() - epoch) / 3600.0
         return hours > self.config.stale_after_hours
 
     def _is_protected_fragment(self, fragment: MemoryFragment) -> bool:
+        compiled = self._compiled
         tags = fragment.tags or {}
-        for tag in self.config.hard_keep_tags:
-            if tag in tags:
-                return True
+        if compiled.hard_keep_tags and not compiled.hard_keep_tags.isdisjoint(tags):
+            return True
 
         scope = str(tags.get("scope") or "")
-        if scope and scope in set(self.config.protected_scopes):
+        if scope and scope in compiled.protected_scopes:
             return True
 
+        if not compiled.protected_paths:
+            return False
         file_path = str(fragment.meta.get("file_path") or "")
         if not file_path:
             return False
-        normalized = file_path.replace("\\", "/")
-        for prefix in self.config.protected_path_prefixes:
-            p = str(prefix).replace("\\", "/")
-            if p and normalized.startswith(p):
-                return True
-        return False
+        return compiled.protected_paths.matches(file_path.replace("\\", "/"))
 
 
 def _normalized_entropy(source_distribution: dict[str, int]) -> float:
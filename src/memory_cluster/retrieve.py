@@ -3,8 +3,9 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Any
 
-from .embed import EmbeddingProvider, cosine_similarity
-from .time_utils import parse_iso_utc
+from .embed import EmbeddingProvider, SparseVector, cosine_similarity
+from .store import FragmentStore
+from .time_utils import parse_iso_epoch, parse_iso_utc
 
 
 _STRENGTH_BONUS = {
@@ -29,8 +30,9 @@ class MemoryRetriever:
         offset: int = 0,
         cluster_level: str = "all",
         expand: bool = False,
+        store: FragmentStore | None = None,
     ) -> list[dict[str, Any]]:
-        query_vec = self.embedding_provider.embed(query_text)
+        query_vec = self._embed_sparse(query_text)
         clusters = state.get("clusters") or []
         fragments = state.get("fragments") or []
         fragment_map = {item.get("id"): item for item in fragments if isinstance(item, dict)}
@@ -47,7 +49,7 @@ class MemoryRetriever:
                 continue
             centroid = [float(x) for x in (cluster.get("centroid") or [])]
             summary_text = str(cluster.get("summary") or "")
-            summary_vec = self.embedding_provider.embed(summary_text)
+            summary_vec = self._embed_sparse(summary_text)
             semantic_score = max(cosine_similarity(query_vec, centroid), cosine_similarity(query_vec, summary_vec))
             keyword_bonus = self._keyword_bonus(query_text, summary_text)
             strength_bonus = self._strength_bonus(cluster)
@@ -70,11 +72,24 @@ class MemoryRetriever:
                 "backrefs": cluster.get("backrefs") or [],
                 "level": int(cluster.get("level") or 1),
             }
-            if expand:
-                record["fragments"] = [fragment_map.get(fid) for fid in record["backrefs"] if fid in fragment_map]
             output.append(record)
+
+        if expand:
+            # With a store, backrefs are read by offset from the store; the state's copies fill any gaps.
+            if store is not None:
+                wanted = [fid for record in output for fid in record["backrefs"]]
+                for fid, fragment in store.get_many(wanted).items():
+                    fragment_map[fid] = fragment.to_dict()
+            for record in output:
+                record["fragments"] = [fragment_map.get(fid) for fid in record["backrefs"] if fid in fragment_map]
         return output
 
+    def _embed_sparse(self, text: str) -> SparseVector:
+        embed_sparse = getattr(self.embedding_provider, "embed_sparse", None)
+        if embed_sparse is not None:
+            return embed_sparse(text)
+        return SparseVector.from_dense(self.embedding_provider.embed(text))
+
     def _keyword_bonus(self, query_text: str, summary_text: str) -> float:
         query_tokens = {token for token in query_text.lower().split() if token}
         if not query_tokens:
@@ -104,10 +119,8 @@ class MemoryRetriever:
         return 0.0
 
     def _sort_timestamp(self, ts: str) -> float:
-        dt = parse_iso_utc(ts)
-        if dt is None:
-            return 0.0
-        return float(dt.timestamp())
+        epoch = parse_iso_epoch(ts)
+        return 0.0 if epoch is None else epoch
 
     def _conflict_priority(self, cluster: dict[str, Any]) -> float:
         tags = cluster.get("tags") or {}
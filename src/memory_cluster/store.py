@@ -1,11 +1,23 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, fields
+import bisect
+import contextlib
+import gc
+import hashlib
+import io
+import itertools
 import json
+import mmap
+import operator
 import os
 from pathlib import Path
+import pickle
+import struct
 import time
-from typing import Any
+from typing import IO, Any, Iterable, Iterator, NamedTuple
 
 from .models import ClusterBuildResult, MemoryFragment
 
@@ -44,6 +56,8 @@ class StoreAppendStats:
     inserted: int = 0
     skipped_existing: int = 0
     store_invalid_lines: int = 0
+    key_index_rebuilt: int = 0
+    key_index_scanned_lines: int = 0
 
     def to_dict(self) -> dict[str, int]:
         return {
@@ -51,9 +65,76 @@ class StoreAppendStats:
             "inserted": int(self.inserted),
             "skipped_existing": int(self.skipped_existing),
             "store_invalid_lines": int(self.store_invalid_lines),
+            "key_index_rebuilt": int(self.key_index_rebuilt),
+            "key_index_scanned_lines": int(self.key_index_scanned_lines),
         }
 
 
+@dataclass
+class StoreCompactionStats:
+    segments_before: int = 0
+    segments_after: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    lines_before: int = 0
+    lines_after: int = 0
+    dropped_versions: int = 0
+    dropped_invalid: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "segments_before": int(self.segments_before),
+            "segments_after": int(self.segments_after),
+            "bytes_before": int(self.bytes_before),
+            "bytes_after": int(self.bytes_after),
+            "lines_before": int(self.lines_before),
+            "lines_after": int(self.lines_after),
+            "dropped_versions": int(self.dropped_versions),
+            "dropped_invalid": int(self.dropped_invalid),
+        }
+
+
+def iter_jsonl_fragments(
+    lines: Iterable[str],
+    stats: StoreReadStats,
+    strict: bool = False,
+    source: str = "store",
+    first_line: int = 1,
+) -> Iterator[MemoryFragment]:
+    """
+    Parse JSONL fragment lines lazily, counting into ``stats`` as it goes.
+
+    Blank lines are skipped; undecodable or invalid lines are counted and
+    skipped, or raise ValueError naming ``source`` and the line when ``strict``.
+    ``first_line`` numbers lines of a range that starts mid-file.
+    """
+    for lineno, raw_line in enumerate(lines, start=first_line):
+        stats.total_lines += 1
+        line = raw_line.strip()
+        if not line:
+            stats.skipped_blank += 1
+            continue
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError as exc:
+            stats.skipped_invalid += 1
+            stats.decode_errors += 1
+            if strict:
+                raise ValueError(f"invalid json in {source} at line {lineno}: {exc.msg}") from exc
+            continue
+
+        try:
+            fragment = MemoryFragment.from_dict(payload)
+        except Exception as exc:  # defensive parse guard
+            stats.skipped_invalid += 1
+            stats.schema_errors += 1
+            if strict:
+                raise ValueError(f"invalid fragment payload in {source} at line {lineno}: {exc}") from exc
+            continue
+        stats.parsed_lines += 1
+        yield fragment
+
+
 class _FileLock:
     """Simple lock-file guard for cross-process write sections."""
 
@@ -91,17 +172,659 @@ class _FileLock:
             pass
 
 
+# Key index sidecar (<store>.keyidx), little-endian:
+#   header: magic(8) format(u32) bloom_hashes(u32) store_bytes(u64) invalid_lines(u64) sorted_count(u64) bloom_bytes(u64)
+#   then the Bloom filter bits, the sorted 16-byte (id, version) digests, and an
+#   unsorted log of digests appended since the last compaction.
+# The header is written last on every update, so it never claims more of the
+# store than the digests cover. A store longer than store_bytes is indexed from
+# that offset; a shorter store or a damaged index triggers a full rebuild.
+_KEY_INDEX_MAGIC = b"MCKEYIDX"
+_KEY_INDEX_FORMAT = 1
+_KEY_INDEX_HEADER = struct.Struct("<8sIIQQQQ")
+_KEY_DIGEST_SIZE = 16
+_BLOOM_HASHES = 7
+_BLOOM_SEEDS = struct.Struct("<QQ")
+_BLOOM_BITS_PER_KEY = 10
+_MIN_INDEX_KEYS = 4096
+_LOG_SCAN_PROBES = 16
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+_LOAD_CHUNK_BYTES = 4 << 20
+_LOAD_CHUNKS_PER_WORKER = 2
+_FRAGMENT_FIELDS = tuple(item.name for item in fields(MemoryFragment))
+_fragment_values = operator.attrgetter(*_FRAGMENT_FIELDS)
+
+
+def _count_lines(data: bytes) -> int:
+    """Lines in ``data`` as universal-newline text iteration counts them."""
+    breaks = data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n")
+    return breaks + (0 if not data or data.endswith((b"\n", b"\r")) else 1)
+
+
+def _newline_chunks(handles: list[IO[bytes]], chunk_bytes: int) -> Iterator[tuple[bytes, int, bool]]:
+    """Split each part into (data, first_line, part_start) ranges that end on a newline."""
+    next_line = 1
+    for handle in handles:
+        part_start = True
+        while True:
+            data = handle.read(chunk_bytes)
+            if not data:
+                break
+            if not data.endswith(b"\n"):
+                data += handle.readline()
+            yield data, next_line, part_start
+            part_start = False
+            next_line += _count_lines(data)
+
+
+def _decode_store_chunk(data: bytes, first_line: int, part_start: bool, strict: bool) -> tuple[bytes, StoreReadStats]:
+    """
+    Process-pool side of the parallel loader: parse one newline-aligned range
+    exactly as the serial reader would, and return the fragments as pickled
+    field tuples, which unpickle several times faster than dataclass instances.
+    """
+    stats = StoreReadStats()
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig" if part_start else "utf-8")
+    rows = [_fragment_values(fragment) for fragment in iter_jsonl_fragments(lines, stats, strict=strict, first_line=first_line)]
+    return pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL), stats
+
+
+def _collect_store_chunk(future: Future, stats: StoreReadStats) -> list[MemoryFragment]:
+    payload, chunk_stats = future.result()
+    for item in fields(StoreReadStats):
+        setattr(stats, item.name, getattr(stats, item.name) + getattr(chunk_stats, item.name))
+    # Rebuilding many small containers keeps tripping the cyclic GC; none of them form cycles.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [MemoryFragment(*values) for values in pickle.loads(payload)]
+    finally:
+        if enabled:
+            gc.enable()
+
+
+_MANIFEST_VERSION = 1
+_READ_ATTEMPTS = 5
+_APPEND_CHUNK_SIZE = 20000
+
+
+class _SegmentManifest:
+    """
+    Sealed segments of a store, oldest first, listed in ``<store>.manifest.json``
+    and kept under ``<store>.segments/``.
+
+    The store path itself stays the active segment that appends go to, so a
+    store without a manifest is a single file. The logical store is the sealed
+    segments followed by the active file; every change bumps ``generation`` and
+    is published by an atomic manifest swap.
+    """
+
+    def __init__(self, store_path: Path) -> None:
+        self.store_path = store_path
+        self.path = store_path.with_name(store_path.name + ".manifest.json")
+        self.segment_dir = store_path.with_name(store_path.name + ".segments")
+
+    def load(self) -> tuple[int, list[str]]:
+        try:
+            with self.path.open("r", encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except FileNotFoundError:
+            return 0, []
+        if not isinstance(payload, dict) or payload.get("v") != _MANIFEST_VERSION:
+            raise ValueError(f"unsupported store manifest: {self.path}")
+        return int(payload.get("generation") or 0), [str(name) for name in payload.get("segments") or []]
+
+    def write(self, generation: int, segments: list[str]) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        payload = {"v": _MANIFEST_VERSION, "generation": int(generation), "segments": list(segments)}
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def parts(self, segments: list[str]) -> list[Path]:
+        return [self.segment_dir / name for name in segments] + [self.store_path]
+
+    def layout(self) -> list[tuple[Path, int]]:
+        """
+        (path, size) of every part in logical order; a missing active file
+        counts as empty. Callers must hold the store's _FileLock.
+        """
+        self.recover()
+        _, segments = self.load()
+        return [(path, path.stat().st_size if path.exists() else 0) for path in self.parts(segments)]
+
+    def seal_active(self) -> bool:
+        """
+        Rename the active file into a new sealed segment. Logical offsets are
+        unchanged, so the key and offset indexes stay valid, and readers that
+        already opened the active file keep reading the same bytes. Callers
+        must hold the store's _FileLock.
+        """
+        self.recover()
+        if not self.store_path.exists() or self.store_path.stat().st_size == 0:
+            return False
+        generation, segments = self.load()
+        name = f"{generation + 1:08d}.jsonl"
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        # Publish before renaming, so a reader that opened the renamed-away
+        # active file under the old manifest sees the generation move.
+        self.write(generation + 1, segments + [name])
+        try:
+            os.replace(self.store_path, self.segment_dir / name)
+        except OSError:
+            # e.g. the file is open elsewhere on Windows; keep appending to it
+            self.write(generation + 2, segments)
+            return False
+        return True
+
+    def recover(self) -> None:
+        """Finish a seal interrupted between the manifest write and the rename. Callers must hold the lock."""
+        generation, segments = self.load()
+        missing = [name for name in segments if not (self.segment_dir / name).exists()]
+        if not missing:
+            return
+        if missing == segments[-1:] and self.store_path.exists():
+            os.replace(self.store_path, self.segment_dir / missing[0])
+            return
+        # Dropping segments shifts logical offsets, so the offset index must go first.
+        _OffsetIndex(self.store_path).path.unlink(missing_ok=True)
+        self.write(generation + 1, [name for name in segments if name not in missing])
+
+
+def _iter_store_lines(
+    layout: list[tuple[Path, int]], start: int, end: int
+) -> Iterator[tuple[int, int, MemoryFragment | None]]:
+    """
+    Yield (offset, length, fragment) for each non-blank line in logical store
+    bytes [start, end), parsed like load_fragments; fragment is None for
+    invalid lines. A UTF-8 BOM at the start of a part is excluded from the
+    first line's span.
+    """
+    base = 0
+    for path, size in layout:
+        part_start, part_end = max(start, base) - base, min(end, base + size) - base
+        if part_start < part_end:
+            with path.open("rb") as handle:
+                handle.seek(part_start)
+                position = part_start
+                while position < part_end:
+                    raw_line = handle.readline()
+                    if not raw_line:
+                        break
+                    offset = position
+                    position = handle.tell()
+                    if offset == 0 and raw_line.startswith(_UTF8_BOM):
+                        raw_line = raw_line[len(_UTF8_BOM) :]
+                        offset = len(_UTF8_BOM)
+                    try:
+                        line = raw_line.decode("utf-8").strip()
+                    except UnicodeDecodeError:
+                        yield base + offset, len(raw_line), None
+                        continue
+                    if not line:
+                        continue
+                    try:
+                        fragment = MemoryFragment.from_dict(json.loads(line))
+                    except Exception:  # same guard as load_fragments_with_stats
+                        fragment = None
+                    yield base + offset, len(raw_line), fragment
+        base += size
+
+
+class _SpanReader:
+    """
+    Read logical store spans through one lazily opened memory map per part,
+    mapping the caller's already open ``handles`` when given.
+    """
+
+    def __init__(self, layout: list[tuple[Path, int]], handles: list[IO[bytes]] | None = None) -> None:
+        self.layout = layout
+        self.handles = handles
+        self.bases: list[int] = []
+        base = 0
+        for _, size in layout:
+            self.bases.append(base)
+            base += size
+        self._views: dict[int, tuple[Any, mmap.mmap]] = {}
+
+    def read(self, offset: int, length: int) -> bytes:
+        part = bisect.bisect_right(self.bases, offset) - 1
+        while self.layout[part][1] == 0:  # empty parts share their base with the next one
+            part += 1
+        view = self._views.get(part)
+        if view is None:
+            if self.handles is None:
+                handle = self.layout[part][0].open("rb")
+                view = (handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                view = (None, mmap.mmap(self.handles[part].fileno(), 0, access=mmap.ACCESS_READ))
+            self._views[part] = view
+        local = offset - self.bases[part]
+        return view[1][local : local + length]
+
+    def close(self) -> None:
+        for handle, view in self._views.values():
+            view.close()
+            if handle is not None:
+                handle.close()
+        self._views = {}
+
+
+def _key_digest(fragment_id: str, version: int) -> bytes:
+    return hashlib.blake2b(f"{int(version)}\x1f{fragment_id}".encode("utf-8"), digest_size=_KEY_DIGEST_SIZE).digest()
+
+
+def _bloom_positions(digest: bytes, bloom_bits: int) -> list[int]:
+    h1, h2 = _BLOOM_SEEDS.unpack_from(digest)
+    h1, h2 = h1 % bloom_bits, h2 % bloom_bits
+    return [(h1 + i * h2) % bloom_bits for i in range(_BLOOM_HASHES)]
+
+
+def _set_bloom_bits(bloom: bytearray, digests: Iterable[bytes]) -> None:
+    bloom_bits = len(bloom) * 8
+    for digest in digests:
+        for pos in _bloom_positions(digest, bloom_bits):
+            bloom[pos >> 3] |= 1 << (pos & 7)
+
+
+class _KeyIndexHeader(NamedTuple):
+    store_bytes: int
+    invalid_lines: int
+    sorted_count: int
+    bloom_bytes: int
+    log_count: int
+
+    @property
+    def sorted_start(self) -> int:
+        return _KEY_INDEX_HEADER.size + self.bloom_bytes
+
+    @property
+    def log_start(self) -> int:
+        return self.sorted_start + self.sorted_count * _KEY_DIGEST_SIZE
+
+
+class _KeyIndex:
+    """
+    (id, version) digests of every fragment in a store, for idempotent appends.
+
+    Lookups go through a Bloom filter, then a binary search of the sorted
+    block, then the short append log, all over a memory map, so checking a
+    batch touches O(batch) pages instead of parsing the store. The log is
+    merged into the sorted block once it outgrows an eighth of it; the filter
+    is only rebuilt, at twice the key count, when it runs out of capacity.
+    Callers must hold the store's _FileLock.
+    """
+
+    def __init__(self, store_path: Path) -> None:
+        self.store_path = store_path
+        self.path = store_path.with_name(store_path.name + ".keyidx")
+        self.header: _KeyIndexHeader | None = None
+        self.layout: list[tuple[Path, int]] = []
+        self.rebuilt = False
+        self.scanned_lines = 0
+
+    def sync(self) -> _KeyIndexHeader:
+        """Bring the index up to the current end of the store."""
+        self.layout = _SegmentManifest(self.store_path).layout()
+        store_size = sum(size for _, size in self.layout)
+        header = self._read_header()
+        if header is None or header.store_bytes > store_size:
+            digests, invalid = self._scan(0, store_size)
+            self._write_full(sorted(set(digests)), store_size, invalid)
+            self.rebuilt = True
+        elif header.store_bytes < store_size:
+            digests, invalid = self._scan(header.store_bytes, store_size)
+            self.add(digests, store_size, invalid_lines=header.invalid_lines + invalid)
+        assert self.header is not None
+        return self.header
+
+    def existing(self, digests: set[bytes]) -> set[bytes]:
+        header = self.header
+        if header is None or not digests or header.sorted_count + header.log_count == 0:
+            return set()
+        found: set[bytes] = set()
+        bloom_bits = header.bloom_bytes * 8
+        with self.path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            log: set[bytes] | None = None
+            log_scans = 0
+            for digest in digests:
+                if not all(view[_KEY_INDEX_HEADER.size + (pos >> 3)] & (1 << (pos & 7)) for pos in _bloom_positions(digest, bloom_bits)):
+                    continue
+                if self._sorted_contains(view, header, digest):
+                    found.add(digest)
+                    continue
+                # A few probes scan the log in place; past that, one set serves the rest of the batch.
+                if log is None and log_scans < _LOG_SCAN_PROBES:
+                    log_scans += 1
+                    if self._log_contains(view, header, digest):
+                        found.add(digest)
+                    continue
+                if log is None:
+                    log = self._log_digests(view, header)
+                if digest in log:
+                    found.add(digest)
+        return found
+
+    def add(self, digests: list[bytes], store_bytes: int, invalid_lines: int | None = None) -> None:
+        header = self.header
+        assert header is not None
+        invalid = header.invalid_lines if invalid_lines is None else int(invalid_lines)
+        log_count = header.log_count + len(digests)
+        capacity = header.bloom_bytes * 8 // _BLOOM_BITS_PER_KEY
+        over_capacity = header.sorted_count + log_count > capacity
+        if over_capacity or log_count > max(_MIN_INDEX_KEYS, header.sorted_count // 8):
+            with self.path.open("rb") as handle:
+                raw = handle.read()
+            log_end = header.log_start + header.log_count * _KEY_DIGEST_SIZE
+            stored = [raw[offset : offset + _KEY_DIGEST_SIZE] for offset in range(header.sorted_start, log_end, _KEY_DIGEST_SIZE)]
+            # Two sorted runs, so the outer sort is a linear merge.
+            runs = stored[: header.sorted_count] + sorted(stored[header.sorted_count :] + list(digests))
+            ordered = [digest for digest, _ in itertools.groupby(sorted(runs))]
+            bloom = None
+            if not over_capacity:
+                # log digests already have their bits set
+                bloom = bytearray(raw[_KEY_INDEX_HEADER.size : header.sorted_start])
+                _set_bloom_bits(bloom, digests)
+            self._write_full(ordered, store_bytes, invalid, bloom=bloom)
+            return
+
+        with self.path.open("r+b") as handle:
+            handle.truncate(header.log_start + header.log_count * _KEY_DIGEST_SIZE)
+            handle.seek(0, os.SEEK_END)
+            handle.write(b"".join(digests))
+            handle.flush()
+            with mmap.mmap(handle.fileno(), 0) as view:
+                bloom_bits = header.bloom_bytes * 8
+                for digest in digests:
+                    for pos in _bloom_positions(digest, bloom_bits):
+                        view[_KEY_INDEX_HEADER.size + (pos >> 3)] |= 1 << (pos & 7)
+                self.header = header._replace(store_bytes=int(store_bytes), invalid_lines=invalid, log_count=log_count)
+                view[: _KEY_INDEX_HEADER.size] = self._pack_header(self.header)
+                view.flush()
+
+    def rebase(self, store_bytes: int, invalid_lines: int) -> None:
+        """Point a synced index at a rewritten store; digests of dropped lines stay known."""
+        assert self.header is not None
+        self.header = self.header._replace(store_bytes=int(store_bytes), invalid_lines=max(0, int(invalid_lines)))
+        with self.path.open("r+b") as handle:
+            handle.write(self._pack_header(self.header))
+
+    def _read_header(self) -> _KeyIndexHeader | None:
+        try:
+            size = self.path.stat().st_size
+            with self.path.open("rb") as handle:
+                raw = handle.read(_KEY_INDEX_HEADER.size)
+        except OSError:
+            return None
+        if len(raw) != _KEY_INDEX_HEADER.size:
+            return None
+        magic, fmt, hashes, store_bytes, invalid, sorted_count, bloom_bytes = _KEY_INDEX_HEADER.unpack(raw)
+        if magic != _KEY_INDEX_MAGIC or fmt != _KEY_INDEX_FORMAT or hashes != _BLOOM_HASHES or bloom_bytes <= 0:
+            return None
+        header = _KeyIndexHeader(store_bytes, invalid, sorted_count, bloom_bytes, 0)
+        if size < header.log_start:
+            return None
+        # A torn trailing digest is dropped; the next add truncates it away.
+        self.header = header._replace(log_count=(size - header.log_start) // _KEY_DIGEST_SIZE)
+        return self.header
+
+    def _pack_header(self, header: _KeyIndexHeader) -> bytes:
+        return _KEY_INDEX_HEADER.pack(
+            _KEY_INDEX_MAGIC,
+            _KEY_INDEX_FORMAT,
+            _BLOOM_HASHES,
+            header.store_bytes,
+            header.invalid_lines,
+            header.sorted_count,
+            header.bloom_bytes,
+        )
+
+    def _write_full(
+        self, ordered: list[bytes], store_bytes: int, invalid_lines: int, bloom: bytearray | None = None
+    ) -> None:
+        """Write sorted unique digests; a fresh filter sized for twice their count is built unless given."""
+        if bloom is None:
+            capacity = max(_MIN_INDEX_KEYS, 2 * len(ordered))
+            bloom = bytearray(-(-capacity * _BLOOM_BITS_PER_KEY // 8))
+            _set_bloom_bits(bloom, ordered)
+        header = _KeyIndexHeader(int(store_bytes), int(invalid_lines), len(ordered), len(bloom), 0)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("wb") as handle:
+            handle.write(self._pack_header(header))
+            handle.write(bloom)
+            handle.write(b"".join(ordered))
+        os.replace(tmp, self.path)
+        self.header = header
+
+    def _scan(self, start: int, end: int) -> tuple[list[bytes], int]:
+        """Digests and invalid-line count for logical store bytes [start, end)."""
+        digests: list[bytes] = []
+        invalid = 0
+        for _, _, fragment in _iter_store_lines(self.layout, start, end):
+            self.scanned_lines += 1
+            if fragment is None:
+                invalid += 1
+                continue
+            digests.append(_key_digest(fragment.id, int(fragment.version)))
+        return digests, invalid
+
+    @staticmethod
+    def _sorted_contains(view: mmap.mmap, header: _KeyIndexHeader, digest: bytes) -> bool:
+        lo, hi = 0, header.sorted_count
+        base = header.sorted_start
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = base + mid * _KEY_DIGEST_SIZE
+            probe = view[offset : offset + _KEY_DIGEST_SIZE]
+            if probe < digest:
+                lo = mid + 1
+            elif probe > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    @staticmethod
+    def _log_contains(view: mmap.mmap, header: _KeyIndexHeader, digest: bytes) -> bool:
+        start = header.log_start
+        end = start + header.log_count * _KEY_DIGEST_SIZE
+        position = view.find(digest, start, end)
+        while position != -1:
+            if (position - start) % _KEY_DIGEST_SIZE == 0:
+                return True
+            position = view.find(digest, position + 1, end)
+        return False
+
+    @staticmethod
+    def _log_digests(view: mmap.mmap, header: _KeyIndexHeader) -> set[bytes]:
+        start = header.log_start
+        return {
+            view[offset : offset + _KEY_DIGEST_SIZE]
+            for offset in range(start, start + header.log_count * _KEY_DIGEST_SIZE, _KEY_DIGEST_SIZE)
+        }
+
+
+_OFFSET_INDEX_VERSION = 1
+_MIN_OFFSET_COMPACT_RECORDS = 1024
+_OFFSET_TAIL_BYTES = 256
+
+
+class _OffsetIndex:
+    """
+    Latest (byte offset, length, version) per fragment id, kept as
+    ``<store>.offsets.jsonl`` so single fragments can be read without parsing
+    the whole store.
+
+    Offsets are logical (sealed segments, then the active file). After a
+    {"v": ...} header, each append writes one [id, offset, length, version]
+    record per line and then an {"end": store_bytes} mark. Records after the
+    last mark are ignored and a torn line rebuilds the index, so an interrupted
+    write is simply re-indexed from the store. A later record replaces an
+    earlier one unless its version is lower, as in load_latest_by_id. sync and
+    add need the store's _FileLock; compaction removes the file before it
+    swaps the manifest.
+    """
+
+    def __init__(self, store_path: Path) -> None:
+        self.store_path = store_path
+        self.path = store_path.with_name(store_path.name + ".offsets.jsonl")
+        self.entries: dict[str, tuple[int, int, int]] = {}
+        self.store_bytes = 0
+        self.records = 0
+        self.layout: list[tuple[Path, int]] = []
+
+    def sync(self) -> None:
+        """Bring the index up to the current end of the store."""
+        self.layout = _SegmentManifest(self.store_path).layout()
+        store_size = sum(size for _, size in self.layout)
+        loaded = self._load()
+        if not loaded or self.store_bytes > store_size:
+            self.entries = {}
+            self.store_bytes = 0
+            self.records = 0
+        rows = [
+            (fragment.id, offset, length, int(fragment.version))
+            for offset, length, fragment in _iter_store_lines(self.layout, self.store_bytes, store_size)
+            if fragment is not None
+        ]
+        if not loaded or self.store_bytes == 0 or self.records > max(_MIN_OFFSET_COMPACT_RECORDS, 2 * len(self.entries)):
+            self._merge(rows)
+            self.store_bytes = store_size
+            self._rewrite()
+        elif store_size > self.store_bytes:
+            self.add(rows, store_size)
+
+    def add(self, rows: list[tuple[str, int, int, int]], store_bytes: int) -> None:
+        self._merge(rows)
+        self.store_bytes = int(store_bytes)
+        self.append(rows, self.store_bytes)
+
+    def append(self, rows: list[tuple[str, int, int, int]], store_bytes: int) -> None:
+        """Write ``rows`` and an end mark without loading the file; see tail_end."""
+        lines = [json.dumps(list(row), ensure_ascii=False) for row in rows]
+        lines.append(json.dumps({"end": int(store_bytes)}))
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+
+    def tail_end(self) -> int | None:
+        """
+        Store size claimed by the file's trailing end mark, read from the last
+        few bytes only; None when the file is missing or does not end in a mark.
+        """
+        try:
+            with self.path.open("rb") as handle:
+                size = handle.seek(0, os.SEEK_END)
+                handle.seek(max(0, size - _OFFSET_TAIL_BYTES))
+                tail = handle.read()
+        except OSError:
+            return None
+        if not tail.endswith(b"\n"):
+            return None
+        try:
+            payload = json.loads(tail[:-1].rsplit(b"\n", 1)[-1])
+        except ValueError:
+            return None
+        if not isinstance(payload, dict) or not isinstance(payload.get("end"), int):
+            return None
+        return int(payload["end"])
+
+    def _merge(self, rows: list[tuple[str, int, int, int]]) -> None:
+        for fragment_id, offset, length, version in rows:
+            current = self.entries.get(fragment_id)
+            if current is None or version >= current[2]:
+                self.entries[fragment_id] = (offset, length, version)
+            self.records += 1
+
+    def _load(self) -> bool:
+        try:
+            with self.path.open("r", encoding="utf-8") as handle:
+                header = json.loads(handle.readline())
+                if not isinstance(header, dict) or header.get("v") != _OFFSET_INDEX_VERSION:
+                    return False
+                committed: dict[str, tuple[int, int, int]] = {}
+                pending: list[tuple[str, int, int, int]] = []
+                records = 0
+                for raw_line in handle:
+                    payload = json.loads(raw_line)
+                    if isinstance(payload, dict):
+                        for fragment_id, offset, length, version in pending:
+                            current = committed.get(fragment_id)
+                            if current is None or version >= current[2]:
+                                committed[fragment_id] = (offset, length, version)
+                        records += len(pending)
+                        pending = []
+                        self.store_bytes = int(payload["end"])
+                        continue
+                    fragment_id, offset, length, version = payload
+                    pending.append((str(fragment_id), int(offset), int(length), int(version)))
+        except (OSError, ValueError, TypeError, KeyError):
+            return False
+        self.entries = committed
+        self.records = records
+        return True
+
+    def _rewrite(self) -> None:
+        lines = [json.dumps({"v": _OFFSET_INDEX_VERSION})]
+        lines.extend(
+            json.dumps([fragment_id, offset, length, version], ensure_ascii=False)
+            for fragment_id, (offset, length, version) in self.entries.items()
+        )
+        lines.append(json.dumps({"end": self.store_bytes}))
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.records = len(self.entries)
+
+
 class FragmentStore:
-    """Append-only JSONL store for memory fragments with id-level roundtrip support."""
+    """
+    Append-only JSONL store for memory fragments with id-level roundtrip support.
 
-    def __init__(self, path: str | Path) -> None:
+    Appends go to ``path``. With ``segment_max_bytes`` set, the active file is
+    sealed into a read-only segment once it reaches that size; ``compact``
+    rewrites sealed segments down to the latest version of each id.
+    """
+
+    def __init__(self, path: str | Path, segment_max_bytes: int | None = None) -> None:
         self.path = Path(path)
+        self.segment_max_bytes = None if segment_max_bytes is None else max(1, int(segment_max_bytes))
         self.last_read_stats = StoreReadStats()
         self.last_append_stats = StoreAppendStats()
+        self.last_compaction_stats = StoreCompactionStats()
 
     def append_fragments(self, fragments: list[MemoryFragment], idempotent: bool = False) -> int:
         return int(self.append_fragments_with_stats(fragments=fragments, idempotent=idempotent).inserted)
 
+    def append_stream(
+        self,
+        fragments: Iterable[MemoryFragment],
+        idempotent: bool = False,
+        chunk_size: int = _APPEND_CHUNK_SIZE,
+        lock_timeout_s: float = 3.0,
+    ) -> StoreAppendStats:
+        """
+        Append fragments from any iterable in locked chunks of ``chunk_size``, so
+        input larger than memory can be ingested; the key index carries
+        idempotency across chunks. Returns the combined stats.
+        """
+        chunk_size = max(1, int(chunk_size))
+        total = StoreAppendStats()
+        iterator = iter(fragments)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                break
+            stats = self.append_fragments_with_stats(chunk, idempotent=idempotent, lock_timeout_s=lock_timeout_s)
+            total.attempted += stats.attempted
+            total.inserted += stats.inserted
+            total.skipped_existing += stats.skipped_existing
+            total.store_invalid_lines = stats.store_invalid_lines
+            total.key_index_rebuilt += stats.key_index_rebuilt
+            total.key_index_scanned_lines += stats.key_index_scanned_lines
+        self.last_append_stats = total
+        return total
+
     def append_fragments_with_stats(
         self,
         fragments: list[MemoryFragment],
@@ -111,82 +834,274 @@ class FragmentStore:
         stats = StoreAppendStats(attempted=len(fragments))
         _ensure_parent(self.path)
         with _FileLock(self.path, timeout_s=lock_timeout_s):
-            existing_keys: set[tuple[str, int]] = set()
-            if idempotent:
-                existing_rows, read_stats = self.load_fragments_with_stats(strict=False)
-                stats.store_invalid_lines = int(read_stats.skipped_invalid)
-                existing_keys = {(item.id, int(item.version)) for item in existing_rows}
+            # Idempotent appends create the key index; plain appends keep an existing one current.
+            index = _KeyIndex(self.path)
+            use_index = idempotent or index.path.exists()
+            existing_digests: set[bytes] = set()
+            batch_digests = [_key_digest(str(fragment.id), int(fragment.version)) for fragment in fragments]
+            if use_index:
+                header = index.sync()
+                if idempotent:
+                    stats.store_invalid_lines = int(header.invalid_lines)
+                    existing_digests = index.existing(set(batch_digests))
 
             pending: list[MemoryFragment] = []
+            pending_digests: list[bytes] = []
             seen_batch: set[tuple[str, int]] = set()
-            for fragment in fragments:
+            for fragment, digest in zip(fragments, batch_digests):
                 key = (str(fragment.id), int(fragment.version))
-                if idempotent and (key in existing_keys or key in seen_batch):
+                if idempotent and (digest in existing_digests or key in seen_batch):
                     stats.skipped_existing += 1
                     continue
                 pending.append(fragment)
+                pending_digests.append(digest)
                 seen_batch.add(key)
 
-            with self.path.open("a", encoding="utf-8") as handle:
-                for fragment in pending:
-                    handle.write(json.dumps(fragment.to_dict(), ensure_ascii=False) + "\n")
+            manifest = _SegmentManifest(self.path)
+            start = sum(size for _, size in manifest.layout())
+            encoded = [(json.dumps(fragment.to_dict(), ensure_ascii=False) + "\n").encode("utf-8") for fragment in pending]
+            with self.path.open("ab") as handle:
+                handle.write(b"".join(encoded))
             stats.inserted = len(pending)
+            # Extend an existing offset index only when it ends exactly where this
+            # append began; otherwise the next get_many catches it up under the lock.
+            offsets = _OffsetIndex(self.path)
+            if pending and offsets.tail_end() == start:
+                rows: list[tuple[str, int, int, int]] = []
+                position = start
+                for fragment, line in zip(pending, encoded):
+                    rows.append((str(fragment.id), position, len(line), int(fragment.version)))
+                    position += len(line)
+                offsets.append(rows, position)
+            if use_index:
+                index.add(pending_digests, start + sum(len(line) for line in encoded))
+                stats.key_index_rebuilt = int(index.rebuilt)
+                stats.key_index_scanned_lines = int(index.scanned_lines)
+            if self.segment_max_bytes is not None and self.path.stat().st_size >= self.segment_max_bytes:
+                manifest.seal_active()
 
         self.last_append_stats = stats
         return stats
 
-    def load_fragments(self, strict: bool = False) -> list[MemoryFragment]:
-        rows, _ = self.load_fragments_with_stats(strict=strict)
-        return rows
+    def get_many(self, ids: Iterable[str], lock_timeout_s: float = 3.0) -> dict[str, MemoryFragment]:
+        """
+        Latest version of each requested fragment, keyed by id in request order.
 
-    def load_fragments_with_stats(self, strict: bool = False) -> tuple[list[MemoryFragment], StoreReadStats]:
-        stats = StoreReadStats()
-        if not self.path.exists():
-            self.last_read_stats = stats
-            return [], stats
-
-        rows: list[MemoryFragment] = []
-        with self.path.open("r", encoding="utf-8-sig") as handle:
-            for lineno, raw_line in enumerate(handle, start=1):
-                stats.total_lines += 1
-                line = raw_line.strip()
-                if not line:
-                    stats.skipped_blank += 1
+        Reads only the requested lines through the byte-offset index, which is
+        created on first use and kept current by later appends; unknown ids are
+        left out.
+        """
+        wanted = list(dict.fromkeys(str(item) for item in ids))
+        if not wanted or not (self.path.exists() or _SegmentManifest(self.path).path.exists()):
+            return {}
+        manifest = _SegmentManifest(self.path)
+        with contextlib.ExitStack() as stack:
+            generation, handles = self._open_parts(stack, binary=True)
+            opened_bytes = sum(os.fstat(handle.fileno()).st_size for handle in handles)
+            index = _OffsetIndex(self.path)
+            # Appends extend the index only after writing their lines, and compaction
+            # drops it before the manifest swap. An index covering what was on disk
+            # when the parts were opened, loaded under the same generation, is
+            # current and needs no lock; otherwise it is built or extended below.
+            if index._load() and manifest.load()[0] == generation:
+                layout = [(Path(handle.name), os.fstat(handle.fileno()).st_size) for handle in handles]
+                if opened_bytes <= index.store_bytes <= sum(size for _, size in layout):
+                    return self._read_indexed(index, _SpanReader(layout, handles), wanted)
+        with _FileLock(self.path, timeout_s=lock_timeout_s):
+            index = _OffsetIndex(self.path)
+            index.sync()
+            return self._read_indexed(index, _SpanReader(index.layout), wanted)
+
+    @staticmethod
+    def _read_indexed(index: _OffsetIndex, reader: _SpanReader, wanted: list[str]) -> dict[str, MemoryFragment]:
+        found: dict[str, MemoryFragment] = {}
+        spans = sorted((index.entries[fid][:2], fid) for fid in wanted if fid in index.entries)
+        try:
+            for (offset, length), fid in spans:
+                found[fid] = MemoryFragment.from_dict(json.loads(reader.read(offset, length).decode("utf-8")))
+        finally:
+            reader.close()
+        return {fid: found[fid] for fid in wanted if fid in found}
+
+    def compact(self, lock_timeout_s: float = 3.0) -> StoreCompactionStats:
+        """
+        Seal the active file, then rewrite all sealed segments into one that keeps
+        only the line load_latest_by_id would pick for each id, in the same order.
+
+        Sealed segments never change, so the rewrite runs without the store lock
+        and appends continue meanwhile; the lock is taken again only to swap the
+        manifest. The key index keeps the digests of dropped versions, so
+        idempotent ingest still skips them, and the offset index is rebuilt on
+        next use. Old segment files are removed after the swap.
+        """
+        stats = StoreCompactionStats()
+        manifest = _SegmentManifest(self.path)
+        _ensure_parent(self.path)
+        with _FileLock(manifest.segment_dir, timeout_s=lock_timeout_s, stale_lock_s=600.0):
+            with _FileLock(self.path, timeout_s=lock_timeout_s):
+                manifest.seal_active()
+                _, snapshot = manifest.load()
+            layout = [(manifest.segment_dir / name, (manifest.segment_dir / name).stat().st_size) for name in snapshot]
+            stats.segments_before = len(snapshot)
+            stats.bytes_before = sum(size for _, size in layout)
+
+            latest: dict[str, tuple[int, int, int]] = {}
+            for offset, length, fragment in _iter_store_lines(layout, 0, stats.bytes_before):
+                stats.lines_before += 1
+                if fragment is None:
+                    stats.dropped_invalid += 1
                     continue
+                current = latest.get(fragment.id)
+                if current is None or int(fragment.version) >= current[2]:
+                    latest[fragment.id] = (offset, length, int(fragment.version))
+            stats.lines_after = len(latest)
+            stats.dropped_versions = stats.lines_before - stats.dropped_invalid - stats.lines_after
+            if len(snapshot) == 1 and stats.lines_after == stats.lines_before:
+                stats.segments_after, stats.bytes_after = 1, stats.bytes_before
+                self.last_compaction_stats = stats
+                return stats
+
+            tmp = manifest.segment_dir / "compact.tmp"
+            if latest:
+                reader = _SpanReader(layout)
                 try:
-                    payload = json.loads(line)
-                except json.JSONDecodeError as exc:
-                    stats.skipped_invalid += 1
-                    stats.decode_errors += 1
-                    if strict:
-                        raise ValueError(f"invalid json in store at line {lineno}: {exc.msg}") from exc
-                    continue
+                    with tmp.open("wb") as handle:
+                        for offset, length, _ in latest.values():
+                            line = reader.read(offset, length)
+                            handle.write(line if line.endswith(b"\n") else line + b"\n")
+                finally:
+                    reader.close()
+                stats.bytes_after = tmp.stat().st_size
+                stats.segments_after = 1
 
+            with _FileLock(self.path, timeout_s=lock_timeout_s):
+                generation, segments = manifest.load()
+                if segments[: len(snapshot)] != snapshot:
+                    raise ValueError(f"store manifest changed during compaction: {manifest.path}")
+                key_index = _KeyIndex(self.path)
+                header = key_index.sync() if key_index.path.exists() else None
+                _OffsetIndex(self.path).path.unlink(missing_ok=True)
+                kept = segments[len(snapshot) :]
+                if latest:
+                    name = f"{generation + 1:08d}.jsonl"
+                    os.replace(tmp, manifest.segment_dir / name)
+                    kept = [name] + kept
+                manifest.write(generation + 1, kept)
+                if header is not None:
+                    key_index.rebase(
+                        header.store_bytes - (stats.bytes_before - stats.bytes_after),
+                        header.invalid_lines - stats.dropped_invalid,
+                    )
+
+            for name in snapshot:
                 try:
-                    rows.append(MemoryFragment.from_dict(payload))
-                    stats.parsed_lines += 1
-                except Exception as exc:  # defensive parse guard
-                    stats.skipped_invalid += 1
-                    stats.schema_errors += 1
-                    if strict:
-                        raise ValueError(f"invalid fragment payload in store at line {lineno}: {exc}") from exc
-                    continue
+                    (manifest.segment_dir / name).unlink(missing_ok=True)
+                except OSError:
+                    pass  # still open by a reader; the file is no longer referenced
+        self.last_compaction_stats = stats
+        return stats
 
-        self.last_read_stats = stats
+    def load_fragments(self, strict: bool = False) -> list[MemoryFragment]:
+        rows, _ = self.load_fragments_with_stats(strict=strict)
+        return rows
+
+    def load_fragments_with_stats(
+        self, strict: bool = False, workers: int = 1
+    ) -> tuple[list[MemoryFragment], StoreReadStats]:
+        stats = StoreReadStats()
+        rows = list(self.iter_fragments(strict=strict, stats=stats, workers=workers))
         return rows, stats
 
     def load_latest_by_id(self, strict: bool = False) -> list[MemoryFragment]:
         rows, _ = self.load_latest_by_id_with_stats(strict=strict)
         return rows
 
-    def load_latest_by_id_with_stats(self, strict: bool = False) -> tuple[list[MemoryFragment], StoreReadStats]:
-        rows, stats = self.load_fragments_with_stats(strict=strict)
+    def load_latest_by_id_with_stats(
+        self, strict: bool = False, workers: int = 1
+    ) -> tuple[list[MemoryFragment], StoreReadStats]:
+        stats = StoreReadStats()
+        rows = list(self.iter_latest(strict=strict, stats=stats, workers=workers))
+        return rows, stats
+
+    def iter_fragments(
+        self, strict: bool = False, stats: StoreReadStats | None = None, workers: int = 1
+    ) -> Iterator[MemoryFragment]:
+        """
+        Yield every stored line's fragment in store order, one line at a time.
+
+        ``stats`` (also set as ``last_read_stats``) is updated as lines are read.
+        All parts are opened before the first line, so the stream reads a single
+        manifest generation even if the store is sealed or compacted meanwhile.
+        With ``workers`` > 1, stores larger than one chunk are split into
+        newline-aligned byte ranges decoded on a process pool; fragments, stats
+        and strict-mode errors come out exactly as in the serial read.
+        """
+        stats = StoreReadStats() if stats is None else stats
+        self.last_read_stats = stats
+        with contextlib.ExitStack() as stack:
+            if workers <= 1:
+                _, handles = self._open_parts(stack)
+                yield from iter_jsonl_fragments(itertools.chain.from_iterable(handles), stats, strict=strict)
+                return
+            _, raw_handles = self._open_parts(stack, binary=True)
+            if sum(os.fstat(handle.fileno()).st_size for handle in raw_handles) <= _LOAD_CHUNK_BYTES:
+                lines = itertools.chain.from_iterable(io.TextIOWrapper(handle, encoding="utf-8-sig") for handle in raw_handles)
+                yield from iter_jsonl_fragments(lines, stats, strict=strict)
+                return
+            with ProcessPoolExecutor(max_workers=int(workers)) as pool:
+                pending: deque[Future] = deque()
+                for data, first_line, part_start in _newline_chunks(raw_handles, _LOAD_CHUNK_BYTES):
+                    pending.append(pool.submit(_decode_store_chunk, data, first_line, part_start, strict))
+                    if len(pending) >= int(workers) * _LOAD_CHUNKS_PER_WORKER:
+                        yield from _collect_store_chunk(pending.popleft(), stats)
+                while pending:
+                    yield from _collect_store_chunk(pending.popleft(), stats)
+
+    def iter_latest(
+        self, strict: bool = False, stats: StoreReadStats | None = None, workers: int = 1
+    ) -> Iterator[MemoryFragment]:
+        """
+        Yield the latest version of each id in order of first appearance, as
+        load_latest_by_id does. Only the current winner per id is held, so memory
+        follows the number of ids rather than stored versions; the first fragment
+        is yielded once the scan has finished.
+        """
         latest: dict[str, MemoryFragment] = {}
-        for fragment in rows:
+        for fragment in self.iter_fragments(strict=strict, stats=stats, workers=workers):
             current = latest.get(fragment.id)
             if current is None or fragment.version >= current.version:
                 latest[fragment.id] = fragment
-        return list(latest.values()), stats
+        yield from latest.values()
+
+    def _open_parts(self, stack: contextlib.ExitStack, binary: bool = False) -> tuple[int, list[Any]]:
+        manifest = _SegmentManifest(self.path)
+        for attempt in range(_READ_ATTEMPTS):
+            last = attempt + 1 == _READ_ATTEMPTS
+            # Seals and manifest swaps hold the store lock, so the last attempt waits them out.
+            with _FileLock(self.path) if last else contextlib.nullcontext():
+                if last:
+                    manifest.recover()
+                generation, segments = manifest.load()
+                # Open handles outlive a seal or compaction that renames or unlinks
+                # their files; an unchanged generation afterwards means the set is current.
+                opened = contextlib.ExitStack()
+                try:
+                    handles = [
+                        opened.enter_context(path.open("rb") if binary else path.open("r", encoding="utf-8-sig"))
+                        for path in manifest.parts(segments)
+                        if path != self.path or path.exists()
+                    ]
+                except FileNotFoundError:
+                    opened.close()
+                    if last:
+                        raise
+                    continue
+                if last or manifest.load()[0] == generation:
+                    stack.enter_context(opened)
+                    return generation, handles
+                opened.close()
+            time.sleep(0.01 * (attempt + 1))
+        raise AssertionError("unreachable")
 
 
 def save_result(path: str | Path, result: ClusterBuildResult) -> None:
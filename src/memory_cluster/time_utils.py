@@ -1,8 +1,14 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from functools import lru_cache
 
+# Fragments, clusters and retrieval all see the same timestamp strings, so
+# each distinct string is parsed once per process and shared by every stage.
+_PARSE_CACHE_SIZE = 1 << 16
 
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
 def parse_iso_utc(ts: str) -> datetime | None:
     raw = (ts or "").strip()
     if not raw:
@@ -16,3 +22,22 @@ def parse_iso_utc(ts: str) -> datetime | None:
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def parse_iso_epoch(ts: str) -> float | None:
+    """POSIX seconds for an ISO timestamp, or None when it cannot be parsed."""
+    dt = parse_iso_utc(ts)
+    if dt is None:
+        return None
+    return dt.timestamp()
+
+
+def timestamp_sort_key(ts: str) -> float:
+    """
+    Chronological sort key: instants compare correctly across ``Z`` and
+    ``+hh:mm`` spellings, which raw string order does not. Unparseable
+    timestamps sort first.
+    """
+    epoch = parse_iso_epoch(ts)
+    return float("-inf") if epoch is None else epoch
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from src.memory_cluster.models import ClusterBuildResult, MemoryFragment
+
+_TOPICS = [
+    ("parser mode=fast alpha=0.7 enable cache", "method"),
+    ("parser mode=safe alpha=0.7 disable cache", "method"),
+    ("retriever top_k=5 if budget=low then top_k=3", "evidence"),
+    ("retriever top_k=8 not window=long", "evidence"),
+    ("planner owner=team_a deadline=friday", "noise"),
+]
+_WALL_CLOCK_KEYS = {"last_updated", "build_timestamp", "last_seen"}
+
+
+def topic_fragments(count: int, prefix: str = "t") -> list[MemoryFragment]:
+    """Fragments cycling through conflicting slot topics, unique for count <= 20."""
+    fragments: list[MemoryFragment] = []
+    for idx in range(count):
+        content, category = _TOPICS[idx % len(_TOPICS)]
+        fragments.append(
+            MemoryFragment(
+                id=f"{prefix}{idx:02d}",
+                agent_id="planner_agent" if idx % 2 == 0 else "writer_agent",
+                timestamp=f"2026-02-13T08:{idx:02d}:00+00:00",
+                content=f"{content} variant {idx % 4}",
+                type="draft",
+                tags={"category": category},
+                meta={"slots": {"owner": "team_a"}} if idx % 7 == 0 else {},
+            )
+        )
+    return fragments
+
+
+def comparable(result: ClusterBuildResult, ignored_prefixes: tuple[str, ...] = ()) -> object:
+    """Result payload without wall-clock fields, ``*_ms`` timings or keys starting with ``ignored_prefixes``."""
+
+    def strip(payload: object) -> object:
+        if isinstance(payload, dict):
+            return {
+                key: strip(value)
+                for key, value in payload.items()
+                if key not in _WALL_CLOCK_KEYS and not key.endswith("_ms") and not key.startswith(ignored_prefixes)
+            }
+        if isinstance(payload, list):
+            return [strip(value) for value in payload]
+        return payload
+
+    return strip(result.to_dict())
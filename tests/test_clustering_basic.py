@@ -2,10 +2,41 @@ from __future__ import annotations
 
 import unittest
 
-from src.memory_cluster.models import MemoryFragment, PreferenceConfig
+from src.memory_cluster.cluster import IncrementalClusterer
+from src.memory_cluster.embed import HashEmbeddingProvider
+from src.memory_cluster.models import MemoryCluster, MemoryFragment, PreferenceConfig
 from src.memory_cluster.pipeline import build_cluster_result
 
 
+def _assign_all(
+    clusterer: IncrementalClusterer,
+    fragments: list[MemoryFragment],
+    sparse: bool = False,
+) -> list[tuple[str, float, bool]]:
+    provider = HashEmbeddingProvider(dim=64)
+    clusters: list[MemoryCluster] = []
+    output: list[tuple[str, float, bool]] = []
+    for fragment in fragments:
+        embedding = provider.embed_sparse(fragment.content) if sparse else provider.embed(fragment.content)
+        assignment = clusterer.assign(fragment=fragment, embedding=embedding, clusters=clusters)
+        output.append((assignment.cluster_id, assignment.score, assignment.created_new))
+    return output
+
+
+def _mixed_fragments(count: int) -> list[MemoryFragment]:
+    return [
+        MemoryFragment(
+            id=f"x{idx:03d}",
+            agent_id="planner_agent",
+            timestamp=f"2026-02-09T10:{idx % 60:02d}:00+00:00",
+            content=f"mode {('fast', 'safe', 'strict')[idx % 3]} group_{idx % 7} alpha {idx % 5}",
+            type="draft",
+            tags={"category": ("method", "evidence")[idx % 2]},
+        )
+        for idx in range(count)
+    ]
+
+
 class TestClusteringBasic(unittest.TestCase):
     def test_similar_fragments_cluster_together(self) -> None:
         fragments = [
@@ -47,6 +78,41 @@ class TestClusteringBasic(unittest.TestCase):
         sizes = sorted(len(cluster.fragment_ids) for cluster in result.clusters)
         self.assertEqual(sizes, [1, 2])
 
+    def test_centroid_index_matches_list_scan_assignments(self) -> None:
+        fragments = _mixed_fragments(90)
+        for category_strict in (False, True):
+            indexed = _assign_all(
+                IncrementalClusterer(similarity_threshold=0.6, category_strict=category_strict),
+                fragments,
+            )
+            scanned = _assign_all(
+                IncrementalClusterer(
+                    similarity_threshold=0.6,
+                    category_strict=category_strict,
+                    enable_centroid_index=False,
+                ),
+                fragments,
+            )
+            self.assertEqual(indexed, scanned)
+            self.assertGreater(len({cluster_id for cluster_id, _, _ in indexed}), 1)
+
+    def test_sparse_embeddings_match_dense_assign_and_merge(self) -> None:
+        fragments = _mixed_fragments(60)
+        for enable_centroid_index in (True, False):
+            dense_clusterer = IncrementalClusterer(similarity_threshold=0.6, enable_centroid_index=enable_centroid_index)
+            sparse_clusterer = IncrementalClusterer(similarity_threshold=0.6, enable_centroid_index=enable_centroid_index)
+            self.assertEqual(
+                _assign_all(sparse_clusterer, fragments, sparse=True),
+                _assign_all(dense_clusterer, fragments),
+            )
+
+        provider = HashEmbeddingProvider(dim=64)
+        base = MemoryCluster(cluster_id="b", centroid=provider.embed("mode fast"), fragment_ids=["f1"])
+        other = MemoryCluster(cluster_id="o", centroid=provider.embed_sparse("mode safe"), fragment_ids=["f2"])
+        IncrementalClusterer()._merge_pair(base, other)
+        expected = [(a + b) / 2 for a, b in zip(provider.embed("mode fast"), provider.embed("mode safe"))]
+        self.assertEqual(base.centroid, expected)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import dataclasses
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.memory_cluster.cache import CompressionCache
+from src.memory_cluster.models import MemoryFragment, PreferenceConfig
+from src.memory_cluster.pipeline import build_cluster_result
+from tests.build_fixtures import comparable, topic_fragments
+
+_COUNTER_PREFIXES = (
+    "compression_cache_",
+    "compress_clusters_",
+    "slot_cache_",
+    "slot_prefilter_",
+    "semantic_dedup_",
+    "split_children_reused",
+)
+
+
+class TestCompressionCache(unittest.TestCase):
+    def _build(self, fragments: list[MemoryFragment], store_path: Path | None, **pref: object):
+        return build_cluster_result(
+            fragments,
+            PreferenceConfig.from_dict({"strict_conflict_split": True, "enable_conflict_graph": True, **pref}),
+            similarity_threshold=0.4,
+            merge_threshold=0.85,
+            compression_cache=CompressionCache.for_store(store_path) if store_path is not None else None,
+        )
+
+    def test_rebuild_reuses_unchanged_clusters(self) -> None:
+        fragments = topic_fragments(16)
+        baseline = self._build(fragments, None)
+        total = int(baseline.metrics["compress_clusters_recompressed"])
+        self.assertEqual(baseline.metrics["compress_clusters_reused"], 0)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_path = Path(tmp_dir) / "store.jsonl"
+            first = self._build(fragments, store_path)
+            second = self._build(fragments, store_path)
+            self.assertEqual(first.metrics["compress_clusters_recompressed"], total)
+            self.assertEqual(second.metrics["compress_clusters_recompressed"], 0)
+            self.assertEqual(second.metrics["compress_clusters_reused"], total)
+            self.assertEqual(second.metrics["compression_cache_persisted"], 0)
+            self.assertEqual(comparable(first, _COUNTER_PREFIXES), comparable(baseline, _COUNTER_PREFIXES))
+            self.assertEqual(comparable(second, _COUNTER_PREFIXES), comparable(baseline, _COUNTER_PREFIXES))
+
+            parallel = self._build(fragments, store_path, compress_workers=2)
+            self.assertEqual(parallel.metrics["compress_clusters_reused"], total)
+            self.assertEqual(comparable(parallel, _COUNTER_PREFIXES), comparable(baseline, _COUNTER_PREFIXES))
+
+    def test_new_member_version_recompresses_only_its_cluster(self) -> None:
+        fragments = topic_fragments(16)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_path = Path(tmp_dir) / "store.jsonl"
+            self._build(fragments, store_path)
+            edited = list(fragments)
+            edited[4] = dataclasses.replace(fragments[4], content="planner owner=team_b deadline=friday", version=2)
+
+            rebuilt = self._build(edited, store_path)
+            expected = self._build(edited, None)
+            self.assertGreater(rebuilt.metrics["compress_clusters_recompressed"], 0)
+            self.assertGreater(rebuilt.metrics["compress_clusters_reused"], 0)
+            self.assertEqual(comparable(rebuilt, _COUNTER_PREFIXES), comparable(expected, _COUNTER_PREFIXES))
+
+            changed_pref = self._build(edited, store_path, keep_conflicts=False)
+            self.assertEqual(changed_pref.metrics["compress_clusters_reused"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import unittest
 
+from src.memory_cluster.compress import ClusterCompressor
 from src.memory_cluster.models import MemoryFragment, PreferenceConfig
 from src.memory_cluster.pipeline import build_cluster_result
 from src.memory_cluster.preference import PreferenceDecision, PreferencePolicyEngine
@@ -56,6 +57,36 @@ class TestConflictGraphAndBudget(unittest.TestCase):
         self.assertGreater(conflict.priority, 0.0)
         self.assertIn(conflict.dominant_value, {"0.7", "0.2"})
 
+    def test_conflict_graph_follows_timestamp_order_with_unique_sources(self) -> None:
+        rows = [
+            ("e3", "writer_agent", "2026-02-09T10:03:00+00:00", "mode=safe"),
+            ("e1", "planner_agent", "2026-02-09T10:01:00+00:00", "mode=fast"),
+            ("e4", "planner_agent", "2026-02-09T10:04:00+00:00", "mode=fast again"),
+            ("e2", "planner_agent", "2026-02-09T10:02:00+00:00", "mode=fast retry"),
+            ("e5", "writer_agent", "2026-02-09T10:05:00+00:00", "mode=fast final"),
+        ]
+        fragments = [
+            MemoryFragment(id=fid, agent_id=agent, timestamp=ts, content=content, type="result")
+            for fid, agent, ts, content in rows
+        ]
+        result = build_cluster_result(
+            fragments=fragments,
+            preference_config=PreferenceConfig.from_dict({"enable_conflict_graph": True}),
+            similarity_threshold=0.0,
+            merge_threshold=0.95,
+        )
+
+        graph = next(cluster for cluster in result.clusters if cluster.conflict_graph).conflict_graph["mode"]
+        self.assertEqual(
+            [(edge["from"], edge["to"], edge["fragment_id"]) for edge in graph["edges"]],
+            [("fast", "safe", "e3"), ("safe", "fast", "e4")],
+        )
+        nodes = {node["value"]: node for node in graph["nodes"]}
+        self.assertEqual(nodes["fast"]["sources"], ["planner_agent", "writer_agent"])
+        self.assertEqual(nodes["fast"]["evidences"], ["e1", "e2", "e4", "e5"])
+        self.assertEqual(nodes["fast"]["last_seen"], "2026-02-09T10:05:00+00:00")
+        self.assertEqual(graph["dominant_value"], "fast")
+
     def test_adaptive_budget_adjusts_with_conflict_and_entropy(self) -> None:
         pref = PreferenceConfig.from_dict(
             {
@@ -92,6 +123,44 @@ class TestConflictGraphAndBudget(unittest.TestCase):
         self.assertGreaterEqual(high_budget, 100)
         self.assertLessEqual(low_budget, 100)
 
+    def test_trace_ref_summary_fills_budget_in_order(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"t{idx}",
+                agent_id="planner_agent",
+                timestamp=f"2026-02-09T11:{idx:02d}:00+00:00",
+                content=f"  step {idx}\nmode=fast with a long trailing explanation {idx}  ",
+                type="draft",
+            )
+            for idx in range(40)
+        ]
+        compressor = ClusterCompressor()
+        for budget in (40, 64, 120, 700):
+            summary = compressor._build_summary(
+                cluster_id="c",
+                unique_fragments=fragments,
+                consensus={},
+                conflicts=[],
+                conflict_graph={},
+                split_groups=[],
+                strength="strong",
+                detail_budget=budget,
+                include_trace_refs=True,
+            )
+            payload = "id=c;n=40;s=strong;cons=0;conf=0"
+            expected = payload
+            refs: list[str] = []
+            for fragment in fragments:
+                snippet = fragment.content.replace("\n", " ").strip()
+                snippet = snippet[:25] + "..." if len(snippet) > 28 else snippet
+                candidate = payload + ";refs=" + "|".join(refs + [f"{fragment.id}:{snippet}"])
+                if len(candidate) > budget:
+                    break
+                refs.append(f"{fragment.id}:{snippet}")
+                expected = candidate
+            self.assertEqual(summary, expected)
+            self.assertLessEqual(len(summary), budget)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import unittest
 
+from src.memory_cluster.cluster import IncrementalClusterer
 from src.memory_cluster.models import MemoryFragment, PreferenceConfig
 from src.memory_cluster.pipeline import build_cluster_result
 
@@ -94,6 +95,39 @@ class TestDualMergeGuard(unittest.TestCase):
         self.assertEqual(guarded_mixed, 0)
         self.assertGreaterEqual(int(guarded.metrics.get("merges_blocked_by_guard") or 0), 1)
 
+    def test_cached_slot_profiles_track_updates_and_merges(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"s{idx}",
+                agent_id="planner_agent",
+                timestamp=f"2026-02-09T09:0{idx}:00+00:00",
+                content=f"parser strategy mode note {idx}",
+                type="draft",
+                meta={"slots": {"mode": mode}, "flags": {"strict": idx % 2 == 0}},
+            )
+            for idx, mode in enumerate(["fast", "fast", "safe", "fast", "safe"])
+        ]
+        lookup = {item.id: item for item in fragments}
+        clusterer = IncrementalClusterer(similarity_threshold=1.1, merge_threshold=0.05, enable_dual_merge_guard=True)
+        clusters = []
+        for fragment in fragments[:3]:
+            clusterer.assign(fragment, [1.0, float(len(clusters))], clusters)
+        left, right, third = clusters
+
+        self.assertEqual(clusterer._conflict_compatibility(left, right, lookup), 0.0)
+        self.assertEqual(clusterer._conflict_compatibility(left, third, lookup), 0.0)
+        clusterer._update_cluster(left, fragments[3], [1.0, 0.0])
+        clusterer._merge_pair(left, third)
+        clusterer._update_cluster(right, fragments[4], [1.0, 1.0])
+
+        cached = {cluster.cluster_id: clusterer._slot_profile(cluster, lookup) for cluster in (left, right)}
+        clusterer._slot_profiles.clear()
+        rebuilt = {cluster.cluster_id: clusterer._slot_profile(cluster, lookup) for cluster in (left, right)}
+        self.assertEqual(cached, rebuilt)
+        self.assertEqual(cached[left.cluster_id]["mode"], {"fast": 2, "safe": 1})
+        self.assertEqual(cached[left.cluster_id]["flag:strict"], {"true": 2, "false": 1})
+        self.assertEqual(clusterer._conflict_compatibility(left, right, lookup), 1.0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import copy
 import unittest
+from unittest import mock
 
+from src.memory_cluster import pipeline as pipeline_module
+from src.memory_cluster.compress import ClusterCompressor
 from src.memory_cluster.models import MemoryFragment, PreferenceConfig
 from src.memory_cluster.pipeline import build_cluster_result
+from src.memory_cluster.preference import PreferencePolicyEngine
 
 
 class TestEdgeCases(unittest.TestCase):
@@ -44,6 +49,68 @@ class TestEdgeCases(unittest.TestCase):
         split_clusters = [c for c in result.clusters if c.tags.get("split_from")]
         self.assertTrue(split_clusters)
 
+    def test_split_children_reuse_parent_analysis(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"r{idx}",
+                agent_id="planner_agent" if idx % 3 else "writer_agent",
+                timestamp=f"2026-02-09T11:{idx:02d}:00+00:00",
+                content=f"parser mode={'fast' if idx % 2 else 'safe'} alpha={idx % 3} run {idx}",
+                type="result",
+                tags={"category": "method"},
+            )
+            for idx in range(12)
+        ]
+        pref = PreferenceConfig.from_dict({"strict_conflict_split": True, "enable_conflict_graph": True})
+        result = build_cluster_result(fragments, pref, similarity_threshold=0.0, merge_threshold=0.95)
+
+        children = [c for c in result.clusters if c.tags.get("split_from")]
+        self.assertGreaterEqual(len(children), 2)
+        self.assertEqual(result.metrics["split_children"], len(children))
+        self.assertEqual(result.metrics["split_children_reused"], len(children))
+        self.assertEqual(result.metrics["split_member_fragments"], sum(len(c.fragment_ids) for c in children))
+
+        by_id = {item.id: item for item in fragments}
+        engine = PreferencePolicyEngine(pref)
+        decisions = {item.id: engine.decide_for_fragment(item) for item in fragments}
+        for child in children:
+            fresh = copy.deepcopy(child)
+            fresh.version -= 1
+            ClusterCompressor(strict_conflict_split=True).compress(
+                fresh, [by_id[fid] for fid in child.fragment_ids], engine, decisions
+            )
+            self.assertEqual(
+                (fresh.backrefs, fresh.consensus, fresh.conflict_graph, fresh.summary, fresh.version),
+                (child.backrefs, child.consensus, child.conflict_graph, child.summary, child.version),
+            )
+
+        with mock.patch.object(pipeline_module, "np", None):
+            loop_result = build_cluster_result(fragments, pref, similarity_threshold=0.0, merge_threshold=0.95)
+        self.assertEqual(
+            [c.centroid for c in loop_result.clusters if c.tags.get("split_from")],
+            [c.centroid for c in children],
+        )
+
+    def test_split_children_rerun_dedup_under_lsh_parents(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"h{idx:02d}",
+                agent_id="planner_agent",
+                timestamp=f"2026-02-09T{10 + idx // 60:02d}:{idx % 60:02d}:00+00:00",
+                content=f"parser mode={'fast' if idx % 2 else 'safe'} run {idx}",
+                type="result",
+                tags={"category": "method"},
+            )
+            for idx in range(70)
+        ]
+        for mode, reused in (("exact", True), ("lsh", False)):
+            pref = PreferenceConfig.from_dict({"strict_conflict_split": True, "semantic_dedup_mode": mode})
+            result = build_cluster_result(fragments, pref, similarity_threshold=0.0, merge_threshold=0.95)
+            children = [c for c in result.clusters if c.tags.get("split_from")]
+            self.assertGreaterEqual(len(children), 2, mode)
+            self.assertEqual(result.metrics["split_children_reused"], len(children) if reused else 0, mode)
+            self.assertGreaterEqual(result.metrics["split_ms"], 0.0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,18 @@
 
 import unittest
 
-from src.memory_cluster.embed import HashEmbeddingProvider, cosine_similarity, tokenize
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from src.memory_cluster.embed import (
+    HashEmbeddingProvider,
+    SparseVector,
+    TokenHashCache,
+    cosine_similarity,
+    tokenize,
+)
 from src.memory_cluster.eval import compute_metrics
 from src.memory_cluster.models import ConflictRecord, MemoryCluster, MemoryFragment
 
@@ -35,6 +46,65 @@ class TestEmbedEvalUnit(unittest.TestCase):
         norm_sq = sum(value * value for value in vec_a)
         self.assertAlmostEqual(norm_sq, 1.0, places=6)
 
+    def test_hash_embed_many_matches_single_embeddings(self) -> None:
+        provider = HashEmbeddingProvider(dim=32)
+        texts = ["mode fast alpha 0.7", "", "mode fast mode fast", "\u6a21\u5f0f safe alpha"]
+        self.assertEqual(provider.embed_many(texts), [provider.embed(text) for text in texts])
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_hash_embed_matrix_is_float32_and_matches_rows(self) -> None:
+        provider = HashEmbeddingProvider(dim=32)
+        texts = ["mode fast alpha 0.7", "", "mode safe alpha 0.7"]
+        matrix = provider.embed_matrix(texts)
+        self.assertEqual(matrix.shape, (3, 32))
+        self.assertEqual(str(matrix.dtype), "float32")
+        for row, text in zip(matrix, texts):
+            for got, expected in zip(row.tolist(), provider.embed(text)):
+                self.assertAlmostEqual(got, expected, places=6)
+
+    def test_token_hash_cache_counts_hits_misses_and_evictions(self) -> None:
+        cache = TokenHashCache(max_entries=2)
+        build_provider = HashEmbeddingProvider(dim=64, token_cache=cache)
+        query_provider = HashEmbeddingProvider(dim=16, token_cache=cache)
+        uncached = HashEmbeddingProvider(dim=64, token_cache=TokenHashCache(max_entries=0))
+
+        self.assertEqual(build_provider.embed("alpha beta"), uncached.embed("alpha beta"))
+        query_provider.embed("beta")
+        build_provider.embed("gamma")
+
+        stats = cache.snapshot_stats()
+        self.assertEqual(stats["token_cache_misses"], 3)
+        self.assertEqual(stats["token_cache_hits"], 1)
+        self.assertEqual(stats["token_cache_evictions"], 1)
+        self.assertEqual(stats["token_cache_size"], 2)
+        self.assertEqual(len(uncached.token_cache), 0)
+
+    def test_sparse_embedding_matches_dense_embedding(self) -> None:
+        provider = HashEmbeddingProvider(dim=1024)
+        text = "mode fast alpha mode"
+        sparse = provider.embed_sparse(text)
+        self.assertEqual(len(sparse), 1024)
+        self.assertEqual(sparse.nnz, 3)
+        self.assertEqual(list(sparse.indices), sorted(sparse.indices))
+        self.assertEqual(sparse.to_dense(), provider.embed(text))
+        self.assertEqual(SparseVector.from_dense(provider.embed(text)), sparse)
+        self.assertEqual(provider.embed_many_sparse([text, ""]), [sparse, provider.embed_sparse("")])
+
+    def test_sparse_cosine_kernels_match_dense_kernel(self) -> None:
+        provider = HashEmbeddingProvider(dim=64)
+        left = "mode fast alpha 0.7"
+        right = "mode safe alpha 0.7 replay"
+        dense_left = provider.embed(left)
+        dense_right = provider.embed(right)
+        centroid = [0.5 * value + 0.01 for value in dense_right]
+        sparse_left = provider.embed_sparse(left)
+        sparse_right = provider.embed_sparse(right)
+
+        self.assertEqual(cosine_similarity(sparse_left, sparse_right), cosine_similarity(dense_left, dense_right))
+        self.assertEqual(cosine_similarity(sparse_left, centroid), cosine_similarity(dense_left, centroid))
+        self.assertEqual(cosine_similarity(centroid[:40], sparse_left), cosine_similarity(centroid[:40], dense_left))
+        self.assertEqual(cosine_similarity(sparse_left, provider.embed_sparse("")), 0.0)
+
     def test_compute_metrics_prefers_l1_clusters_for_summary_fields(self) -> None:
         fragments = [
             MemoryFragment(id="f1", agent_id="a", timestamp="2026-02-12T00:00:00+00:00", content="dup", type="draft"),
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.memory_cluster import cache as cache_module
+from src.memory_cluster.cache import EmbeddingCache
+from src.memory_cluster.embed import HashEmbeddingProvider
+from src.memory_cluster.models import PreferenceConfig
+from src.memory_cluster.pipeline import build_cluster_result
+from tests.build_fixtures import comparable, topic_fragments
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_cached_vectors_match_provider_and_persist_across_opens(self) -> None:
+        provider = HashEmbeddingProvider(dim=64)
+        texts = ["parser mode fast alpha", "retriever top_k 5", "parser mode fast alpha", ""]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_path = Path(tmp_dir) / "store.jsonl"
+            with EmbeddingCache.for_store(store_path) as cache:
+                first = cache.embed_many_sparse(provider, texts, dim=64)
+                cache.flush()
+                self.assertEqual(cache.misses, 4)
+                self.assertEqual(len(cache), 3)
+
+            with EmbeddingCache.for_store(store_path) as cache:
+                second = cache.embed_many_sparse(provider, texts, dim=64)
+                stats = cache.snapshot_stats()
+                self.assertEqual(second, provider.embed_many_sparse(texts))
+                self.assertEqual(first, second)
+                self.assertEqual(stats["embedding_cache_hits"], 4)
+                self.assertEqual(stats["embedding_cache_misses"], 0)
+                self.assertEqual(stats["embedding_cache_hit_rate"], 1.0)
+                self.assertIsNone(cache.lookup("parser mode fast alpha", dim=128))
+                del first, second
+
+            self.assertTrue((Path(tmp_dir) / "store.jsonl.embcache.bin").exists())
+            self.assertTrue((Path(tmp_dir) / "store.jsonl.embcache.idx").exists())
+
+    def test_build_with_cache_matches_uncached_build(self) -> None:
+        fragments = topic_fragments(8)
+        pref = PreferenceConfig(strict_conflict_split=True, enable_dual_merge_guard=True)
+        baseline = build_cluster_result(fragments, pref, similarity_threshold=0.5, merge_threshold=0.8, embedding_dim=64)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_path = Path(tmp_dir) / "store.jsonl"
+            for expected_hits in (0, len(fragments)):
+                with EmbeddingCache.for_store(store_path) as cache:
+                    result = build_cluster_result(
+                        fragments,
+                        pref,
+                        similarity_threshold=0.5,
+                        merge_threshold=0.8,
+                        embedding_dim=64,
+                        embedding_cache=cache,
+                    )
+                self.assertEqual(result.metrics["embedding_cache_hits"], expected_hits)
+                self.assertEqual(comparable(result, ("embedding_cache_",)), comparable(baseline))
+            self.assertNotIn("embedding_cache_hits", baseline.metrics)
+
+    def test_reused_cache_serves_its_own_flushed_entries(self) -> None:
+        fragments = topic_fragments(12)
+        pref = PreferenceConfig(strict_conflict_split=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with EmbeddingCache.for_store(Path(tmp_dir) / "store.jsonl") as cache:
+                builds = [
+                    build_cluster_result(
+                        fragments,
+                        pref,
+                        similarity_threshold=0.5,
+                        merge_threshold=0.8,
+                        embedding_dim=64,
+                        embedding_cache=cache,
+                    )
+                    for _ in range(2)
+                ]
+        self.assertEqual(builds[0].metrics["embedding_cache_misses"], len(fragments))
+        # metrics count this build's lookups, not the cache's lifetime totals
+        self.assertEqual(builds[1].metrics["embedding_cache_hits"], len(fragments))
+        self.assertEqual(builds[1].metrics["embedding_cache_misses"], 0)
+        self.assertEqual(builds[1].metrics["embedding_cache_hit_rate"], 1.0)
+        self.assertEqual(comparable(builds[1], ("embedding_cache_",)), comparable(builds[0], ("embedding_cache_",)))
+
+    def test_eviction_keeps_recently_used_entries_within_budget(self) -> None:
+        provider = HashEmbeddingProvider(dim=64)
+        old_texts = [f"old fragment number {idx} alpha beta" for idx in range(20)]
+        hot_texts = ["hot fragment alpha beta gamma", "hot fragment delta epsilon"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            prefix = Path(tmp_dir) / "cache"
+            with EmbeddingCache(prefix) as cache:
+                cache.embed_many_sparse(provider, old_texts + hot_texts, dim=64)
+                cache.flush()
+            with EmbeddingCache(prefix) as cache:
+                cache.embed_many_sparse(provider, hot_texts, dim=64)
+                cache.flush()
+
+            with EmbeddingCache(prefix, max_bytes=256) as cache:
+                self.assertLessEqual((Path(tmp_dir) / "cache.bin").stat().st_size, 256)
+                self.assertGreater(cache.evicted, 0)
+                self.assertEqual(len(cache), 22 - cache.evicted)
+                for text in hot_texts:
+                    self.assertEqual(cache.lookup(text, dim=64), provider.embed_sparse(text))
+
+    def test_flush_enforces_budget_and_zero_budget_is_rejected(self) -> None:
+        provider = HashEmbeddingProvider(dim=64)
+        texts = [f"fragment number {idx} alpha beta gamma" for idx in range(20)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            prefix = Path(tmp_dir) / "cache"
+            with self.assertRaises(ValueError):
+                EmbeddingCache(prefix, max_bytes=0)
+
+            with EmbeddingCache(prefix, max_bytes=512) as cache:
+                cache.embed_many_sparse(provider, texts, dim=64)
+                cache.flush()
+                self.assertLessEqual((Path(tmp_dir) / "cache.bin").stat().st_size, 512)
+                self.assertGreater(cache.evicted, 0)
+                kept = [text for text in texts if cache.lookup(text, dim=64) is not None]
+                self.assertGreater(len(kept), 0)
+                self.assertEqual(len(kept), 20 - cache.evicted)
+                for text in kept:
+                    self.assertEqual(cache.lookup(text, dim=64), provider.embed_sparse(text))
+
+    def test_mismatched_index_epoch_resets_cache(self) -> None:
+        provider = HashEmbeddingProvider(dim=32)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            prefix = Path(tmp_dir) / "cache"
+            with EmbeddingCache(prefix) as cache:
+                cache.embed_many_sparse(provider, ["alpha beta"], dim=32)
+                cache.flush()
+            index_path = Path(tmp_dir) / "cache.idx"
+            raw = bytearray(index_path.read_bytes())
+            raw[16] ^= 0xFF
+            index_path.write_bytes(bytes(raw))
+
+            with EmbeddingCache(prefix) as cache:
+                self.assertEqual(len(cache), 0)
+                self.assertIsNone(cache.lookup("alpha beta", dim=32))
+
+    def test_embedding_version_change_resets_cache(self) -> None:
+        provider = HashEmbeddingProvider(dim=32)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            prefix = Path(tmp_dir) / "cache"
+            with EmbeddingCache(prefix) as cache:
+                cache.embed_many_sparse(provider, ["alpha beta"], dim=32)
+                cache.flush()
+
+            with mock.patch.object(cache_module, "HASH_EMBEDDING_VERSION", cache_module.HASH_EMBEDDING_VERSION + 1):
+                with EmbeddingCache(prefix) as cache:
+                    self.assertEqual(len(cache), 0)
+                    self.assertIsNone(cache.lookup("alpha beta", dim=32))
+
+
+if __name__ == "__main__":
+    unittest.main()
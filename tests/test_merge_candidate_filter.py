@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 from collections import Counter
+import itertools
+import random
 import unittest
+from unittest import mock
 
 from scripts.run_candidate_filter_benchmark import synthetic_fragments as benchmark_candidate_fragments
-from src.memory_cluster.cluster import IncrementalClusterer
+from src.memory_cluster import cluster as cluster_module
+from src.memory_cluster.cluster import IncrementalClusterer, _HammingIndex, _pack_signature
 from src.memory_cluster.embed import HashEmbeddingProvider
 from src.memory_cluster.models import MemoryCluster, MemoryFragment, PreferenceConfig
 from src.memory_cluster.pipeline import build_cluster_result
@@ -68,6 +72,70 @@ class TestMergeCandidateFilter(unittest.TestCase):
         signatures = {clusterer._candidate_signature(provider.embed(text)) for text in texts}
         self.assertGreater(len(signatures), 1)
 
+    def test_batched_signatures_match_scalar_signatures(self) -> None:
+        provider = HashEmbeddingProvider(dim=128)
+        clusterer = IncrementalClusterer(
+            enable_merge_candidate_filter=True,
+            enable_merge_ann_candidates=True,
+            merge_candidate_bucket_dims=10,
+            merge_candidate_projection_steps=32,
+        )
+        vectors = [provider.embed(f"batched signature {idx} mode_{idx % 4} token_{idx * 7}") for idx in range(120)]
+        vectors += [[0.0] * 16, [], [0.5, -0.25, 0.125], [-1.0] * 40]
+        expected_candidate = [clusterer._candidate_signature(vector) for vector in vectors]
+        expected_ann = [
+            [clusterer._ann_signature(vector, table_idx) for table_idx in range(clusterer.merge_ann_num_tables)]
+            for vector in vectors
+        ]
+
+        self.assertEqual(clusterer._candidate_signatures(vectors), expected_candidate)
+        self.assertEqual(clusterer._ann_signature_rows(vectors), expected_ann)
+        with mock.patch.object(cluster_module, "np", None):
+            self.assertEqual(clusterer._candidate_signatures(vectors), expected_candidate)
+            self.assertEqual(clusterer._ann_signature_rows(vectors), expected_ann)
+
+    def test_hamming_index_matches_flip_enumeration_order(self) -> None:
+        rng = random.Random(7)
+        for bits, radius in ((10, 4), (12, 2), (6, 6), (32, 3)):
+            index = _HammingIndex(bits, radius)
+            keys = {_pack_signature(tuple(rng.randint(0, 1) for _ in range(bits))) for _ in range(300)}
+            for key in keys:
+                index.add(key)
+            query = next(iter(keys))
+            expected: list[int] = []
+            for distance in range(min(radius, bits) + 1):
+                for combo in itertools.combinations(range(bits), distance):
+                    probe = query
+                    for idx in combo:
+                        probe ^= 1 << idx
+                    if probe in keys:
+                        expected.append(probe)
+            self.assertEqual(index.query(query), expected)
+            index.discard(query)
+            self.assertNotIn(query, index.query(query))
+        self.assertEqual(_HammingIndex(4, 2).query(_pack_signature(())), [])
+
+    def test_wide_signatures_build_neighbors_within_radius(self) -> None:
+        provider = HashEmbeddingProvider(dim=256)
+        clusterer = IncrementalClusterer(
+            enable_merge_candidate_filter=True,
+            merge_candidate_bucket_dims=48,
+            merge_candidate_max_neighbors=8,
+            merge_candidate_signature_radius=6,
+        )
+        clusters = [
+            MemoryCluster(cluster_id=f"w{idx:03d}", centroid=provider.embed(f"wide signature {idx % 12} token_{idx}"))
+            for idx in range(60)
+        ]
+        state = clusterer._build_candidate_state(clusters)
+        self.assertIsNotNone(state)
+        assert state is not None
+        self.assertGreater(sum(len(peers) for peers in state.neighbors.values()), 0)
+        for cid, peers in state.neighbors.items():
+            for peer in peers:
+                distance = (state.signatures_by_id[cid] ^ state.signatures_by_id[peer]).bit_count()
+                self.assertLessEqual(distance, 6)
+
     def test_candidate_neighbor_degree_respects_cap(self) -> None:
         provider = HashEmbeddingProvider(dim=128)
         clusterer = IncrementalClusterer(
@@ -119,6 +187,45 @@ class TestMergeCandidateFilter(unittest.TestCase):
         self.assertIsNone(neighbors)
         self.assertGreaterEqual(clusterer.merge_candidate_filter_fallbacks, 1)
 
+    def test_neighbor_refresh_after_merge_keeps_reverse_index_consistent(self) -> None:
+        provider = HashEmbeddingProvider(dim=128)
+        clusterer = IncrementalClusterer(
+            enable_merge_candidate_filter=True,
+            merge_candidate_bucket_dims=10,
+            merge_candidate_max_neighbors=6,
+        )
+        clusters = [
+            MemoryCluster(cluster_id=f"r{idx:03d}", centroid=provider.embed(f"candidate cluster text {idx} mode fast"))
+            for idx in range(30)
+        ]
+        state = clusterer._build_candidate_state(clusters)
+        self.assertIsNotNone(state)
+        assert state is not None
+        removed = min(state.reverse_neighbors, key=lambda cid: (len(state.reverse_neighbors[cid]), cid))
+        referrers_before = len(state.reverse_neighbors[removed])
+        base = next(item for item in clusters if item.cluster_id != removed)
+        clusterer._refresh_neighbors_after_merge(
+            base=base,
+            removed_cluster_id=removed,
+            gate_mode="candidate_filter",
+            candidate_state=state,
+            ann_state=None,
+        )
+
+        self.assertNotIn(removed, state.neighbors)
+        self.assertNotIn(removed, state.reverse_neighbors)
+        for cid, peers in state.neighbors.items():
+            self.assertNotIn(removed, peers)
+            self.assertNotIn(cid, peers)
+            for peer in peers:
+                self.assertIn(cid, state.reverse_neighbors[peer])
+        for peer, referrers in state.reverse_neighbors.items():
+            for cid in referrers:
+                self.assertIn(peer, state.neighbors[cid])
+        stats = clusterer.snapshot_stats()
+        self.assertEqual(stats["merge_neighbor_sets_touched"], referrers_before + 1)
+        self.assertLess(stats["merge_neighbor_sets_touched_max"], len(clusters) - 1)
+
     def test_candidate_filter_reduces_attempts_on_sparse_case(self) -> None:
         fragments = _sparse_fragments(64)
 
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+from src.memory_cluster import cluster as cluster_module
+from src.memory_cluster.cluster import IncrementalClusterer
+from src.memory_cluster.models import MemoryCluster, MemoryFragment, PreferenceConfig
+from src.memory_cluster.pipeline import build_cluster_result
+
+
+def _membership_signature(result: object) -> list[tuple[str, ...]]:
+    clusters = getattr(result, "clusters")
+    l1 = [cluster for cluster in clusters if int(cluster.level) == 1]
+    return sorted(tuple(sorted(cluster.fragment_ids)) for cluster in l1)
+
+
+def _cluster(cluster_id: str, centroid: list[float]) -> MemoryCluster:
+    return MemoryCluster(
+        cluster_id=cluster_id,
+        centroid=list(centroid),
+        fragment_ids=[cluster_id],
+        source_distribution={"planner_agent": 1},
+        backrefs=[cluster_id],
+    )
+
+
+def _grouped_fragments() -> list[MemoryFragment]:
+    topics = [
+        ("parser strategy mode fast for throughput", "method", {"mode": "fast"}),
+        ("parser strategy mode safe for reliability", "method", {"mode": "safe"}),
+        ("alpha equals 0.7 in experiment replay", "evidence", {"alpha": "0.7"}),
+        ("retriever top_k window for cluster recall", "method", {"top_k": "5"}),
+    ]
+    fragments: list[MemoryFragment] = []
+    for idx in range(24):
+        content, category, slots = topics[idx % len(topics)]
+        fragments.append(
+            MemoryFragment(
+                id=f"h{idx:02d}",
+                agent_id="planner_agent" if idx % 2 == 0 else "writer_agent",
+                timestamp=f"2026-02-09T10:{idx:02d}:00+00:00",
+                content=f"{content} variant {idx % 3}",
+                type="draft",
+                tags={"category": category},
+                meta={"slots": dict(slots)},
+            )
+        )
+    return fragments
+
+
+class TestMergeHeap(unittest.TestCase):
+    def test_heap_merges_most_similar_pair_first(self) -> None:
+        clusters = [
+            _cluster("a", [1.0, 0.0, 0.0]),
+            _cluster("b", [0.8, 0.6, 0.0]),
+            _cluster("c", [0.95, 0.312, 0.0]),
+        ]
+        scan = IncrementalClusterer(merge_threshold=0.75)
+        scan_out = scan.merge_clusters([_cluster(item.cluster_id, item.centroid) for item in clusters])
+        heap = IncrementalClusterer(merge_threshold=0.75, enable_merge_heap=True)
+        heap_out = heap.merge_clusters(clusters)
+
+        self.assertEqual([item.fragment_ids for item in scan_out], [["a", "b", "c"]])
+        self.assertEqual([item.fragment_ids for item in heap_out], [["a", "c", "b"]])
+        self.assertEqual(heap.merges_applied, 2)
+        self.assertGreaterEqual(heap.merge_heap_pushes, heap.merge_heap_pops)
+        self.assertGreater(heap.merge_heap_pops, 0)
+        self.assertEqual(scan.merge_heap_pushes, 0)
+
+    def test_heap_keeps_membership_and_guard_on_grouped_fragments(self) -> None:
+        fragments = _grouped_fragments()
+        base = {"enable_dual_merge_guard": True, "enable_merge_upper_bound_prune": True}
+        scan_result = build_cluster_result(
+            fragments=fragments,
+            preference_config=PreferenceConfig.from_dict(base),
+            similarity_threshold=2.0,
+            merge_threshold=0.8,
+        )
+        heap_result = build_cluster_result(
+            fragments=fragments,
+            preference_config=PreferenceConfig.from_dict({**base, "enable_merge_heap": True}),
+            similarity_threshold=2.0,
+            merge_threshold=0.8,
+        )
+
+        self.assertEqual(_membership_signature(heap_result), _membership_signature(scan_result))
+        self.assertEqual(heap_result.metrics["merges_applied"], scan_result.metrics["merges_applied"])
+        self.assertGreater(int(heap_result.metrics["merge_heap_pops"]), 0)
+        self.assertEqual(int(scan_result.metrics["merge_heap_pops"]), 0)
+
+    @unittest.skipIf(cluster_module.np is None, "numpy not installed")
+    def test_numpy_bounds_apply_same_merges_as_exact_heap(self) -> None:
+        fragments = _grouped_fragments()
+        pref = PreferenceConfig.from_dict(
+            {"enable_dual_merge_guard": True, "enable_merge_candidate_filter": True, "enable_merge_heap": True}
+        )
+        with_numpy = build_cluster_result(fragments, pref, similarity_threshold=2.0, merge_threshold=0.75)
+        with mock.patch.object(cluster_module, "np", None):
+            without_numpy = build_cluster_result(fragments, pref, similarity_threshold=2.0, merge_threshold=0.75)
+
+        self.assertEqual(
+            [(item.cluster_id, item.fragment_ids, item.centroid) for item in with_numpy.clusters],
+            [(item.cluster_id, item.fragment_ids, item.centroid) for item in without_numpy.clusters],
+        )
+        self.assertEqual(with_numpy.metrics["merges_applied"], without_numpy.metrics["merges_applied"])
+        self.assertEqual(
+            with_numpy.metrics["merges_blocked_by_guard"],
+            without_numpy.metrics["merges_blocked_by_guard"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
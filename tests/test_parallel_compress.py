@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import unittest
+
+from src.memory_cluster.models import PreferenceConfig
+from src.memory_cluster.pipeline import build_cluster_result
+from tests.build_fixtures import comparable, topic_fragments
+
+
+class TestParallelCompress(unittest.TestCase):
+    def test_worker_pool_matches_serial_output_and_stats(self) -> None:
+        fragments = topic_fragments(30)
+        base = {"strict_conflict_split": True, "enable_conflict_graph": True, "semantic_dedup_threshold": 0.8}
+        serial = build_cluster_result(
+            fragments, PreferenceConfig.from_dict(base), similarity_threshold=0.4, merge_threshold=0.85
+        )
+        parallel = build_cluster_result(
+            fragments,
+            PreferenceConfig.from_dict({**base, "compress_workers": 2}),
+            similarity_threshold=0.4,
+            merge_threshold=0.85,
+        )
+
+        self.assertGreater(len(serial.clusters), 1)
+        self.assertEqual(comparable(parallel, ("compress_workers",)), comparable(serial, ("compress_workers",)))
+        self.assertEqual(parallel.metrics["slot_cache_hits"], serial.metrics["slot_cache_hits"])
+        self.assertEqual(parallel.metrics["slot_cache_misses"], serial.metrics["slot_cache_misses"])
+        self.assertGreater(serial.metrics["slot_prefilter_skipped"], 0)
+        for key in ("slot_prefilter_scanned", "slot_prefilter_skipped"):
+            self.assertEqual(parallel.metrics[key], serial.metrics[key], key)
+
+    def test_worker_count_is_clamped(self) -> None:
+        self.assertEqual(PreferenceConfig.from_dict({"compress_workers": 0}).compress_workers, 1)
+        self.assertEqual(PreferenceConfig.from_dict({"compress_workers": "3"}).compress_workers, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import dataclasses
 import unittest
 from datetime import datetime, timedelta, timezone
+from unittest import mock
 
+from src.memory_cluster import preference as preference_module
 from src.memory_cluster.models import MemoryFragment, PreferenceConfig
+from src.memory_cluster.pipeline import build_cluster_result
 from src.memory_cluster.preference import PreferencePolicyEngine
 
 
+class _FrozenClock(datetime):
+    current = datetime.now(timezone.utc)
+
+    @classmethod
+    def now(cls, tz=None):  # type: ignore[override]
+        return cls.current
+
+
 class TestPreferencePolicy(unittest.TestCase):
     def test_preference_can_change_retention_strength(self) -> None:
         now = datetime.now(timezone.utc)
@@ -55,6 +67,142 @@ class TestPreferencePolicy(unittest.TestCase):
         self.assertIn(decision_stale.strength, {"weak", "discardable"})
         self.assertTrue(decision_stale.stale)
 
+    def test_cached_decisions_invalidate_only_at_stale_boundary(self) -> None:
+        config = PreferenceConfig.from_dict({"category_strength": {"method": "strong"}, "stale_after_hours": 2})
+        engine = PreferencePolicyEngine(config)
+        fragment = MemoryFragment(
+            id="d1",
+            agent_id="planner_agent",
+            timestamp="2026-02-10T11:00:00+00:00",
+            content="mode=fast",
+            type="draft",
+            tags={"category": "method"},
+        )
+        with mock.patch.object(preference_module, "datetime", _FrozenClock):
+            _FrozenClock.current = datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc)
+            first = engine.decide_for_fragment(fragment)
+            _FrozenClock.current = datetime(2026, 2, 10, 12, 30, tzinfo=timezone.utc)
+            self.assertIs(engine.decide_for_fragment(fragment), first)
+            _FrozenClock.current = datetime(2026, 2, 10, 13, 30, tzinfo=timezone.utc)
+            crossed = engine.decide_for_fragment(fragment)
+            bumped = engine.decide_for_fragment(dataclasses.replace(fragment, version=2, tags={}))
+
+        self.assertEqual((first.strength, first.stale), ("strong", False))
+        self.assertEqual((crossed.strength, crossed.stale), ("weak", True))
+        self.assertEqual(bumped.strength, "discardable")
+        self.assertEqual(
+            engine.snapshot_stats(),
+            {
+                "policy_decisions_computed": 3,
+                "policy_decisions_reused": 1,
+                "policy_decisions_invalidated": 1,
+                "policy_decisions_evicted": 0,
+            },
+        )
+
+    def test_compiled_protections_match_config_rules(self) -> None:
+        config = PreferenceConfig.from_dict(
+            {
+                "hard_keep_tags": ["pinned"],
+                "protected_path_prefixes": ["src\\core", "docs/", ""],
+                "protected_scopes": ["current_task"],
+            }
+        )
+        engine = PreferencePolicyEngine(config)
+        cases = {
+            ("pinned", "", ""): True,
+            ("", "current_task", ""): True,
+            ("", "other_task", ""): False,
+            ("", "", "src/core/io.py"): True,
+            ("", "", "src\\core_utils\\x.py"): True,
+            ("", "", "src/cor"): False,
+            ("", "", "docs/readme.md"): True,
+            ("", "", "tests/docs/readme.md"): False,
+        }
+        for (tag, scope, path), expected in cases.items():
+            tags = {"category": "noise"}
+            if tag:
+                tags[tag] = True
+            if scope:
+                tags["scope"] = scope
+            fragment = MemoryFragment(
+                id="x", agent_id="a", timestamp="", content="", type="log", tags=tags, meta={"file_path": path}
+            )
+            self.assertEqual(engine._is_protected_fragment(fragment), expected, (tag, scope, path))
+
+    def test_reused_engine_serves_decisions_across_builds(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"b{idx}",
+                agent_id="planner_agent",
+                timestamp=f"2026-02-09T10:{idx:02d}:00+00:00",
+                content=f"parser mode=fast run {idx}",
+                type="draft",
+                tags={"category": "method"},
+            )
+            for idx in range(5)
+        ]
+        engine = PreferencePolicyEngine(PreferenceConfig())
+        first = build_cluster_result(fragments, policy_engine=engine, similarity_threshold=0.0)
+        second = build_cluster_result(fragments, policy_engine=engine, similarity_threshold=0.0)
+
+        self.assertEqual(first.metrics["policy_decisions_computed"], 5)
+        self.assertEqual(second.metrics["policy_decisions_computed"], 0)
+        self.assertEqual(second.metrics["policy_decisions_reused"], 5)
+        self.assertGreaterEqual(second.metrics["policy_decision_ms"], 0.0)
+        self.assertEqual([c.summary for c in first.clusters], [c.summary for c in second.clusters])
+        with self.assertRaises(ValueError):
+            build_cluster_result(fragments, PreferenceConfig(), policy_engine=engine)
+
+    def test_mutated_config_recompiles_reused_engine(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"m{idx}",
+                agent_id="planner_agent",
+                timestamp=f"2026-02-09T10:{idx:02d}:00+00:00",
+                content=f"retriever top_k={idx} window=short",
+                type="draft",
+                tags={"category": "noise", "pin": "yes"} if idx == 0 else {"category": "noise"},
+            )
+            for idx in range(3)
+        ]
+        config = PreferenceConfig()
+        engine = PreferencePolicyEngine(config)
+        first = build_cluster_result(fragments, policy_engine=engine, similarity_threshold=0.0)
+        self.assertEqual(engine.decide_for_fragment(fragments[0]).strength, "discardable")
+
+        config.hard_keep_tags.append("pin")
+        second = build_cluster_result(fragments, policy_engine=engine, similarity_threshold=0.0)
+
+        self.assertEqual(second.metrics["policy_decisions_computed"], 3)
+        self.assertEqual(second.metrics["policy_decisions_reused"], 0)
+        self.assertEqual(engine.decide_for_fragment(fragments[0]).strength, "strong")
+        self.assertEqual(engine.decide_for_fragment(fragments[1]).strength, "discardable")
+        self.assertFalse(engine.refresh_config())
+        self.assertEqual(first.metrics["policy_decisions_computed"], 3)
+
+    def test_decision_cache_is_bounded_lru(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"l{idx}",
+                agent_id="planner_agent",
+                timestamp="2026-02-09T10:00:00+00:00",
+                content=f"note {idx}",
+                type="draft",
+            )
+            for idx in range(4)
+        ]
+        engine = PreferencePolicyEngine(PreferenceConfig(), max_cached_decisions=2)
+        for fragment in fragments:
+            engine.decide_for_fragment(fragment)
+        self.assertEqual(len(engine._decisions), 2)
+        self.assertEqual(engine.snapshot_stats()["policy_decisions_evicted"], 2)
+
+        engine.decide_for_fragment(fragments[2])
+        engine.decide_for_fragment(fragments[0])
+        self.assertEqual(list(engine._decisions), [("l2", 1), ("l0", 1)])
+        self.assertEqual(engine.decisions_reused, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import tempfile
 import unittest
+from pathlib import Path
 
+from src.memory_cluster.models import MemoryFragment
 from src.memory_cluster.retrieve import MemoryRetriever
+from src.memory_cluster.store import FragmentStore
 
 
 class DummyEmbeddingProvider:
@@ -137,6 +141,28 @@ class TestRetrieverOrdering(unittest.TestCase):
         self.assertEqual(results[0]["cluster_id"], "high-priority")
         self.assertEqual(results[1]["cluster_id"], "low-priority")
 
+    def test_expand_rehydrates_backrefs_from_store(self) -> None:
+        provider = DummyEmbeddingProvider({"q": [1.0, 0.0]})
+        retriever = MemoryRetriever(provider)  # type: ignore[arg-type]
+        state = {
+            "clusters": [{"cluster_id": "c1", "centroid": [1.0, 0.0], "summary": "s", "backrefs": ["f1", "f2", "f3"]}],
+            "fragments": [{"id": "f3", "content": "from state"}],
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = FragmentStore(Path(tmp_dir) / "store.jsonl")
+            store.append_fragments(
+                [
+                    MemoryFragment(id=fid, agent_id="a", timestamp="2026-02-09T00:00:00+00:00", content=f"store {fid}", type="draft")
+                    for fid in ("f2", "f1")
+                ]
+            )
+            results = retriever.query(state=state, query_text="q", expand=True, store=store)
+
+        self.assertEqual(
+            [item["content"] for item in results[0]["fragments"]],
+            ["store f1", "store f2", "from state"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
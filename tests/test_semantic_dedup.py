@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import unittest
 
+from src.memory_cluster.compress import ClusterCompressor
 from src.memory_cluster.models import MemoryFragment, PreferenceConfig
 from src.memory_cluster.pipeline import build_cluster_result
 
@@ -46,6 +47,38 @@ class TestSemanticDedup(unittest.TestCase):
         self.assertEqual(len(cluster.fragment_ids), 3)
         self.assertLess(len(cluster.backrefs), len(cluster.fragment_ids))
 
+    def test_lsh_mode_keeps_exact_dedup_result_on_tool_logs(self) -> None:
+        fragments = [
+            MemoryFragment(
+                id=f"log{idx:03d}",
+                agent_id="tool_agent",
+                timestamp=f"2026-02-09T11:{idx % 60:02d}:00+08:00",
+                content=(
+                    f"tool run step_{idx % 40} status ok retries {idx % 3} "
+                    f"shard alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi "
+                    f"worker_{idx % 40} region_{idx % 40} queue_{idx % 40} batch_{idx % 40}"
+                ),
+                type="log",
+                tags={"category": "noise"},
+            )
+            for idx in range(160)
+        ]
+        exact = ClusterCompressor(semantic_dedup_threshold=0.88)
+        lsh = ClusterCompressor(semantic_dedup_threshold=0.88, semantic_dedup_mode="lsh")
+
+        expected = [item.id for item in exact._deduplicate(fragments)]
+        self.assertLess(len(expected), len(fragments))
+        self.assertEqual([item.id for item in lsh._deduplicate(fragments)], expected)
+        self.assertGreater(lsh.dedup_pairs_skipped, 0)
+        self.assertLess(lsh.dedup_candidates_checked, exact.dedup_candidates_checked)
+        self.assertEqual(exact.snapshot_stats()["semantic_dedup_pairs_skipped"], 0)
+
+    def test_dedup_mode_config_and_validation(self) -> None:
+        self.assertEqual(PreferenceConfig.from_dict({"semantic_dedup_mode": "LSH"}).semantic_dedup_mode, "lsh")
+        self.assertEqual(PreferenceConfig.from_dict({"semantic_dedup_mode": "bogus"}).semantic_dedup_mode, "exact")
+        with self.assertRaises(ValueError):
+            ClusterCompressor(semantic_dedup_mode="bogus")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import unittest
 
-from src.memory_cluster.compress import _extract_slot_values
+from src.memory_cluster.compress import SlotPrefilterStats, _extract_slot_values
 from src.memory_cluster.models import MemoryFragment
 
 
@@ -59,6 +59,30 @@ class TestSemanticPrecisionRegression(unittest.TestCase):
         self.assertNotIn(("cond:it", "safe"), pairs)
         self.assertIn(("mode", "safe"), pairs)
 
+    def test_prefilter_skips_families_without_changing_pairs(self) -> None:
+        contents = [
+            "tool run step ok status worker batch region latency",
+            "if mode=fast then cache=true, final cache=false",
+            "should have alpha!=0.7, final alpha=0.2",
+            "IF Enable cache THEN rollback",
+            "\u4e0d\u542f\u7528 cache\uff0c\u6a21\u5f0f\uff1afast",
+            "ALPHA \u2260 0.7 and mode is not safe",
+            "do not disable cache, enable cache",
+        ]
+        prefilter = SlotPrefilterStats()
+        for idx, content in enumerate(contents):
+            fragment = _fragment(f"p{idx}", content)
+            self.assertEqual(
+                _extract_slot_values(fragment, stats=prefilter), _extract_slot_values(fragment, prefilter=False)
+            )
+
+        stats = prefilter.to_dict()
+        for family, row in stats.items():
+            self.assertEqual(row["scanned"] + row["skipped"], len(contents), family)
+        self.assertGreaterEqual(stats["conditional"]["skipped"], 1)
+        self.assertGreaterEqual(stats["key_value"]["skipped"], 1)
+        self.assertGreaterEqual(stats["flag"]["scanned"], 3)
+
 
 if __name__ == "__main__":
     unittest.main()
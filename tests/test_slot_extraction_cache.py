@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.memory_cluster.cache import SlotExtractionCache
+from src.memory_cluster.compress import SLOT_EXTRACTOR_VERSION, _extract_slot_values, slot_cache_key
+from src.memory_cluster.models import MemoryFragment, PreferenceConfig
+from src.memory_cluster.pipeline import build_cluster_result
+from tests.build_fixtures import comparable, topic_fragments
+
+
+class TestSlotExtractionCache(unittest.TestCase):
+    def test_cached_build_matches_and_reuses_pairs_across_builds(self) -> None:
+        fragments = topic_fragments(5)
+        pref = PreferenceConfig(strict_conflict_split=True)
+        baseline = build_cluster_result(fragments, pref, similarity_threshold=0.0, merge_threshold=0.95)
+        # split children reuse the parent's pairs instead of looking them up again
+        self.assertGreater(baseline.metrics["split_children_reused"], 0)
+        self.assertEqual(baseline.metrics["slot_cache_hits"], 0)
+        self.assertEqual(baseline.metrics["slot_cache_misses"], len(fragments))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_path = Path(tmp_dir) / "store.jsonl"
+            first = build_cluster_result(
+                fragments,
+                pref,
+                similarity_threshold=0.0,
+                merge_threshold=0.95,
+                slot_cache=SlotExtractionCache.for_store(store_path),
+            )
+            self.assertEqual(first.metrics["slot_cache_persisted"], len(fragments))
+            second = build_cluster_result(
+                fragments,
+                pref,
+                similarity_threshold=0.0,
+                merge_threshold=0.95,
+                slot_cache=SlotExtractionCache.for_store(store_path),
+            )
+            self.assertEqual(second.metrics["slot_cache_misses"], 0)
+            self.assertEqual(second.metrics["slot_cache_persisted"], 0)
+            counters = ("slot_cache_", "slot_prefilter_")
+            self.assertEqual(comparable(first, counters), comparable(baseline, counters))
+            self.assertEqual(comparable(second, counters), comparable(baseline, counters))
+            self.assertEqual(second.metrics["slot_prefilter_scanned"] + second.metrics["slot_prefilter_skipped"], 0)
+
+            cache = SlotExtractionCache.for_store(store_path)
+            for fragment in fragments:
+                self.assertEqual(cache.get(slot_cache_key(fragment)), tuple(_extract_slot_values(fragment)))
+
+    def test_stale_versions_are_ignored_and_compacted(self) -> None:
+        fragment = topic_fragments(1)[0]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "slots.jsonl"
+            stale = {"v": SLOT_EXTRACTOR_VERSION - 1, "k": slot_cache_key(fragment), "p": [["mode", "old"]]}
+            path.write_text(json.dumps(stale) + "\n" + "not json\n", encoding="utf-8")
+
+            cache = SlotExtractionCache(path)
+            self.assertIsNone(cache.get(slot_cache_key(fragment)))
+            cache.put(slot_cache_key(fragment), tuple(_extract_slot_values(fragment)))
+            cache.flush()
+
+            lines = path.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(len(lines), 1)
+            self.assertEqual(json.loads(lines[0])["v"], SLOT_EXTRACTOR_VERSION)
+
+    def test_key_tracks_meta_slots_and_flags(self) -> None:
+        base = MemoryFragment(id="k1", agent_id="a", timestamp="t", content="mode=fast", type="draft")
+        renamed = MemoryFragment(id="k2", agent_id="b", timestamp="t2", content="mode=fast", type="log")
+        with_slots = MemoryFragment(
+            id="k3", agent_id="a", timestamp="t", content="mode=fast", type="draft", meta={"slots": {"mode": "safe"}}
+        )
+        with_flags = MemoryFragment(
+            id="k4", agent_id="a", timestamp="t", content="mode=fast", type="draft", meta={"flags": {"cache": True}}
+        )
+        self.assertEqual(slot_cache_key(base), slot_cache_key(renamed))
+        self.assertNotEqual(slot_cache_key(base), slot_cache_key(with_slots))
+        self.assertNotEqual(slot_cache_key(base), slot_cache_key(with_flags))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,28 @@
 from __future__ import annotations
 
+import contextlib
+import io
 import json
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
+from src.memory_cluster.cli import main
 from src.memory_cluster.models import MemoryFragment
-from src.memory_cluster.store import FragmentStore
+from src.memory_cluster import store as store_module
+from src.memory_cluster.store import FragmentStore, _FileLock
+
+
+def _frag(fragment_id: str, version: int = 1) -> MemoryFragment:
+    return MemoryFragment(
+        id=fragment_id,
+        agent_id="planner_agent",
+        timestamp="2026-02-10T10:00:00+00:00",
+        content=f"indexed {fragment_id}",
+        type="draft",
+        version=version,
+    )
 
 
 class TestStoreReliability(unittest.TestCase):
@@ -78,6 +94,176 @@ class TestStoreReliability(unittest.TestCase):
             self.assertEqual(stats.skipped_existing, 1)
             self.assertEqual(len(store.load_fragments()), 1)
 
+    def test_key_index_picks_up_external_appends_and_rebuilds_when_missing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "fragments.jsonl"
+            store = FragmentStore(path)
+            index_path = path.with_name(path.name + ".keyidx")
+
+            first = store.append_fragments_with_stats([_frag("a"), _frag("b")], idempotent=True)
+            self.assertEqual(first.key_index_rebuilt, 1)
+            self.assertTrue(index_path.exists())
+
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write("{broken\n")
+                handle.write(json.dumps(_frag("c").to_dict()) + "\n")
+            tail = store.append_fragments_with_stats([_frag("c"), _frag("d")], idempotent=True)
+            self.assertEqual(tail.key_index_rebuilt, 0)
+            self.assertEqual(tail.key_index_scanned_lines, 2)
+            self.assertEqual(tail.skipped_existing, 1)
+            self.assertEqual(tail.inserted, 1)
+            self.assertEqual(tail.store_invalid_lines, 1)
+
+            index_path.unlink()
+            rebuilt = store.append_fragments_with_stats(
+                [_frag("a"), _frag("b", version=2), _frag("d")], idempotent=True
+            )
+            self.assertEqual(rebuilt.key_index_rebuilt, 1)
+            self.assertEqual(rebuilt.skipped_existing, 2)
+            self.assertEqual(rebuilt.inserted, 1)
+            self.assertEqual(rebuilt.store_invalid_lines, 1)
+
+            store.append_fragments([_frag("e")])
+            after_plain = store.append_fragments_with_stats([_frag("e")], idempotent=True)
+            self.assertEqual(after_plain.key_index_scanned_lines, 0)
+            self.assertEqual(after_plain.skipped_existing, 1)
+
+            path.write_text(json.dumps(_frag("z").to_dict()) + "\n", encoding="utf-8")
+            truncated = store.append_fragments_with_stats([_frag("a"), _frag("z")], idempotent=True)
+            self.assertEqual(truncated.key_index_rebuilt, 1)
+            self.assertEqual(truncated.inserted, 1)
+            self.assertEqual(truncated.store_invalid_lines, 0)
+
+    def test_get_many_reads_latest_versions_through_offset_index(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "fragments.jsonl"
+            path.write_text(json.dumps(_frag("a").to_dict()) + "\n{broken\n", encoding="utf-8-sig")
+            store = FragmentStore(path)
+            store.append_fragments([_frag("b"), _frag("a", version=3), _frag("a", version=2)])
+
+            fetched = store.get_many(["b", "missing", "a", "b"])
+            self.assertEqual(list(fetched), ["b", "a"])
+            self.assertEqual(fetched["a"].version, 3)
+            self.assertEqual(fetched["b"].content, "indexed b")
+            self.assertTrue(path.with_name(path.name + ".offsets.jsonl").exists())
+
+            store.append_fragments([_frag("c")])
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(_frag("b", version=5).to_dict()) + "\n")
+            fetched = store.get_many(["c", "b"])
+            self.assertEqual(fetched["c"].id, "c")
+            self.assertEqual(fetched["b"].version, 5)
+
+            path.write_text(json.dumps(_frag("z").to_dict()) + "\n", encoding="utf-8")
+            self.assertEqual(list(store.get_many(["a", "z"])), ["z"])
+
+    def test_append_extends_offset_index_without_reparsing_it(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "fragments.jsonl"
+            store = FragmentStore(path)
+            store.append_fragments([_frag("a"), _frag("b")])
+            store.get_many(["a"])
+            offsets_path = path.with_name(path.name + ".offsets.jsonl")
+
+            with mock.patch.object(store_module._OffsetIndex, "_load", side_effect=AssertionError("reparsed")):
+                store.append_stream(iter([_frag("a", version=2), _frag("c")]), idempotent=True, chunk_size=1)
+            tail = offsets_path.read_text(encoding="utf-8").splitlines()[-1]
+            self.assertEqual(json.loads(tail), {"end": path.stat().st_size})
+
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(_frag("b", version=3).to_dict()) + "\n")
+            before = offsets_path.read_bytes()
+            store.append_fragments([_frag("d")])
+            # the index no longer ends where the append began, so it is left for get_many
+            self.assertEqual(offsets_path.read_bytes(), before)
+            fetched = store.get_many(["a", "b", "c", "d"])
+            self.assertEqual([(item.id, item.version) for item in fetched.values()], [("a", 2), ("b", 3), ("c", 1), ("d", 1)])
+
+    def test_get_many_reads_covering_index_without_store_lock(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "fragments.jsonl"
+            store = FragmentStore(path)
+            store.append_fragments([_frag("a"), _frag("b"), _frag("a", version=2)])
+            self.assertEqual(store.get_many(["a"])["a"].version, 2)
+            store.append_fragments([_frag("b", version=4)])
+
+            with _FileLock(path):
+                fetched = store.get_many(["b", "a"], lock_timeout_s=0.1)
+                self.assertEqual([(item.id, item.version) for item in fetched.values()], [("b", 4), ("a", 2)])
+                with path.open("a", encoding="utf-8") as handle:
+                    handle.write(json.dumps(_frag("c").to_dict()) + "\n")
+                # lines the index does not cover yet still need the lock to be indexed
+                with self.assertRaises(TimeoutError):
+                    store.get_many(["c"], lock_timeout_s=0.1)
+            self.assertEqual(store.get_many(["c"])["c"].id, "c")
+
+    def test_iter_fragments_streams_with_running_stats(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "fragments.jsonl"
+            store = FragmentStore(path)
+            store.append_fragments([_frag("a"), _frag("b"), _frag("a", version=2)])
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write("\n{broken\n")
+            store.append_fragments([_frag("c")])
+
+            stream = store.iter_fragments()
+            first = next(stream)
+            self.assertEqual(first.id, "a")
+            self.assertEqual(store.last_read_stats.parsed_lines, 1)
+            self.assertEqual([item.id for item in stream], ["b", "a", "c"])
+            self.assertEqual(store.last_read_stats.total_lines, 6)
+            self.assertEqual(store.last_read_stats.skipped_blank, 1)
+            self.assertEqual(store.last_read_stats.decode_errors, 1)
+
+            latest = [(item.id, item.version) for item in store.iter_latest()]
+            self.assertEqual(latest, [("a", 2), ("b", 1), ("c", 1)])
+            self.assertEqual(latest, [(item.id, item.version) for item in store.load_latest_by_id()])
+
+    def test_append_stream_keeps_idempotency_across_chunks(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = FragmentStore(Path(tmp_dir) / "fragments.jsonl")
+            batch = [_frag("a"), _frag("b"), _frag("a"), _frag("c"), _frag("b", version=2), _frag("b")]
+            stats = store.append_stream(iter(batch), idempotent=True, chunk_size=2)
+            self.assertEqual(stats.attempted, 6)
+            self.assertEqual(stats.inserted, 4)
+            self.assertEqual(stats.skipped_existing, 2)
+            self.assertEqual(len(store.load_fragments()), 4)
+
+    def test_append_stream_chunk_bounds(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = FragmentStore(Path(tmp_dir) / "fragments.jsonl")
+            with mock.patch.object(store, "append_fragments_with_stats", wraps=store.append_fragments_with_stats) as spy:
+                stats = store.append_stream(iter([_frag("a"), _frag("b")]), chunk_size=0)
+                self.assertEqual(stats.inserted, 2)
+                self.assertEqual(spy.call_count, 2)
+
+                spy.reset_mock()
+                stats = store.append_stream(iter([_frag("c"), _frag("d"), _frag("e"), _frag("f")]), chunk_size=2)
+                self.assertEqual(stats.inserted, 4)
+                self.assertEqual(spy.call_count, 2)
+            self.assertEqual(len(store.load_fragments()), 6)
+
+    def test_strict_ingest_validates_input_before_writing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir) / "input.jsonl"
+            store_path = Path(tmp_dir) / "store.jsonl"
+            source.write_text(json.dumps(_frag("a").to_dict()) + "\n{broken\n", encoding="utf-8")
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                code = main(["ingest", "--input", str(source), "--store", str(store_path), "--strict-input"])
+            self.assertEqual(code, 1)
+            self.assertIn("line 2", json.loads(output.getvalue())["message"])
+            self.assertFalse(store_path.exists())
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                code = main(["ingest", "--input", str(source), "--store", str(store_path)])
+            payload = json.loads(output.getvalue())
+            self.assertEqual(code, 0)
+            self.assertEqual(payload["input_stats"]["decode_errors"], 1)
+            self.assertEqual(payload["append_stats"]["inserted"], 1)
+
     def test_load_fragments_skips_invalid_lines_when_not_strict(self) -> None:
         with tempfile.TemporaryDirectory() as tmp_dir:
             store_path = Path(tmp_dir) / "store.jsonl"
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.memory_cluster import store as store_module
+from src.memory_cluster.cli import main
+from src.memory_cluster.models import MemoryFragment
+from src.memory_cluster.store import FragmentStore
+
+
+def _frag(fragment_id: str, version: int, content: str = "") -> MemoryFragment:
+    return MemoryFragment(
+        id=fragment_id,
+        agent_id="planner_agent",
+        timestamp="2026-02-10T10:00:00+00:00",
+        content=content or f"{fragment_id} v{version}",
+        type="draft",
+        version=version,
+    )
+
+
+class TestStoreSegments(unittest.TestCase):
+    def test_rolling_segments_and_compaction_keep_latest_view(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "store.jsonl"
+            store = FragmentStore(path, segment_max_bytes=400)
+            for version in (1, 2, 3):
+                store.append_fragments([_frag(fid, version) for fid in ("a", "b", "c")], idempotent=True)
+            store.append_fragments([_frag("b", 2, "b rewritten"), _frag("d", 1)])
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write("{broken\n")
+
+            segment_dir = path.with_name(path.name + ".segments")
+            self.assertGreater(len(list(segment_dir.glob("*.jsonl"))), 1)
+            before = [item.to_dict() for item in store.load_latest_by_id()]
+            self.assertEqual(store.last_read_stats.total_lines, 12)
+
+            stats = store.compact()
+            self.assertEqual(stats.segments_after, 1)
+            self.assertEqual(stats.lines_before, 12)
+            self.assertEqual(stats.lines_after, 4)
+            self.assertEqual(stats.dropped_invalid, 1)
+            self.assertEqual(stats.dropped_versions, 7)
+            self.assertLess(stats.bytes_after, stats.bytes_before)
+            self.assertEqual(len(list(segment_dir.glob("*.jsonl"))), 1)
+            self.assertFalse(path.exists())
+
+            self.assertEqual([item.to_dict() for item in store.load_latest_by_id()], before)
+            self.assertEqual(store.last_read_stats.total_lines, 4)
+            self.assertEqual(store.get_many(["c", "b"])["b"].content, "b v3")
+
+            replay = store.append_fragments_with_stats([_frag("a", 1), _frag("a", 4)], idempotent=True)
+            self.assertEqual(replay.skipped_existing, 1)
+            self.assertEqual(replay.inserted, 1)
+            self.assertEqual(replay.store_invalid_lines, 0)
+            self.assertEqual(store.get_many(["a"])["a"].version, 4)
+
+    def test_compact_cli_reports_before_and_after_counts(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "store.jsonl"
+            store = FragmentStore(path)
+            store.append_fragments([_frag("a", 1), _frag("a", 2), _frag("b", 1)])
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                code = main(["compact", "--store", str(path)])
+            payload = json.loads(output.getvalue())
+
+            self.assertEqual(code, 0)
+            self.assertEqual(payload["status"], "ok")
+            self.assertEqual(payload["compaction"]["lines_before"], 3)
+            self.assertEqual(payload["compaction"]["lines_after"], 2)
+            self.assertGreater(payload["compaction"]["bytes_before"], payload["compaction"]["bytes_after"])
+            self.assertEqual([item.version for item in store.load_latest_by_id()], [2, 1])
+
+    def test_parallel_load_matches_serial_rows_stats_and_errors(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "store.jsonl"
+            store = FragmentStore(path, segment_max_bytes=600)
+            for version in (1, 2, 3):
+                store.append_fragments([_frag(fid, version) for fid in ("a", "b", "c", "d")])
+            with path.open("a", encoding="utf-8", newline="") as handle:
+                handle.write("\r\n{broken\r\n" + json.dumps(_frag("e", 1).to_dict()) + "\r\n\n[1]")
+
+            serial, serial_stats = store.load_fragments_with_stats()
+            with mock.patch.object(store_module, "_LOAD_CHUNK_BYTES", 150):
+                parallel, parallel_stats = store.load_fragments_with_stats(workers=2)
+                latest, _ = store.load_latest_by_id_with_stats(workers=2)
+                with self.assertRaises(ValueError) as parallel_error:
+                    store.load_fragments_with_stats(strict=True, workers=2)
+            with self.assertRaises(ValueError) as serial_error:
+                store.load_fragments_with_stats(strict=True)
+
+            self.assertGreater(len(list(path.with_name(path.name + ".segments").glob("*.jsonl"))), 1)
+            self.assertEqual([item.to_dict() for item in parallel], [item.to_dict() for item in serial])
+            self.assertEqual(parallel_stats, serial_stats)
+            self.assertEqual(serial_stats.decode_errors, 1)
+            self.assertEqual(serial_stats.schema_errors, 1)
+            self.assertEqual(str(parallel_error.exception), str(serial_error.exception))
+            self.assertEqual([item.to_dict() for item in latest], [item.to_dict() for item in store.load_latest_by_id()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import unittest
 
-from src.memory_cluster.time_utils import parse_iso_utc
+from src.memory_cluster.models import MemoryFragment, PreferenceConfig
+from src.memory_cluster.pipeline import build_cluster_result
+from src.memory_cluster.time_utils import parse_iso_epoch, parse_iso_utc, timestamp_sort_key
 
 
 class TestTimeUtils(unittest.TestCase):
@@ -14,6 +16,28 @@ class TestTimeUtils(unittest.TestCase):
     def test_parse_iso_returns_none_on_invalid(self) -> None:
         self.assertIsNone(parse_iso_utc("not-a-date"))
 
+    def test_sort_key_orders_instants_across_offset_spellings(self) -> None:
+        stamps = ["2026-02-10T10:15:00+00:00", "2026-02-10T09:30:00-01:00", "2026-02-10T10:00:00Z", "bogus"]
+        self.assertEqual(parse_iso_epoch("2026-02-10T10:00:00Z"), parse_iso_epoch("2026-02-10T12:00:00+02:00"))
+        self.assertEqual(
+            sorted(stamps, key=timestamp_sort_key),
+            ["bogus", "2026-02-10T10:00:00Z", "2026-02-10T10:15:00+00:00", "2026-02-10T09:30:00-01:00"],
+        )
+
+    def test_build_orders_fragments_and_refs_chronologically(self) -> None:
+        stamps = ["2026-02-10T09:30:00-01:00", "2026-02-10T10:15:00+00:00", "2026-02-10T10:00:00Z"]
+        fragments = [
+            MemoryFragment(id=f"t{idx}", agent_id="a", timestamp=ts, content=f"mode=v{idx}", type="log")
+            for idx, ts in enumerate(stamps)
+        ]
+        pref = PreferenceConfig.from_dict({"enable_conflict_graph": True})
+        result = build_cluster_result(fragments, pref, similarity_threshold=0.0, merge_threshold=0.95)
+
+        self.assertEqual([item.id for item in result.fragments], ["t2", "t1", "t0"])
+        cluster = result.clusters[0]
+        self.assertEqual(cluster.backrefs, ["t2", "t1", "t0"])
+        self.assertEqual([edge["to"] for edge in cluster.conflict_graph["mode"]["edges"]], ["v1", "v0"])
+
 
 if __name__ == "__main__":
     unittest.main()